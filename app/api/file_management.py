@@ -2,29 +2,90 @@
 File management endpoints
 """
 import os
-from fastapi import APIRouter, HTTPException
-from fastapi.responses import FileResponse
+import asyncio
+import aiofiles
+import functools
+from datetime import datetime
+from typing import AsyncIterator, Literal, Optional
+from fastapi import APIRouter, HTTPException, Query, Request
+from fastapi.responses import Response, StreamingResponse
 
 from app.models.responses import FileListResponse
-from app.config.settings import OUTPUT_FOLDER, logger
-from app.utils.file_utils import cleanup_file, get_file_info
+from app.config.settings import OUTPUT_FOLDER, DOWNLOAD_CACHE_CONTROL, logger
+from app.utils.file_utils import cleanup_file, delete_embedding
+from app.utils.audio_utils import media_type_for
+from app.utils.http_utils import (
+    file_etag, http_date, is_not_modified, if_range_matches, parse_range, RangeNotSatisfiable
+)
+from app.services.file_index import file_index
 
 router = APIRouter()
 
-@router.get("/download/{filename}")
-async def download_file(filename: str):
-    """Download generated audio file"""
+DOWNLOAD_CHUNK_SIZE = 64 * 1024
+
+async def _read_range(filepath: str, start: int, length: int) -> AsyncIterator[bytes]:
+    """Stream `length` bytes of a file from `start`"""
+    async with aiofiles.open(filepath, 'rb') as f:
+        await f.seek(start)
+        while length > 0:
+            chunk = await f.read(min(DOWNLOAD_CHUNK_SIZE, length))
+            if not chunk:
+                break
+            length -= len(chunk)
+            yield chunk
+
+@router.api_route("/download/{filename}", methods=["GET", "HEAD"])
+async def download_file(filename: str, request: Request):
+    """Download a generated file, with validators, conditional GET and byte ranges"""
     try:
         filepath = os.path.join(OUTPUT_FOLDER, filename)
-        if not os.path.exists(filepath):
+        try:
+            stat = os.stat(filepath)
+        except FileNotFoundError:
             raise HTTPException(status_code=404, detail="File not found")
-        
-        return FileResponse(
-            path=filepath,
-            filename=filename,
-            media_type='audio/wav'
+
+        etag = file_etag(stat)
+        last_modified = http_date(stat.st_mtime)
+        headers = {
+            "ETag": etag,
+            "Last-Modified": last_modified,
+            "Cache-Control": DOWNLOAD_CACHE_CONTROL,
+            "Accept-Ranges": "bytes",
+        }
+        if is_not_modified(
+            etag, stat.st_mtime,
+            request.headers.get("if-none-match"),
+            request.headers.get("if-modified-since")
+        ):
+            return Response(status_code=304, headers=headers)
+
+        size = stat.st_size
+        byte_range = None
+        if if_range_matches(request.headers.get("if-range"), etag, last_modified):
+            try:
+                byte_range = parse_range(request.headers.get("range"), size)
+            except RangeNotSatisfiable:
+                return Response(status_code=416, headers={**headers, "Content-Range": f"bytes */{size}"})
+
+        status_code = 200
+        start, length = 0, size
+        if byte_range is not None:
+            status_code = 206
+            start, length = byte_range[0], byte_range[1] - byte_range[0] + 1
+            headers["Content-Range"] = f"bytes {byte_range[0]}-{byte_range[1]}/{size}"
+        headers["Content-Length"] = str(length)
+        headers["Content-Disposition"] = f'attachment; filename="{filename}"'
+
+        media_type = media_type_for(filename)
+        if request.method == "HEAD":
+            return Response(status_code=status_code, headers=headers, media_type=media_type)
+        return StreamingResponse(
+            _read_range(filepath, start, length),
+            status_code=status_code,
+            headers=headers,
+            media_type=media_type
         )
-        
+
     except HTTPException:
         raise
     except Exception as e:
@@ -36,7 +97,11 @@ async def cleanup_file_endpoint(filename: str):
     """Delete specific file"""
     try:
         filepath = os.path.join(OUTPUT_FOLDER, filename)
-        if cleanup_file(filepath):
+        if filename.endswith('.pth'):
+            deleted = delete_embedding(filename[:-len('.pth')])
+        else:
+            deleted = cleanup_file(filepath)
+        if deleted:
             return {"message": f"File {filename} deleted successfully"}
         else:
             raise HTTPException(status_code=404, detail="File not found")
@@ -48,19 +113,50 @@ async def cleanup_file_endpoint(filename: str):
         raise HTTPException(status_code=500, detail=str(e))
 
 @router.get("/files", response_model=FileListResponse)
-async def list_output_files():
-    """List all output files"""
+async def list_output_files(
+    cursor: Optional[str] = Query(None, description="Filename to continue after, from next_cursor"),
+    limit: int = Query(100, ge=1, le=1000, description="Files per page"),
+    type: Optional[Literal['embedding', 'audio', 'tmp', 'other']] = Query(None, description="File class"),
+    prefix: Optional[str] = Query(None, description="Filename prefix"),
+    min_age_seconds: Optional[float] = Query(None, ge=0, description="Only files at least this old"),
+    max_age_seconds: Optional[float] = Query(None, ge=0, description="Only files at most this old"),
+):
+    """List output files, paginated by filename"""
     try:
-        files = []
-        if os.path.exists(OUTPUT_FOLDER):
-            for filename in os.listdir(OUTPUT_FOLDER):
-                filepath = os.path.join(OUTPUT_FOLDER, filename)
-                if os.path.isfile(filepath):
-                    file_info = get_file_info(filepath)
-                    if file_info:
-                        files.append(file_info)
-        
-        return FileListResponse(files=files)
+        loop = asyncio.get_event_loop()
+        if not file_index.built:
+            await loop.run_in_executor(None, file_index.rebuild)
+
+        page, next_cursor = await loop.run_in_executor(
+            None,
+            functools.partial(
+                file_index.query,
+                cursor=cursor,
+                limit=limit,
+                file_type=type,
+                prefix=prefix,
+                min_age_seconds=min_age_seconds,
+                max_age_seconds=max_age_seconds
+            )
+        )
+        files = [
+            {
+                **info,
+                'created_at': datetime.fromtimestamp(info['created_at']).isoformat(),
+                'modified_at': datetime.fromtimestamp(info['modified_at']).isoformat()
+            }
+            for info in page
+        ]
+
+        totals = file_index.totals()
+        if type:
+            totals = totals['by_type'][type]
+        return FileListResponse(
+            files=files,
+            next_cursor=next_cursor,
+            total_count=totals['count'],
+            total_bytes=totals['bytes']
+        )
         
     except Exception as e:
         logger.error(f"Error in list_output_files: {e}")
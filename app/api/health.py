@@ -2,14 +2,39 @@
 Health check endpoints
 """
 from fastapi import APIRouter
+from fastapi.responses import JSONResponse, PlainTextResponse
 from datetime import datetime
 
 from app.models.responses import HealthResponse
 from app.services.voice_service import voice_service
+from app.services.embedding_cache import embedding_cache
+from app.services.frontend_cache import frontend_cache
+from app.services.embedding_dedup import embedding_dedup
+from app.services.result_cache import result_cache
+from app.services.model_registry import model_registry
+from app.services.batch_scheduler import batch_scheduler
+from app.services.admission import admission_controller
+from app.services.process_pool import process_pool
+from app.services.janitor import janitor
+from app.services.job_queue import job_queue
+from app.services.similarity_index import similarity_index
+from app.services.warmup import warmup
+from app.services.metrics import metrics
 from app.config.settings import DEVICE
 
 router = APIRouter()
 
+# Gauges are read only when /metrics is scraped
+metrics.gauge("openvoice_executor_busy_threads", "Executor threads running inference", voice_service.executor_busy)
+metrics.gauge("openvoice_executor_queued", "Tasks waiting for an executor thread", voice_service.executor_queue_depth)
+metrics.gauge("openvoice_inference_processes_idle", "Inference worker processes waiting for work", process_pool.idle_workers)
+metrics.gauge("openvoice_admission_cost_in_flight", "Admitted cost units in flight", lambda: admission_controller.cost_in_flight)
+metrics.gauge("openvoice_models_resident", "MeloTTS models loaded in memory", lambda: len(model_registry.resident_languages()))
+metrics.gauge("openvoice_embedding_cache_entries", "Embeddings held in the in-process cache", lambda: embedding_cache.stats()["size"])
+metrics.gauge("openvoice_frontend_cache_bytes", "Bytes of sentence front-end features held in memory", lambda: frontend_cache.stats()["bytes"])
+metrics.gauge("openvoice_result_cache_entries", "Rendered results held in the on-disk cache", lambda: len(result_cache._entries))
+metrics.gauge("openvoice_result_cache_bytes", "Bytes held in the on-disk result cache", lambda: result_cache.total_bytes)
+
 @router.get("/health", response_model=HealthResponse)
 async def health_check():
     """Check API health status"""
@@ -19,3 +44,55 @@ async def health_check():
         models_loaded=voice_service.is_models_loaded(),
         timestamp=datetime.now().isoformat()
     )
+
+@router.get("/health/live")
+async def liveness():
+    """Report that the process is up and serving requests"""
+    return {"status": "alive"}
+
+@router.get("/health/ready")
+async def readiness():
+    """Report per-model warm-up state; 503 until every configured model is warm"""
+    status = warmup.status()
+    return JSONResponse(status, status_code=200 if status["ready"] else 503)
+
+@router.get("/health/cache")
+async def cache_stats():
+    """Report in-process cache sizes and hit/miss counters"""
+    return {
+        "embeddings": embedding_cache.stats(),
+        "embedding_dedup": embedding_dedup.stats(),
+        "frontend": frontend_cache.stats(),
+        "results": result_cache.stats(),
+        "similarity": similarity_index.stats()
+    }
+
+@router.get("/health/batching")
+async def batching_stats():
+    """Report micro-batching counters and queue depth"""
+    return batch_scheduler.stats()
+
+@router.get("/health/models")
+async def model_status():
+    """Report resident TTS models with their sizes and load times"""
+    return model_registry.status()
+
+@router.get("/health/queue")
+async def queue_stats():
+    """Report live queue depth and admission counters"""
+    return {
+        "executor_queued": voice_service.executor_queue_depth(),
+        "idle_worker_processes": process_pool.idle_workers(),
+        "admission": admission_controller.stats(),
+        "jobs": job_queue.stats()
+    }
+
+@router.get("/health/janitor")
+async def janitor_stats():
+    """Report files and bytes reclaimed by the janitor"""
+    return janitor.stats()
+
+@router.get("/metrics", response_class=PlainTextResponse)
+async def prometheus_metrics():
+    """Stage latency histograms and gauges in Prometheus text format"""
+    return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4")
@@ -0,0 +1,89 @@
+"""
+Asynchronous synthesis job endpoints
+"""
+import os
+import asyncio
+from fastapi import APIRouter, HTTPException
+from fastapi.responses import FileResponse
+from app.models.requests import JobRequest
+from app.models.responses import JobResponse
+from app.services.audio_service import audio_service
+from app.services.embedding_cache import embedding_cache
+from app.services.job_queue import job_queue
+from app.config.settings import DEFAULT_SPEAKERS, logger
+from app.utils.audio_utils import AUDIO_FORMATS
+
+router = APIRouter()
+
+async def _get_job(job_id: str) -> dict:
+    job = await job_queue.find(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job
+
+@router.post("/jobs", response_model=JobResponse, status_code=202)
+async def submit_job(request: JobRequest):
+    """Queue long-form synthesis; poll the job or wait for its callback"""
+    try:
+        loop = asyncio.get_event_loop()
+        if not await loop.run_in_executor(None, embedding_cache.exists, request.target_embedding_name):
+            raise HTTPException(
+                status_code=400,
+                detail="Target voice embedding file not found"
+            )
+        if request.sample_rate is not None:
+            audio_service.output_rate(request.output_format, request.sample_rate)
+        job = await job_queue.submit(
+            {
+                "text": request.text,
+                "language": request.language,
+                "speaker": request.speaker or DEFAULT_SPEAKERS.get(request.language, "VI-hue"),
+                "speed": request.speed,
+                "target_embedding_name": request.target_embedding_name,
+                "output_format": request.output_format,
+                # The default rate is resolved when the job runs, once the models are loaded
+                "sample_rate": request.sample_rate,
+            },
+            callback_url=request.callback_url
+        )
+        return JobResponse(**job)
+
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Error in submit_job: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+@router.get("/jobs/{job_id}", response_model=JobResponse)
+async def get_job(job_id: str):
+    """State and per-chunk progress of a job"""
+    return JobResponse(**await _get_job(job_id))
+
+@router.get("/jobs/{job_id}/result")
+async def get_job_result(job_id: str):
+    """Download the audio of a finished job"""
+    job = await _get_job(job_id)
+    if job["status"] != "succeeded":
+        raise HTTPException(status_code=409, detail=f"Job is {job['status']}")
+    path = job_queue.result_path(job)
+    if not os.path.exists(path):
+        raise HTTPException(status_code=404, detail="Job result not found")
+    return FileResponse(
+        path,
+        media_type=AUDIO_FORMATS[job["output_format"]]["media_type"],
+        filename=os.path.basename(path)
+    )
+
+@router.post("/jobs/{job_id}/cancel", response_model=JobResponse)
+async def cancel_job(job_id: str):
+    """Stop a queued or running job"""
+    await _get_job(job_id)
+    job = await job_queue.cancel(job_id)
+    return JobResponse(**job)
+
+@router.delete("/jobs/{job_id}")
+async def delete_job(job_id: str):
+    """Cancel a job if needed and delete it with its result"""
+    if not await job_queue.delete(job_id):
+        raise HTTPException(status_code=404, detail="Job not found")
+    return {"message": f"Job {job_id} deleted"}
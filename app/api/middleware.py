@@ -0,0 +1,88 @@
+"""
+ASGI middleware
+"""
+from typing import Dict, Optional
+from starlette.responses import JSONResponse
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from app.config.settings import MAX_FILE_SIZE, UPLOAD_MULTIPART_OVERHEAD, EXTRACT_BATCH_MAX_FILES
+
+# Body limits of endpoints accepting more than one file
+BATCH_UPLOAD_LIMITS = {
+    "/extract_voices": EXTRACT_BATCH_MAX_FILES * (MAX_FILE_SIZE + UPLOAD_MULTIPART_OVERHEAD),
+}
+
+class _BodyTooLarge(Exception):
+    """Raised from `receive` once a request body passes its limit"""
+
+class UploadSizeLimitMiddleware:
+    """Reject uploads larger than the limit for their path
+
+    A Content-Length over the limit is refused before any of the body is
+    read. Bodies without one (chunked uploads) are counted as they are
+    received, since Starlette spools the whole multipart body before a
+    handler sees it; once the count passes the limit the read is aborted
+    and the client gets the same 413.
+    """
+
+    def __init__(
+        self,
+        app: ASGIApp,
+        max_body_size: int = MAX_FILE_SIZE + UPLOAD_MULTIPART_OVERHEAD,
+        path_limits: Optional[Dict[str, int]] = None
+    ):
+        self.app = app
+        self.max_body_size = max_body_size
+        self.path_limits = BATCH_UPLOAD_LIMITS if path_limits is None else path_limits
+
+    @staticmethod
+    async def _reject(scope: Scope, receive: Receive, send: Send) -> None:
+        response = JSONResponse(
+            status_code=413,
+            content={"detail": f"File too large. Maximum size is {MAX_FILE_SIZE // (1024 * 1024)}MB"}
+        )
+        await response(scope, receive, send)
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or scope["method"] not in ("POST", "PUT"):
+            await self.app(scope, receive, send)
+            return
+
+        limit = self.path_limits.get(scope["path"], self.max_body_size)
+        for name, value in scope["headers"]:
+            if name == b"content-length":
+                if value.isdigit() and int(value) > limit:
+                    await self._reject(scope, receive, send)
+                    return
+                break
+
+        received = 0
+        too_large = False
+        response_started = False
+
+        async def limited_receive() -> Message:
+            nonlocal received, too_large
+            message = await receive()
+            if message["type"] == "http.request":
+                received += len(message.get("body", b""))
+                if received > limit:
+                    too_large = True
+                    raise _BodyTooLarge()
+            return message
+
+        async def guarded_send(message: Message) -> None:
+            nonlocal response_started
+            # Whatever the app makes of the aborted body is replaced by the 413
+            if too_large:
+                return
+            if message["type"] == "http.response.start":
+                response_started = True
+            await send(message)
+
+        try:
+            await self.app(scope, limited_receive, guarded_send)
+        except Exception:
+            if not too_large:
+                raise
+        if too_large and not response_started:
+            await self._reject(scope, receive, send)
@@ -1,46 +1,97 @@
+import json
+import uuid
 import asyncio
-from io import BytesIO
-from fastapi import APIRouter, HTTPException
-from fastapi.responses import StreamingResponse
-from app.models.requests import VoiceCloneRequest
+from typing import AsyncIterator, Optional
+from fastapi import APIRouter, HTTPException, Header
+from fastapi.responses import StreamingResponse, JSONResponse, Response
+from starlette.types import Receive, Scope, Send
+from app.models.requests import VoiceCloneRequest, BatchCloneRequest
 from app.models.responses import SpeakersResponse
 from app.services.audio_service import audio_service
-from app.services.voice_service import voice_service
-from app.config.settings import SUPPORTED_LANGUAGES, logger
-from app.utils.file_utils import cleanup_file
+from app.services.admission import Reservation
+from app.services.model_registry import model_registry
+from app.services.metrics import metrics, clone_stages
+from app.config.settings import SUPPORTED_LANGUAGES, DEFAULT_SPEAKERS, RESULT_CACHE_ENABLED, logger
+from app.utils.audio_utils import AUDIO_FORMATS, audio_buffer_to_base64
 
 router = APIRouter()
 
+def _audio_headers(name: str, audio_format: str, sample_rate: int) -> dict:
+    """Download name and sample rate headers of an encoded response"""
+    return {
+        "Content-Disposition": f"attachment; filename={name}.{AUDIO_FORMATS[audio_format]['extension']}",
+        "X-Sample-Rate": str(sample_rate),
+    }
+
+class AdmittedStreamingResponse(StreamingResponse):
+    """Streaming response that releases its admission when the response ends
+
+    Starlette neither closes the body iterator nor runs background tasks
+    when the client disconnects, so the body is closed and the reservation
+    released here, whether or not the body was ever iterated.
+    """
+
+    def __init__(self, content: AsyncIterator[bytes], reservation: Reservation, **kwargs):
+        super().__init__(content, **kwargs)
+        self.reservation = reservation
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        try:
+            await super().__call__(scope, receive, send)
+        finally:
+            try:
+                await self.body_iterator.aclose()
+            finally:
+                self.reservation.release()
+
 @router.post("/clone_voice")
 async def clone_voice(request: VoiceCloneRequest):
     """Clone voice using existing embedding file"""
     try:
-        output_path = await audio_service.clone_voice_with_embedding(
+        if request.stream:
+            audio_stream, reservation = await audio_service.stream_cloned_voice(
+                text=request.text,
+                language=request.language,
+                speaker=request.speaker,
+                speed=request.speed,
+                target_embedding_name=request.target_embedding_name,
+                audio_format=request.output_format,
+                sample_rate=request.sample_rate,
+            )
+            return AdmittedStreamingResponse(
+                audio_stream,
+                reservation,
+                media_type=AUDIO_FORMATS[request.output_format]["media_type"],
+                headers=_audio_headers(
+                    request.target_embedding_name,
+                    request.output_format,
+                    audio_service.output_rate(request.output_format, request.sample_rate)
+                )
+            )
+
+        audio_content, cache_hit = await audio_service.clone_voice_with_embedding(
             text=request.text,
             language=request.language,
             speaker=request.speaker,
             speed=request.speed,
             target_embedding_name=request.target_embedding_name,
+            audio_format=request.output_format,
+            sample_rate=request.sample_rate,
         )
 
-        # Read the audio file into a buffer
-        with open(output_path, "rb") as audio_file:
-            audio_content = audio_file.read()
-        
-        # Clean up files
-        cleanup_file(output_path)
-        
-        # Create BytesIO buffer from audio content
-        buffer = BytesIO(audio_content)
-        buffer.seek(0)
-        
+        headers = _audio_headers(
+            request.target_embedding_name,
+            request.output_format,
+            audio_service.output_rate(request.output_format, request.sample_rate)
+        )
+        if RESULT_CACHE_ENABLED:
+            headers["X-Cache"] = "HIT" if cache_hit else "MISS"
+
         # Return streaming response
         return StreamingResponse(
-            buffer, 
-            media_type="audio/wav", 
-            headers={
-                "Content-Disposition": f"attachment; filename={request.target_embedding_name}.wav"
-            }
+            _timed_body(audio_content),
+            media_type=AUDIO_FORMATS[request.output_format]["media_type"],
+            headers=headers
         )
 
     except HTTPException:
@@ -49,33 +100,105 @@ async def clone_voice(request: VoiceCloneRequest):
         logger.error(f"Error in clone_voice: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
+async def _timed_body(content: bytes) -> AsyncIterator[bytes]:
+    """Send a response body, timing it as the response stage"""
+    with metrics.time(clone_stages, "response"):
+        yield content
 
-@router.get("/list_speakers", response_model=SpeakersResponse)
-async def list_speakers():
-    """List available speakers for each language"""
+
+async def _ndjson_results(results: AsyncIterator, request: BatchCloneRequest) -> AsyncIterator[bytes]:
+    """One JSON line per finished item, audio as base64"""
     try:
-        speakers_info = {}
-
-        # Get speakers for all languages in parallel
-        loop = asyncio.get_event_loop()
-        tasks = [
-            loop.run_in_executor(
-                voice_service.executor,
-                voice_service.get_speakers_for_language,
-                lang
-            )
-            for lang in SUPPORTED_LANGUAGES
+        async for index, audio, error in results:
+            line = {"index": index, "text": request.items[index].text}
+            if error is None:
+                line["audio_buffer"] = audio_buffer_to_base64(audio)
+            else:
+                line["error"] = error
+            yield (json.dumps(line, ensure_ascii=False) + "\n").encode("utf-8")
+    finally:
+        # Cancel the items still running when the response is closed early
+        await results.aclose()
+
+async def _multipart_results(results: AsyncIterator, boundary: str, audio_format: str) -> AsyncIterator[bytes]:
+    """One multipart/mixed part per finished item, tagged with its index"""
+    spec = AUDIO_FORMATS[audio_format]
+    try:
+        async for index, audio, error in results:
+            if error is None:
+                content_type, body = spec["media_type"], audio
+            else:
+                content_type, body = "application/json", json.dumps({"index": index, "error": error}).encode("utf-8")
+            yield (
+                f"--{boundary}\r\n"
+                f"Content-Type: {content_type}\r\n"
+                f"Content-Disposition: attachment; filename={index}.{spec['extension']}\r\n"
+                f"X-Item-Index: {index}\r\n"
+                f"Content-Length: {len(body)}\r\n\r\n"
+            ).encode("utf-8") + body + b"\r\n"
+        yield f"--{boundary}--\r\n".encode("utf-8")
+    finally:
+        await results.aclose()
+
+@router.post("/clone_voice_batch")
+async def clone_voice_batch(request: BatchCloneRequest):
+    """Clone many texts into one target voice, streaming results as they complete"""
+    try:
+        default_speaker = request.speaker or DEFAULT_SPEAKERS.get(request.language, "VI-hue")
+        items = [
+            {
+                "text": item.text,
+                "language": request.language,
+                "speaker": item.speaker or default_speaker,
+                "speed": item.speed if item.speed is not None else request.speed,
+            }
+            for item in request.items
         ]
+        results, reservation = await audio_service.clone_voice_batch(
+            items=items,
+            target_embedding_name=request.target_embedding_name,
+            audio_format=request.output_format,
+            sample_rate=request.sample_rate,
+        )
 
-        results = await asyncio.gather(*tasks)
+        if request.response_format == "multipart":
+            boundary = uuid.uuid4().hex
+            return AdmittedStreamingResponse(
+                _multipart_results(results, boundary, request.output_format),
+                reservation,
+                media_type=f"multipart/mixed; boundary={boundary}"
+            )
+        return AdmittedStreamingResponse(
+            _ndjson_results(results, request),
+            reservation,
+            media_type="application/x-ndjson"
+        )
+
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Error in clone_voice_batch: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@router.get("/list_speakers", response_model=SpeakersResponse)
+async def list_speakers(if_none_match: Optional[str] = Header(None)):
+    """List available speakers for each language"""
+    try:
+        # Built once from model configs, off the synthesis executor
+        if not model_registry.has_speaker_index():
+            loop = asyncio.get_event_loop()
+            await loop.run_in_executor(None, model_registry.speaker_index, SUPPORTED_LANGUAGES)
+        speakers_info, etag = model_registry.speaker_index(SUPPORTED_LANGUAGES)
 
-        for lang, speakers in zip(SUPPORTED_LANGUAGES, results):
-            speakers_info[lang] = speakers
+        if if_none_match == etag:
+            return Response(status_code=304, headers={"ETag": etag})
 
-        return SpeakersResponse(
+        response = SpeakersResponse(
             supported_languages=SUPPORTED_LANGUAGES,
             speakers=speakers_info
         )
+        return JSONResponse(content=response.model_dump(), headers={"ETag": etag})
 
     except Exception as e:
         logger.error(f"Error in list_speakers: {e}")
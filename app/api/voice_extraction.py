@@ -1,9 +1,13 @@
 """
 Voice extraction endpoints
 """
+from typing import List
 from fastapi import APIRouter, File, UploadFile, HTTPException, Query
-from app.models.responses import VoiceExtractionResponse
+from app.models.responses import (
+    VoiceExtractionResponse, BatchVoiceExtractionResponse, SimilarVoicesResponse
+)
 from app.services.audio_service import audio_service
+from app.config.settings import SIMILARITY_MAX_K
 
 router = APIRouter()
 
@@ -23,3 +27,52 @@ async def extract_voice(
         raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
+
+@router.post("/extract_voices", response_model=BatchVoiceExtractionResponse)
+async def extract_voices(
+    audio_files: List[UploadFile] = File(...),
+):
+    """Extract voice embeddings from several audio files"""
+    try:
+        results = await audio_service.extract_voice_embeddings(
+            audio_files=audio_files,
+        )
+
+        return BatchVoiceExtractionResponse(results=results)
+
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@router.get("/similar_voices/{embedding_name}", response_model=SimilarVoicesResponse)
+async def similar_voices(
+    embedding_name: str,
+    k: int = Query(10, ge=1, le=SIMILARITY_MAX_K),
+):
+    """Find the stored voices most similar to a stored embedding"""
+    try:
+        result = await audio_service.find_similar_voices(embedding_name, k)
+
+        return SimilarVoicesResponse(**result)
+
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@router.post("/similar_voices", response_model=SimilarVoicesResponse)
+async def similar_voices_to_clip(
+    audio_file: UploadFile = File(...),
+    k: int = Query(10, ge=1, le=SIMILARITY_MAX_K),
+):
+    """Find the stored voices most similar to the voice in an audio file"""
+    try:
+        result = await audio_service.find_similar_to_clip(audio_file, k)
+
+        return SimilarVoicesResponse(**result)
+
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
@@ -4,7 +4,6 @@ Configuration settings for Voice Cloning API
 import os
 import torch
 import logging
-from melo.api import TTS
 
 # Logging configuration
 logging.basicConfig(level=logging.INFO)
@@ -13,15 +12,100 @@ logger = logging.getLogger(__name__)
 # Directories
 UPLOAD_FOLDER = 'uploads'
 OUTPUT_FOLDER = 'outputs_v2'
+# Service state (indexes, queues) kept apart from generated outputs
+DATA_FOLDER = 'data'
 
 # File settings
 ALLOWED_EXTENSIONS = {'wav', 'mp3', 'flac', 'm4a'}
 MAX_FILE_SIZE = 50 * 1024 * 1024  # 50MB
+UPLOAD_CHUNK_SIZE = 1024 * 1024  # 1MB per read while streaming uploads to disk
+# Batch embedding extraction: files per request and files processed at once
+EXTRACT_BATCH_MAX_FILES = int(os.environ.get('EXTRACT_BATCH_MAX_FILES', 50))
+EXTRACT_BATCH_CONCURRENCY = int(os.environ.get('EXTRACT_BATCH_CONCURRENCY', 4))
+# Allowance for multipart boundaries and headers when checking Content-Length
+UPLOAD_MULTIPART_OVERHEAD = 64 * 1024
 
 # Model settings
 DEVICE = "cuda:0" if  torch.cuda.is_available() else "cpu"
 MAX_WORKERS = 4
 
+# Serving mode: "thread" runs inference on the executor in this process,
+# "process" forks INFERENCE_PROCESSES workers sharing the loaded weights (CPU only)
+SERVING_MODE = os.environ.get('SERVING_MODE', 'thread')
+INFERENCE_PROCESSES = int(os.environ.get('INFERENCE_PROCESSES', max(1, (os.cpu_count() or 1) // 2)))
+# Torch intra-op threads per worker process, sized to avoid oversubscription
+INFERENCE_TORCH_THREADS = int(os.environ.get(
+    'INFERENCE_TORCH_THREADS', max(1, (os.cpu_count() or 1) // INFERENCE_PROCESSES)
+))
+
+# Threads allowed to run the tone color converter at once. There is a single
+# ToneColorConverter, and it is not thread-safe: its weight-norm hooks rewrite
+# the weights on every forward pass and the wavmark watermarker and reference
+# encoder keep per-call state, so the default of 1 serializes it. Raise this
+# only for a converter build without those hooks. A MeloTTS model (acoustic
+# model and BERT front end) is never shared by two threads.
+CONVERTER_SLOTS = int(os.environ.get('CONVERTER_SLOTS', 1))
+
+# Admission control: outstanding work is measured in cost units, one unit per
+# ADMISSION_CHARS_PER_UNIT characters of text; requests beyond
+# ADMISSION_MAX_COST are rejected with 429
+ADMISSION_MAX_COST = float(os.environ.get('ADMISSION_MAX_COST', 200))
+ADMISSION_CHARS_PER_UNIT = int(os.environ.get('ADMISSION_CHARS_PER_UNIT', 50))
+ADMISSION_EXTRACT_COST = float(os.environ.get('ADMISSION_EXTRACT_COST', 10))
+
+# Micro-batching of concurrent clone requests
+BATCHING_ENABLED = os.environ.get('BATCHING_ENABLED', 'false').lower() == 'true'
+BATCH_MAX_SIZE = int(os.environ.get('BATCH_MAX_SIZE', 8))
+BATCH_MAX_WAIT_MS = float(os.environ.get('BATCH_MAX_WAIT_MS', 20))
+
+# Packed store of target voice embeddings (replaces one .pth per voice)
+EMBEDDING_STORE_FOLDER = os.path.join(DATA_FOLDER, 'embeddings')
+
+# Content hash -> embedding index used to skip re-extracting identical uploads
+EMBEDDING_DEDUP_DB = os.path.join(DATA_FOLDER, 'embedding_hashes.sqlite3')
+
+# Optional on-disk cache of synthesized audio, keyed on the request parameters
+RESULT_CACHE_ENABLED = os.environ.get('RESULT_CACHE_ENABLED', 'false').lower() == 'true'
+RESULT_CACHE_FOLDER = os.path.join(DATA_FOLDER, 'result_cache')
+RESULT_CACHE_MAX_BYTES = int(os.environ.get('RESULT_CACHE_MAX_MB', 1024)) * 1024 * 1024
+# Bump to invalidate cached results after changing model checkpoints
+MODEL_VERSION = os.environ.get('MODEL_VERSION', 'openvoice-v2-melo')
+
+# Cache-Control of /download responses; generated outputs get unique names
+# and are never rewritten, so edge caches may keep them indefinitely
+DOWNLOAD_CACHE_CONTROL = os.environ.get('DOWNLOAD_CACHE_CONTROL', 'public, max-age=31536000, immutable')
+
+# Asynchronous synthesis jobs: persistent queue, result files, jobs run at
+# once, how long finished jobs are kept and how callbacks are delivered
+JOB_QUEUE_DB = os.path.join(DATA_FOLDER, 'jobs.sqlite3')
+JOB_RESULT_FOLDER = os.path.join(DATA_FOLDER, 'jobs')
+JOB_WORKERS = int(os.environ.get('JOB_WORKERS', 1))
+JOB_RETENTION_HOURS = float(os.environ.get('JOB_RETENTION_HOURS', 24))
+JOB_MAX_TEXT_LENGTH = int(os.environ.get('JOB_MAX_TEXT_LENGTH', 200000))
+JOB_CALLBACK_TIMEOUT = float(os.environ.get('JOB_CALLBACK_TIMEOUT', 10))
+JOB_CALLBACK_RETRIES = int(os.environ.get('JOB_CALLBACK_RETRIES', 5))
+# Hosts job callbacks may be sent to, comma-separated. When empty, any host
+# is accepted that resolves only to public addresses (no loopback, private,
+# link-local or reserved ranges); listed hosts are trusted whatever they resolve to
+JOB_CALLBACK_ALLOWED_HOSTS = {
+    host.strip().lower() for host in os.environ.get('JOB_CALLBACK_ALLOWED_HOSTS', '').split(',') if host.strip()
+}
+JOB_SWEEP_INTERVAL = 300  # seconds between retention sweeps
+
+# Similarity search: rows scored per matrix product and largest k served
+SIMILARITY_BLOCK_ROWS = int(os.environ.get('SIMILARITY_BLOCK_ROWS', 65536))
+SIMILARITY_MAX_K = int(os.environ.get('SIMILARITY_MAX_K', 100))
+
+# Batch clone endpoint: items per request and items synthesized at once
+BATCH_CLONE_MAX_ITEMS = int(os.environ.get('BATCH_CLONE_MAX_ITEMS', 1000))
+BATCH_CLONE_CONCURRENCY = int(os.environ.get('BATCH_CLONE_CONCURRENCY', MAX_WORKERS * 2))
+
+# Number of target speaker embeddings kept on the device
+EMBEDDING_CACHE_SIZE = int(os.environ.get('EMBEDDING_CACHE_SIZE', 512))
+
+# Memory for per-sentence MeloTTS front-end features (phones, tones, BERT); 0 disables
+FRONTEND_CACHE_MAX_BYTES = int(os.environ.get('FRONTEND_CACHE_MAX_MB', 256)) * 1024 * 1024
+
 # Supported languages
 SUPPORTED_LANGUAGES = ['VI', 'EN', 'ZH', 'JP', 'KR', 'FR', 'ES']
 
@@ -37,21 +121,44 @@ DEFAULT_SPEAKERS = {
     'VI_MIX_EN': 'Vi_mix'
 }
 
-MODELS = {
-    'EN': TTS(language='EN', device=DEVICE),
-    'ES': TTS(language='ES', device=DEVICE),
-    'FR': TTS(language='FR', device=DEVICE),
-    'ZH': TTS(language='ZH', device=DEVICE),
-    'JP': TTS(language='JP', device=DEVICE),
-    'KR': TTS(language='KR', device=DEVICE),
-    'VI': TTS(language='VI', device=DEVICE),
-    'VI_MIX_EN': TTS(language='VI_MIX_EN', device=DEVICE),
+# MeloTTS models, loaded lazily by the model registry
+MODEL_LANGUAGES = ['EN', 'ES', 'FR', 'ZH', 'JP', 'KR', 'VI', 'VI_MIX_EN']
+# Languages kept resident regardless of the memory budget
+MODEL_PINNED_LANGUAGES = [
+    lang.strip() for lang in os.environ.get('MODEL_PINNED_LANGUAGES', 'VI,EN').split(',') if lang.strip()
+]
+# Memory budget for resident MeloTTS models in MB (0 = unlimited)
+MODEL_MEMORY_BUDGET_MB = int(os.environ.get('MODEL_MEMORY_BUDGET_MB', 0))
+
+# Inference backend of the converter and MeloTTS models, as '+'-joined options:
+# "eager" (fp32 under torch.no_grad), "inference_mode", "int8" (dynamic int8
+# quantization of linear and recurrent layers) and "torchscript" (traced,
+# frozen vocoders). int8 and torchscript imply inference_mode and apply on CPU only.
+INFERENCE_BACKEND = os.environ.get('INFERENCE_BACKEND', 'eager')
+
+# Models loaded and warmed up in the background after startup, in priority
+# order; /health/ready waits for all of them. Other languages load on first use.
+MODEL_WARMUP_LANGUAGES = [
+    lang.strip()
+    for lang in os.environ.get('MODEL_WARMUP_LANGUAGES', ','.join(MODEL_PINNED_LANGUAGES)).split(',')
+    if lang.strip()
+]
+# Short text synthesized once per model to warm up kernels and caches
+WARMUP_TEXTS = {
+    'EN': 'Hello.',
+    'ES': 'Hola.',
+    'FR': 'Bonjour.',
+    'ZH': '你好。',
+    'JP': 'こんにちは。',
+    'KR': '안녕하세요.',
+    'VI': 'Xin chào.',
+    'VI_MIX_EN': 'Xin chào.',
 }
 
 # Create necessary directories
 def create_directories():
     """Create necessary directories if they don't exist"""
-    directories = [UPLOAD_FOLDER, OUTPUT_FOLDER]
+    directories = [UPLOAD_FOLDER, OUTPUT_FOLDER, DATA_FOLDER]
     for directory in directories:
         os.makedirs(directory, exist_ok=True)
         logger.info(f"Directory ensured: {directory}")
@@ -68,4 +175,17 @@ CORS_METHODS = ["*"]
 CORS_HEADERS = ["*"]
 
 # File cleanup settings
-CLEANUP_INTERVAL_HOURS = 24
+CLEANUP_INTERVAL_HOURS = float(os.environ.get('CLEANUP_INTERVAL_HOURS', 24))
+JANITOR_ENABLED = os.environ.get('JANITOR_ENABLED', 'true').lower() == 'true'
+
+# Janitor quotas per file class: files older than max_age_hours are removed,
+# then the oldest files are removed until the class fits in max_bytes.
+# None disables a limit. Embeddings (in the embedding store and legacy .pth
+# files) are kept unless a quota is configured.
+JANITOR_POLICIES = {
+    'upload': {'max_age_hours': 1, 'max_bytes': None},
+    'tmp': {'max_age_hours': 0.25, 'max_bytes': None},
+    'audio': {'max_age_hours': 24, 'max_bytes': 2 * 1024 * 1024 * 1024},
+    'embedding': {'max_age_hours': None, 'max_bytes': None},
+    'other': {'max_age_hours': None, 'max_bytes': None},
+}
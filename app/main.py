@@ -19,20 +19,32 @@ try:
     from config.settings import (
         API_TITLE, API_DESCRIPTION, API_VERSION,
         CORS_ORIGINS, CORS_CREDENTIALS, CORS_METHODS, CORS_HEADERS,
-        create_directories, logger
+        JANITOR_ENABLED, create_directories, logger
     )
     from services.voice_service import voice_service
+    from services.batch_scheduler import batch_scheduler
+    from services.process_pool import process_pool
+    from services.janitor import janitor
+    from services.warmup import warmup
+    from services.job_queue import job_queue
     from utils.file_utils import cleanup_old_files
-    from api import health, voice_extraction, voice_cloning, file_management
+    from api import health, voice_extraction, voice_cloning, file_management, jobs
+    from api.middleware import UploadSizeLimitMiddleware
 except ImportError:
     from app.config.settings import (
         API_TITLE, API_DESCRIPTION, API_VERSION,
         CORS_ORIGINS, CORS_CREDENTIALS, CORS_METHODS, CORS_HEADERS,
-        create_directories, logger
+        JANITOR_ENABLED, create_directories, logger
     )
     from app.services.voice_service import voice_service
+    from app.services.batch_scheduler import batch_scheduler
+    from app.services.process_pool import process_pool
+    from app.services.janitor import janitor
+    from app.services.warmup import warmup
+    from app.services.job_queue import job_queue
     from app.utils.file_utils import cleanup_old_files
-    from app.api import health, voice_extraction, voice_cloning, file_management
+    from app.api import health, voice_extraction, voice_cloning, file_management, jobs
+    from app.api.middleware import UploadSizeLimitMiddleware
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
@@ -41,12 +53,22 @@ async def lifespan(app: FastAPI):
     logger.info("OpenVoice FastAPI server starting up")
     create_directories()
     logger.info(f"Using device: {voice_service.device}")
-    logger.info(f"Models loaded: {voice_service.is_models_loaded()}")
+    # Bind right away; models load and warm up in the background (see /health/ready)
+    warmup.start()
+    job_queue.start()
+    if JANITOR_ENABLED:
+        janitor.start()
 
     yield
 
     # Shutdown
     logger.info("OpenVoice FastAPI server shutting down")
+    await warmup.shutdown()
+    await job_queue.shutdown()
+    await janitor.shutdown()
+    await batch_scheduler.shutdown()
+    if process_pool.started:
+        process_pool.shutdown()
     voice_service.shutdown()
 
 # Create FastAPI app
@@ -57,7 +79,10 @@ app = FastAPI(
     lifespan=lifespan
 )
 
-# CORS middleware
+# Refuse oversized uploads before their body is read
+app.add_middleware(UploadSizeLimitMiddleware)
+
+# CORS middleware (outermost, so rejections still carry CORS headers)
 app.add_middleware(
     CORSMiddleware,
     allow_origins=CORS_ORIGINS,
@@ -71,6 +96,7 @@ app.include_router(health.router, tags=["Health"])
 app.include_router(voice_extraction.router, tags=["Voice Extraction"])
 app.include_router(voice_cloning.router, tags=["Voice Cloning"])
 app.include_router(file_management.router, tags=["File Management"])
+app.include_router(jobs.router, tags=["Jobs"])
 
 # Background task endpoint for cleanup
 @app.post("/cleanup_old_files")
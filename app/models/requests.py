@@ -2,8 +2,9 @@
 Pydantic request models for Voice Cloning API
 """
 from pydantic import BaseModel, Field, field_validator
-from typing import Optional
-from app.config.settings import DEFAULT_SPEAKERS
+from typing import Optional, List, Literal
+from urllib.parse import urlsplit
+from app.config.settings import DEFAULT_SPEAKERS, JOB_MAX_TEXT_LENGTH
 
 class VoiceCloneRequest(BaseModel):
     """Request model for voice cloning with existing embedding"""
@@ -12,6 +13,14 @@ class VoiceCloneRequest(BaseModel):
     speaker: Optional[str] = Field(None, description="Speaker voice to use")
     speed: float = Field(default=0.9, ge=0.1, le=2.0, description="Speech speed")
     target_embedding_name: str = Field(..., description="Name to target voice embedding file")
+    stream: bool = Field(default=False, description="Stream audio sentence by sentence as it is synthesized")
+    output_format: Literal["wav", "flac", "mp3", "opus", "pcm"] = Field(
+        default="wav",
+        description="Audio encoding: wav, flac, mp3, opus (Ogg Opus) or pcm (raw s16le mono)"
+    )
+    sample_rate: Optional[int] = Field(
+        None, ge=8000, le=48000, description="Output sample rate; defaults to the model rate (nearest Opus rate for opus)"
+    )
     
     @field_validator('speaker', mode='before')
     def set_default_speaker(cls, v, values):
@@ -40,3 +49,53 @@ class VoiceCloneWithFileRequest(BaseModel):
             return DEFAULT_SPEAKERS[language]
         # Fallback to VI-hue if no default speaker for the language
         return "VI-hue"
+
+class BatchCloneItem(BaseModel):
+    """One text of a batch clone request; unset fields use the batch defaults"""
+    text: str = Field(..., description="Text to convert to speech")
+    speaker: Optional[str] = Field(None, description="Speaker voice to use")
+    speed: Optional[float] = Field(None, ge=0.1, le=2.0, description="Speech speed")
+
+class BatchCloneRequest(BaseModel):
+    """Request model for cloning many texts into one target voice"""
+    items: List[BatchCloneItem] = Field(..., min_length=1, description="Texts to synthesize")
+    target_embedding_name: str = Field(..., description="Name to target voice embedding file")
+    language: str = Field(default="VI", description="Language code (VI, EN, ZH, JP, KR)")
+    speaker: Optional[str] = Field(None, description="Default speaker voice for items")
+    speed: float = Field(default=0.9, ge=0.1, le=2.0, description="Default speech speed for items")
+    response_format: Literal["ndjson", "multipart"] = Field(
+        default="ndjson",
+        description="ndjson: one JSON line with base64 audio per item; multipart: multipart/mixed audio parts"
+    )
+    output_format: Literal["wav", "flac", "mp3", "opus", "pcm"] = Field(
+        default="wav",
+        description="Audio encoding of every item: wav, flac, mp3, opus (Ogg Opus) or pcm (raw s16le mono)"
+    )
+    sample_rate: Optional[int] = Field(
+        None, ge=8000, le=48000, description="Output sample rate; defaults to the model rate (nearest Opus rate for opus)"
+    )
+
+class JobRequest(BaseModel):
+    """Request model for an asynchronous synthesis job"""
+    text: str = Field(..., min_length=1, max_length=JOB_MAX_TEXT_LENGTH, description="Text to convert to speech")
+    language: str = Field(default="VI", description="Language code (VI, EN, ZH, JP, KR)")
+    speaker: Optional[str] = Field(None, description="Speaker voice to use")
+    speed: float = Field(default=0.9, ge=0.1, le=2.0, description="Speech speed")
+    target_embedding_name: str = Field(..., description="Name to target voice embedding file")
+    output_format: Literal["wav", "flac", "mp3", "opus", "pcm"] = Field(
+        default="wav",
+        description="Audio encoding: wav, flac, mp3, opus (Ogg Opus) or pcm (raw s16le mono)"
+    )
+    sample_rate: Optional[int] = Field(
+        None, ge=8000, le=48000, description="Output sample rate; defaults to the model rate (nearest Opus rate for opus)"
+    )
+    callback_url: Optional[str] = Field(
+        None, description="URL the finished job is POSTed to as JSON; must resolve to a public address"
+    )
+
+    @field_validator('callback_url')
+    def check_callback_url(cls, v):
+        # Where the host resolves to is checked by the job queue, off the event loop
+        if v is not None and (urlsplit(v).scheme not in ('http', 'https') or not urlsplit(v).hostname):
+            raise ValueError("callback_url must be an http or https URL with a host")
+        return v
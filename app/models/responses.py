@@ -15,6 +15,31 @@ class VoiceExtractionResponse(BaseModel):
     """Voice extraction response"""
     audio_name: str
     embedding_name: Optional[str] = None
+    deduplicated: bool = False
+
+class BatchExtractionItem(BaseModel):
+    """Per-file result of batch voice extraction"""
+    index: int
+    filename: str
+    audio_name: Optional[str] = None
+    embedding_name: Optional[str] = None
+    deduplicated: bool = False
+    error: Optional[str] = None
+
+class BatchVoiceExtractionResponse(BaseModel):
+    """Batch voice extraction response"""
+    results: List[BatchExtractionItem]
+
+class SimilarVoice(BaseModel):
+    """One stored voice and its cosine similarity to the query"""
+    embedding_name: str
+    audio_name: Optional[str] = None
+    score: float
+
+class SimilarVoicesResponse(BaseModel):
+    """Nearest stored voices, most similar first"""
+    embedding_name: Optional[str] = None
+    matches: List[SimilarVoice]
 
 class VoiceCloneResponse(BaseModel):
     """Voice cloning response"""
@@ -36,6 +61,28 @@ class SpeakersResponse(BaseModel):
 class FileListResponse(BaseModel):
     """File list response"""
     files: List[Dict[str, Union[str, int]]]
+    next_cursor: Optional[str] = None
+    total_count: Optional[int] = None
+    total_bytes: Optional[int] = None
+
+class JobResponse(BaseModel):
+    """State and progress of an asynchronous synthesis job"""
+    job_id: str
+    status: str
+    chunks_total: Optional[int] = None
+    chunks_done: int = 0
+    progress: float = 0.0
+    audio_seconds: float = 0.0
+    output_format: str
+    sample_rate: Optional[int] = None  # resolved when the job starts if not requested
+    result_url: Optional[str] = None
+    result_bytes: Optional[int] = None
+    error: Optional[str] = None
+    callback_url: Optional[str] = None
+    callback_state: Optional[str] = None
+    created_at: float
+    started_at: Optional[float] = None
+    finished_at: Optional[float] = None
 
 class ErrorResponse(BaseModel):
     """Error response"""
@@ -0,0 +1,148 @@
+"""
+Admission control for inference requests
+"""
+import math
+import time
+import asyncio
+from contextlib import asynccontextmanager
+from typing import List
+from fastapi import HTTPException
+
+from app.config.settings import (
+    ADMISSION_MAX_COST, ADMISSION_CHARS_PER_UNIT, MAX_WORKERS, logger
+)
+
+class Reservation:
+    """Capacity held by one admitted request
+
+    `release` is idempotent, so every path that can end the request (the
+    body generator, the response, an error during setup) may call it.
+    """
+
+    def __init__(self, controller: "AdmissionController", cost: float):
+        self.controller = controller
+        self.cost = cost
+        self.start = time.perf_counter()
+        self.released = False
+
+    def release(self) -> None:
+        """Return the capacity, once"""
+        if not self.released:
+            self.released = True
+            self.controller.release(self.cost, time.perf_counter() - self.start)
+
+class AdmissionController:
+    """Bound outstanding inference work and reject the excess fast
+
+    Each request is assigned a cost estimated from its text length. When the
+    outstanding cost would exceed `max_cost`, the request is rejected with
+    429 and a Retry-After derived from the observed seconds per cost unit.
+    A request is always admitted when nothing else is in flight, so one
+    oversized request cannot be rejected forever. Background work (queued
+    jobs) waits for capacity instead of being rejected.
+
+    Only used from the event loop thread, so no locking is needed.
+    """
+
+    def __init__(
+        self,
+        max_cost: float = ADMISSION_MAX_COST,
+        chars_per_unit: int = ADMISSION_CHARS_PER_UNIT,
+        workers: int = MAX_WORKERS
+    ):
+        self.max_cost = max_cost
+        self.chars_per_unit = chars_per_unit
+        self.workers = workers
+        self.in_flight = 0
+        self.cost_in_flight = 0.0
+        self.admitted = 0
+        self.rejected = 0
+        # Background acquisitions waiting for capacity, woken on every release
+        self._waiters: List[asyncio.Future] = []
+        # Exponentially weighted seconds of service time per cost unit
+        self._seconds_per_unit = 1.0
+
+    def estimate_cost(self, text: str) -> float:
+        """Cost of synthesizing `text`"""
+        return max(1.0, len(text) / self.chars_per_unit)
+
+    def retry_after(self) -> int:
+        """Seconds until enough outstanding work should have drained"""
+        return max(1, math.ceil(self.cost_in_flight * self._seconds_per_unit / self.workers))
+
+    def _fits(self, cost: float) -> bool:
+        return self.in_flight == 0 or self.cost_in_flight + cost <= self.max_cost
+
+    def _take(self, cost: float) -> None:
+        self.in_flight += 1
+        self.cost_in_flight += cost
+        self.admitted += 1
+
+    def acquire(self, cost: float) -> None:
+        """Reserve capacity for `cost`, raising 429 if it is exhausted"""
+        if not self._fits(cost):
+            self.rejected += 1
+            retry_after = self.retry_after()
+            logger.warning(f"Rejecting request of cost {cost:.1f}: {self.cost_in_flight:.1f} in flight")
+            raise HTTPException(
+                status_code=429,
+                detail="Server is at capacity, retry later",
+                headers={"Retry-After": str(retry_after)}
+            )
+        self._take(cost)
+
+    async def acquire_waiting(self, cost: float) -> None:
+        """Reserve capacity for `cost`, waiting until it is available"""
+        while not self._fits(cost):
+            waiter = asyncio.get_event_loop().create_future()
+            self._waiters.append(waiter)
+            try:
+                await waiter
+            finally:
+                if waiter in self._waiters:
+                    self._waiters.remove(waiter)
+        self._take(cost)
+
+    def reserve(self, cost: float) -> Reservation:
+        """Acquire `cost` and return a handle that releases it"""
+        self.acquire(cost)
+        return Reservation(self, cost)
+
+    def release(self, cost: float, elapsed: float = None) -> None:
+        """Return capacity reserved by `acquire`"""
+        self.in_flight -= 1
+        self.cost_in_flight = max(0.0, self.cost_in_flight - cost)
+        if elapsed is not None:
+            self._seconds_per_unit = 0.9 * self._seconds_per_unit + 0.1 * (elapsed / cost)
+        waiters, self._waiters = self._waiters, []
+        for waiter in waiters:
+            if not waiter.done():
+                waiter.set_result(None)
+
+    @asynccontextmanager
+    async def admit(self, cost: float, wait: bool = False):
+        """Hold admission for the duration of the block, waiting for it with `wait`"""
+        if wait:
+            await self.acquire_waiting(cost)
+        else:
+            self.acquire(cost)
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.release(cost, time.perf_counter() - start)
+
+    def stats(self) -> dict:
+        """Live queue depth and admission counters"""
+        return {
+            "in_flight": self.in_flight,
+            "cost_in_flight": self.cost_in_flight,
+            "max_cost": self.max_cost,
+            "admitted": self.admitted,
+            "rejected": self.rejected,
+            "waiting": len(self._waiters),
+            "seconds_per_unit": self._seconds_per_unit,
+        }
+
+# Global admission controller instance
+admission_controller = AdmissionController()
@@ -5,72 +5,485 @@ import os
 import uuid
 import torch
 import asyncio
+import numpy as np
+from typing import AsyncIterator, List, Optional, Tuple
 from fastapi import UploadFile, HTTPException
 
-from app.config.settings import OUTPUT_FOLDER, UPLOAD_FOLDER, MAX_FILE_SIZE
-from app.utils.file_utils import get_unique_filename, cleanup_file, allowed_file
-from app.utils.audio_utils import audio_file_to_base64, embedding_to_base64
+from app.config.settings import (
+    UPLOAD_FOLDER, MAX_FILE_SIZE, BATCHING_ENABLED, ADMISSION_EXTRACT_COST,
+    RESULT_CACHE_ENABLED, EXTRACT_BATCH_CONCURRENCY, EXTRACT_BATCH_MAX_FILES,
+    BATCH_CLONE_CONCURRENCY, BATCH_CLONE_MAX_ITEMS, SERVING_MODE, logger
+)
+from app.utils.file_utils import get_unique_filename, cleanup_file_async, allowed_file, save_upload_file
+from app.utils.audio_utils import (
+    audio_file_to_base64, embedding_to_base64, encode_waveform, resample_waveform,
+    output_sample_rate, StreamEncoder
+)
+from app.utils.text_utils import split_text_into_chunks
 from app.services.voice_service import voice_service
+from app.services.embedding_cache import embedding_cache
+from app.services.embedding_store import embedding_store
+from app.services.file_index import file_index
+from app.services.embedding_dedup import embedding_dedup
+from app.services.similarity_index import similarity_index
+from app.services.batch_scheduler import batch_scheduler
+from app.services.admission import admission_controller, Reservation
+from app.services.process_pool import process_pool
+from app.services.result_cache import result_cache
+from app.services.model_registry import model_registry
+from app.services.metrics import metrics, clone_stages, extract_stages
 
 class AudioService:
     """Service for audio processing operations"""
 
+    def __init__(self):
+        # Extractions in flight, keyed by the SHA-256 of the uploaded audio
+        self._pending_extractions = {}
+
     async def extract_voice_embedding(
         self,
         audio_file: UploadFile,
     ) -> dict:
-        """Extract voice embedding from uploaded audio file"""
+        """Extract voice embedding from uploaded audio file
+
+        Uploads are content-addressed: a clip whose SHA-256 was seen before
+        returns the existing embedding without running extraction, and
+        concurrent uploads of the same clip share one extraction.
+        """
         # Validate file
-        if not allowed_file(audio_file.filename):
+        self._validate_upload(audio_file)
+        self._require_inference()
+
+        # Reject early when the node is at capacity
+        async with admission_controller.admit(ADMISSION_EXTRACT_COST):
+            temp_filepath, digest = await self._save_upload(audio_file)
+            try:
+                existing = await self._find_existing(digest)
+                if existing is not None:
+                    return existing
+
+                self._start_extraction(digest)
+                try:
+                    result = await self._extract_and_save(temp_filepath)
+                    await self._finish_extraction(digest, result)
+                except BaseException as e:
+                    self._fail_extraction(digest, e)
+                    raise
+                return result
+
+            finally:
+                # Clean up temp file
+                await cleanup_file_async(temp_filepath)
+
+    async def extract_voice_embeddings(self, audio_files: List[UploadFile]) -> List[dict]:
+        """Extract voice embeddings from several uploaded files
+
+        Uploads are saved and VAD-split in parallel, at most
+        EXTRACT_BATCH_CONCURRENCY at a time, then the speaker encoder runs
+        once over the segments of all files (batched by segment length).
+        Each result carries either the embedding or the error for its file.
+        """
+        if len(audio_files) > EXTRACT_BATCH_MAX_FILES:
             raise HTTPException(
                 status_code=400,
-                detail="File type not supported. Use: wav, mp3, flac, m4a"
+                detail=f"Too many files. Maximum is {EXTRACT_BATCH_MAX_FILES}"
             )
+        self._require_inference()
+
+        semaphore = asyncio.Semaphore(EXTRACT_BATCH_CONCURRENCY)
+        results = [{"index": index, "filename": f.filename} for index, f in enumerate(audio_files)]
+        saved = {}
+
+        async def save(index: int, audio_file: UploadFile) -> None:
+            async with semaphore:
+                try:
+                    self._validate_upload(audio_file)
+                    saved[index] = await self._save_upload(audio_file)
+                except HTTPException as e:
+                    results[index]["error"] = e.detail
+
+        cost = ADMISSION_EXTRACT_COST * min(len(audio_files), EXTRACT_BATCH_CONCURRENCY)
+        async with admission_controller.admit(cost):
+            try:
+                await asyncio.gather(*(save(index, f) for index, f in enumerate(audio_files)))
+
+                # Reuse known embeddings and collapse duplicate clips
+                owners = {}
+                waiting = {}
+                for index, (_, digest) in saved.items():
+                    if digest in owners:
+                        waiting[index] = digest
+                        continue
+                    try:
+                        existing = await self._find_existing(digest)
+                    except Exception as e:
+                        results[index]["error"] = str(e)
+                        continue
+                    if existing is not None:
+                        results[index].update(existing)
+                    else:
+                        owners[digest] = index
+                        self._start_extraction(digest)
+
+                # Split each new clip into voiced segments, in parallel
+                segments = {}
+
+                async def split(digest: str, index: int) -> None:
+                    async with semaphore:
+                        try:
+                            segments[digest] = await self._split_segments(saved[index][0])
+                        except Exception as e:
+                            results[index]["error"] = str(e)
+                            self._fail_extraction(digest, e)
 
-        # Check file size
-        content = await audio_file.read()
-        if len(content) > MAX_FILE_SIZE:
+                await asyncio.gather(*(split(digest, index) for digest, index in owners.items()))
+
+                # One encoder pass over the segments of every clip
+                if segments:
+                    digests = list(segments)
+                    try:
+                        embeddings = await self._encode_segments([segments[d][1] for d in digests])
+                        for digest, target_se in zip(digests, embeddings):
+                            result = {
+                                "audio_name": segments[digest][0],
+                                "embedding_name": await self._save_embedding(target_se, segments[digest][0]),
+                            }
+                            await self._finish_extraction(digest, result)
+                            results[owners[digest]].update(result)
+                    except Exception as e:
+                        for digest in digests:
+                            if digest in self._pending_extractions:
+                                results[owners[digest]]["error"] = str(e)
+                                self._fail_extraction(digest, e)
+
+                for index, digest in waiting.items():
+                    owner = results[owners[digest]]
+                    if "error" in owner:
+                        results[index]["error"] = owner["error"]
+                    else:
+                        results[index].update(
+                            audio_name=owner["audio_name"],
+                            embedding_name=owner["embedding_name"],
+                            deduplicated=True
+                        )
+                return results
+
+            finally:
+                # Clean up temp files
+                await asyncio.gather(*(cleanup_file_async(path) for path, _ in saved.values()))
+
+    @staticmethod
+    def _validate_upload(audio_file: UploadFile) -> None:
+        """Reject files with unsupported extensions"""
+        if not allowed_file(audio_file.filename):
             raise HTTPException(
-                status_code=413,
-                detail="File too large. Maximum size is 50MB"
+                status_code=400,
+                detail="File type not supported. Use: wav, mp3, flac, m4a"
             )
 
-        # Save temporary file
+    @staticmethod
+    async def _save_upload(audio_file: UploadFile) -> Tuple[str, str]:
+        """Stream an upload to a temp file, returning its path and SHA-256"""
+        # Stream upload to a temp file, enforcing the size limit as it arrives
         unique_filename = get_unique_filename(audio_file.filename)
         temp_filepath = os.path.join(UPLOAD_FOLDER, unique_filename)
+        with metrics.time(extract_stages, "upload"):
+            _, digest = await save_upload_file(audio_file, temp_filepath, max_size=MAX_FILE_SIZE)
+        return temp_filepath, digest
 
-        # Write content to temp file
-        with open(temp_filepath, 'wb') as f:
-            f.write(content)
+    async def _find_existing(self, digest: str) -> Optional[dict]:
+        """Result of an earlier or in-flight extraction of the same content"""
+        loop = asyncio.get_event_loop()
+        existing = await loop.run_in_executor(None, embedding_dedup.lookup, digest)
+        if existing is not None:
+            return {**existing, "deduplicated": True}
 
+        # Collapse concurrent uploads of the same clip into one extraction
+        pending = self._pending_extractions.get(digest)
+        if pending is not None:
+            return {**await asyncio.shield(pending), "deduplicated": True}
+        return None
+
+    def _start_extraction(self, digest: str) -> asyncio.Future:
+        """Register an extraction in flight so duplicate uploads can wait on it"""
+        pending = asyncio.get_event_loop().create_future()
+        # Mark the outcome as retrieved even when nobody else waits on it
+        pending.add_done_callback(lambda f: f.cancelled() or f.exception())
+        self._pending_extractions[digest] = pending
+        return pending
+
+    async def _finish_extraction(self, digest: str, result: dict) -> None:
+        """Record a finished extraction and wake duplicate uploads"""
+        loop = asyncio.get_event_loop()
         try:
-            # Extract voice embedding in thread pool
-            loop = asyncio.get_event_loop()
-            target_se, audio_name = await loop.run_in_executor(
-                voice_service.executor,
-                voice_service.extract_voice_embedding,
-                temp_filepath
+            await loop.run_in_executor(
+                None, embedding_dedup.record, digest, result["embedding_name"], result["audio_name"]
             )
+        finally:
+            pending = self._pending_extractions.pop(digest)
+            pending.set_result(result)
+
+    def _fail_extraction(self, digest: str, error: BaseException) -> None:
+        """Propagate a failed extraction to duplicate uploads"""
+        pending = self._pending_extractions.pop(digest, None)
+        if pending is None or pending.done():
+            return
+        if isinstance(error, asyncio.CancelledError):
+            pending.cancel()
+        else:
+            pending.set_exception(error)
+
+    async def _save_embedding(self, target_se: torch.Tensor, audio_name: str) -> str:
+        """Save an embedding under a new name in the embedding store, returning the name"""
+        loop = asyncio.get_event_loop()
+        unique_id = str(uuid.uuid4())[:8]
+        with metrics.time(extract_stages, "save"):
+            await loop.run_in_executor(None, embedding_store.append, unique_id, target_se, audio_name)
+        await loop.run_in_executor(None, file_index.add_embedding, unique_id)
+        await loop.run_in_executor(None, similarity_index.add, unique_id, target_se)
+        return unique_id
+
+    async def _extract_and_save(self, filepath: str) -> dict:
+        """Run embedding extraction on an audio file and save the embedding"""
+        # Segmentation and encoding run as separate steps so each is timed
+        audio_name, segments = await self._split_segments(filepath)
+        target_se, = await self._encode_segments([segments])
 
-            result = {
-                "audio_name": audio_name
-            }
+        return {
+            "audio_name": audio_name,
+            "embedding_name": await self._save_embedding(target_se, audio_name)
+        }
 
-            # Save embedding to file
-            unique_id = str(uuid.uuid4())[:8]
-            se_filename = f"{unique_id}.pth"
-            se_filepath = os.path.join(OUTPUT_FOLDER, se_filename)
-            torch.save(target_se, se_filepath)
+    async def _split_segments(self, filepath: str) -> Tuple[str, List[str]]:
+        """VAD-split an audio file in a worker process or the thread pool"""
+        if process_pool.started:
+            return await process_pool.split_voice_segments(filepath)
+        loop = asyncio.get_event_loop()
+        return await loop.run_in_executor(
+            voice_service.executor,
+            metrics.queued(extract_stages, voice_service.split_voice_segments, filepath)
+        )
 
-            result.update({
-                "embedding_name": unique_id
+    async def _encode_segments(self, segment_lists: List[List[str]]) -> List[torch.Tensor]:
+        """Batched speaker encoding in a worker process or the thread pool"""
+        if process_pool.started:
+            return await process_pool.encode_voice_segments(segment_lists)
+        loop = asyncio.get_event_loop()
+        return await loop.run_in_executor(
+            voice_service.executor,
+            metrics.queued(extract_stages, voice_service.encode_voice_segments, segment_lists)
+        )
+
+    @staticmethod
+    def _search_similar(target_se, k: int, exclude: Optional[str] = None) -> List[dict]:
+        """Top-k stored voices nearest to an embedding, with their source audio names"""
+        similarity_index.ensure_built()
+        matches = []
+        for name, score in similarity_index.query(target_se, k, exclude):
+            metadata = embedding_store.metadata(name)
+            matches.append({
+                "embedding_name": name,
+                "audio_name": metadata["audio_name"] if metadata else None,
+                "score": score,
             })
+        return matches
+
+    async def find_similar_voices(self, embedding_name: str, k: int) -> dict:
+        """Stored voices nearest to a stored embedding, leaving out the embedding itself"""
+        loop = asyncio.get_event_loop()
+        target_se = await loop.run_in_executor(None, similarity_index.vector, embedding_name)
+        if target_se is None:
+            target_se = await loop.run_in_executor(None, embedding_cache.get, embedding_name)
+        if target_se is None:
+            raise HTTPException(
+                status_code=404,
+                detail="Embedding not found"
+            )
+        matches = await loop.run_in_executor(None, self._search_similar, target_se, k, embedding_name)
+        return {"embedding_name": embedding_name, "matches": matches}
 
-            return result
+    async def find_similar_to_clip(self, audio_file: UploadFile, k: int) -> dict:
+        """Stored voices nearest to the voice in an uploaded clip
 
-        finally:
-            # Clean up temp file
-            cleanup_file(temp_filepath)
+        A clip extracted before is looked up by content hash and its stored
+        embedding used; otherwise the embedding is computed but not saved.
+        """
+        self._validate_upload(audio_file)
+        self._require_inference()
+        loop = asyncio.get_event_loop()
+
+        async with admission_controller.admit(ADMISSION_EXTRACT_COST):
+            temp_filepath, digest = await self._save_upload(audio_file)
+            try:
+                existing = await self._find_existing(digest)
+                embedding_name = existing["embedding_name"] if existing else None
+                target_se = None
+                if embedding_name is not None:
+                    target_se = await loop.run_in_executor(None, embedding_cache.get, embedding_name)
+                if target_se is None:
+                    embedding_name = None
+                    _, segments = await self._split_segments(temp_filepath)
+                    target_se, = await self._encode_segments([segments])
+            finally:
+                await cleanup_file_async(temp_filepath)
+
+        matches = await loop.run_in_executor(None, self._search_similar, target_se, k)
+        return {"embedding_name": embedding_name, "matches": matches}
+
+    @staticmethod
+    def inference_ready() -> bool:
+        """Check if inference can be served
+
+        In process mode that is once the workers have forked: nothing may run
+        inference on this process's threads before then, since a worker
+        forked while such a thread holds a lock (a model slot, the metrics or
+        front-end cache lock) would inherit it held and deadlock.
+        """
+        if SERVING_MODE == "process":
+            return process_pool.started
+        return voice_service.is_models_loaded()
+
+    def _require_inference(self) -> None:
+        """Reject with 503 until inference can be served"""
+        if SERVING_MODE == "process" and process_pool.exhausted:
+            # Dead workers are not respawned (see InferenceProcessPool), so retrying will not help
+            raise HTTPException(
+                status_code=503,
+                detail="No inference workers left; the service must be restarted"
+            )
+        if not self.inference_ready():
+            raise HTTPException(
+                status_code=503,
+                detail="Models are still loading",
+                headers={"Retry-After": "5"}
+            )
+
+    async def _get_target_embedding(self, target_embedding_name: str) -> torch.Tensor:
+        """Resolve a target embedding and make sure models are ready"""
+        # Load target voice embedding (cached on the device); a miss reads the store
+        loop = asyncio.get_event_loop()
+        with metrics.time(clone_stages, "embedding_load"):
+            target_se = await loop.run_in_executor(None, embedding_cache.get, target_embedding_name)
+        if target_se is None:
+            raise HTTPException(
+                status_code=400,
+                detail="Target voice embedding file not found"
+            )
+
+        self._require_inference()
+        return target_se
+
+    async def _synthesize(
+        self,
+        text: str,
+        language: str,
+        speaker: str,
+        speed: float,
+        target_se: torch.Tensor,
+    ) -> np.ndarray:
+        """Generate a cloned waveform, through the batch scheduler or worker processes when enabled"""
+        if BATCHING_ENABLED:
+            return await batch_scheduler.submit(text, language, speaker, speed, target_se)
+        if process_pool.started:
+            return await process_pool.generate_cloned_voice(text, language, speaker, speed, target_se)
+
+        # Generate cloned voice in thread pool, entirely in memory
+        loop = asyncio.get_event_loop()
+        return await loop.run_in_executor(
+            voice_service.executor,
+            metrics.queued(
+                clone_stages,
+                voice_service.generate_cloned_voice,
+                text,
+                language,
+                speaker,
+                speed,
+                target_se
+            )
+        )
+
+    async def synthesize_background(
+        self,
+        text: str,
+        language: str,
+        speaker: str,
+        speed: float,
+        target_se: torch.Tensor,
+    ) -> np.ndarray:
+        """Generate a cloned waveform for background work such as queued jobs
+
+        Holds admission for the cost of `text` like interactive requests, but
+        waits for capacity instead of being rejected with 429.
+        """
+        async with admission_controller.admit(admission_controller.estimate_cost(text), wait=True):
+            return await self._synthesize(text, language, speaker, speed, target_se)
+
+    @staticmethod
+    def output_rate(audio_format: str, sample_rate: Optional[int] = None) -> int:
+        """Sample rate a response in `audio_format` is encoded at; 400 if the codec cannot use it
+
+        The default rate needs the converter loaded; a requested rate is
+        only checked against the codec, so it can be validated during warm-up.
+        """
+        try:
+            source_rate = voice_service.output_sample_rate if sample_rate is None else None
+            return output_sample_rate(audio_format, source_rate, sample_rate)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+
+    @staticmethod
+    def _encode(audio: np.ndarray, audio_format: str, sample_rate: int) -> bytes:
+        """Resample a converted waveform and encode it (runs in a worker thread)"""
+        with metrics.time(clone_stages, "encode"):
+            audio = resample_waveform(audio, voice_service.output_sample_rate, sample_rate)
+            return encode_waveform(audio, sample_rate, audio_format)
+
+    async def _render(
+        self,
+        text: str,
+        language: str,
+        speaker: str,
+        speed: float,
+        target_embedding_name: str,
+        target_se: torch.Tensor,
+        audio_format: str = "wav",
+        sample_rate: Optional[int] = None,
+        admit: bool = True
+    ) -> Tuple[bytes, bool]:
+        """Synthesize encoded audio through the result cache when enabled
+
+        Returns the bytes and whether they were a cache hit. With `admit`
+        set, synthesis holds admission for the cost of `text`. Encoding runs
+        off the event loop.
+        """
+        sample_rate = self.output_rate(audio_format, sample_rate)
+
+        async def render() -> bytes:
+            if admit:
+                async with admission_controller.admit(admission_controller.estimate_cost(text)):
+                    audio = await self._synthesize(text, language, speaker, speed, target_se)
+            else:
+                audio = await self._synthesize(text, language, speaker, speed, target_se)
+            loop = asyncio.get_event_loop()
+            return await loop.run_in_executor(None, self._encode, audio, audio_format, sample_rate)
+
+        if not RESULT_CACHE_ENABLED:
+            return await render(), False
+
+        # May read (or download) the language's config and stat the store, so off the event loop
+        loop = asyncio.get_event_loop()
+        resolved_speaker = await loop.run_in_executor(None, model_registry.resolve_speaker, language, speaker)
+        embedding = await loop.run_in_executor(None, embedding_cache.identity, target_embedding_name)
+        key = result_cache.make_key(
+            text=text,
+            language=language,
+            speaker=resolved_speaker,
+            speed=speed,
+            embedding=embedding,
+            format=audio_format,
+            sample_rate=sample_rate
+        )
+        return await result_cache.get_or_create(key, render)
 
     async def clone_voice_with_embedding(
         self,
@@ -79,50 +492,133 @@ class AudioService:
         speaker: str,
         speed: float,
         target_embedding_name: str,
-    ) -> str:
-        """Clone voice using existing embedding file"""
-        path = f"{OUTPUT_FOLDER}/{target_embedding_name}.pth"
-        if not os.path.exists(path):
+        audio_format: str = "wav",
+        sample_rate: Optional[int] = None,
+    ) -> Tuple[bytes, bool]:
+        """Clone voice using existing embedding file
+
+        Returns audio encoded as `audio_format` and whether it was served
+        from the result cache.
+        """
+        target_se = await self._get_target_embedding(target_embedding_name)
+        return await self._render(
+            text, language, speaker, speed, target_embedding_name, target_se, audio_format, sample_rate
+        )
+
+    async def clone_voice_batch(
+        self,
+        items: List[dict],
+        target_embedding_name: str,
+        audio_format: str = "wav",
+        sample_rate: Optional[int] = None,
+    ) -> Tuple[AsyncIterator[Tuple[int, Optional[bytes], Optional[str]]], Reservation]:
+        """Clone many texts into one target voice, yielding results as they complete
+
+        `items` are dicts with text, language, speaker and speed. The
+        embedding is resolved once; at most BATCH_CLONE_CONCURRENCY items
+        are in flight, so with micro-batching enabled they are grouped into
+        batched forward passes. The returned stream yields
+        (index, audio_bytes, error) in completion order. Admission covers the
+        batch's parallel footprint; its reservation is returned with the
+        stream and, as for `stream_cloned_voice`, must be released by the
+        caller when the response ends.
+        """
+        if len(items) > BATCH_CLONE_MAX_ITEMS:
             raise HTTPException(
                 status_code=400,
-                detail="Target voice embedding file not found"
+                detail=f"Too many items. Maximum is {BATCH_CLONE_MAX_ITEMS}"
             )
+        target_se = await self._get_target_embedding(target_embedding_name)
+        sample_rate = self.output_rate(audio_format, sample_rate)
 
-        if not voice_service.is_models_loaded():
-            raise HTTPException(
-                status_code=500,
-                detail="Models not loaded"
-            )
+        concurrency = min(len(items), BATCH_CLONE_CONCURRENCY) or 1
+        mean_cost = sum(admission_controller.estimate_cost(item["text"]) for item in items) / max(len(items), 1)
+        reservation = admission_controller.reserve(mean_cost * concurrency)
+        semaphore = asyncio.Semaphore(concurrency)
 
-        # Load target voice embedding
-        target_se = torch.load(path, map_location=voice_service.device)
+        async def run(index: int, item: dict) -> Tuple[int, Optional[bytes], Optional[str]]:
+            async with semaphore:
+                try:
+                    audio, _ = await self._render(
+                        item["text"], item["language"], item["speaker"], item["speed"],
+                        target_embedding_name, target_se, audio_format, sample_rate, admit=False
+                    )
+                    return index, audio, None
+                except Exception as e:
+                    logger.error(f"Error in batch clone item {index}: {e}")
+                    return index, None, str(e)
 
-        # Prepare paths
-        unique_id = str(uuid.uuid4())[:8]
-        src_path = os.path.join(OUTPUT_FOLDER, f'tmp_{unique_id}.wav')
-        output_path = os.path.join(OUTPUT_FOLDER, f'cloned_voice_{unique_id}.wav')
+        async def stream() -> AsyncIterator[Tuple[int, Optional[bytes], Optional[str]]]:
+            tasks = [asyncio.ensure_future(run(index, item)) for index, item in enumerate(items)]
+            try:
+                for next_done in asyncio.as_completed(tasks):
+                    yield await next_done
+            finally:
+                for task in tasks:
+                    task.cancel()
+                reservation.release()
+
+        return stream(), reservation
+
+    async def stream_cloned_voice(
+        self,
+        text: str,
+        language: str,
+        speaker: str,
+        speed: float,
+        target_embedding_name: str,
+        audio_format: str = "wav",
+        sample_rate: Optional[int] = None,
+    ) -> Tuple[AsyncIterator[bytes], Reservation]:
+        """Clone voice sentence by sentence, returning an encoded byte stream
 
+        Validation and admission happen before the stream is returned so
+        errors still map to HTTP status codes. The admission reservation is
+        returned with the stream; the caller must release it when the
+        response ends, since a stream that is never iterated (the client left
+        before the body started) never runs its own cleanup. The stream
+        yields the container header, then the encoded audio of each chunk as
+        it finishes (WAV uses a header of unknown length); the next chunk is
+        synthesized while the current one is encoded and sent.
+        """
+        target_se = await self._get_target_embedding(target_embedding_name)
+        sample_rate = self.output_rate(audio_format, sample_rate)
+        reservation = admission_controller.reserve(admission_controller.estimate_cost(text))
         try:
-            # Generate cloned voice in thread pool
-            loop = asyncio.get_event_loop()
-            await loop.run_in_executor(
-                voice_service.executor,
-                voice_service.generate_cloned_voice,
-                text,
-                language,
-                speaker,
-                speed,
-                target_se,
-                src_path,
-                output_path
-            )
+            chunks = split_text_into_chunks(text)
+            encoder = StreamEncoder(audio_format, sample_rate)
+        except BaseException:
+            reservation.release()
+            raise
+        loop = asyncio.get_event_loop()
 
-            return output_path
+        def encode(audio: np.ndarray) -> bytes:
+            with metrics.time(clone_stages, "encode"):
+                return encoder.write(resample_waveform(audio, voice_service.output_sample_rate, sample_rate))
 
-        finally:
-            print("đ")
-            # Clean up temp file
-            # cleanup_file(src_path)
+        def submit(chunk: str) -> asyncio.Future:
+            return loop.create_task(self._synthesize(chunk, language, speaker, speed, target_se))
+
+        async def stream() -> AsyncIterator[bytes]:
+            pending = None
+            try:
+                header = encoder.begin()
+                if header:
+                    yield header
+                pending = submit(chunks[0]) if chunks else None
+                for index in range(len(chunks)):
+                    audio = await pending
+                    pending = submit(chunks[index + 1]) if index + 1 < len(chunks) else None
+                    data = await loop.run_in_executor(None, encode, audio)
+                    if data:
+                        yield data
+                yield encoder.close()
+            finally:
+                if pending is not None:
+                    pending.cancel()
+                reservation.release()
+
+        return stream(), reservation
 
 # Global audio service instance
 audio_service = AudioService()
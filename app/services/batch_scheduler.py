@@ -0,0 +1,142 @@
+"""
+Dynamic micro-batching scheduler for voice cloning requests
+"""
+import asyncio
+import torch
+import numpy as np
+from collections import defaultdict
+from dataclasses import dataclass
+from typing import Optional
+
+from app.config.settings import BATCH_MAX_SIZE, BATCH_MAX_WAIT_MS, logger
+from app.services.voice_service import voice_service
+from app.services.process_pool import process_pool
+from app.services.metrics import metrics, clone_stages
+
+@dataclass
+class _PendingClone:
+    """A clone request waiting to be batched"""
+    text: str
+    language: str
+    speaker: str
+    speed: float
+    target_se: torch.Tensor
+    future: asyncio.Future
+
+class BatchScheduler:
+    """Collect concurrent clone requests and run them as batches
+
+    Requests arriving within `max_wait_ms` of the first queued one (up to
+    `max_batch_size`) are grouped by language, speaker and speed, and each
+    group runs as one batched MeloTTS + tone conversion pass on the
+    voice service executor, or in a worker process in process serving mode.
+    """
+
+    def __init__(self, max_batch_size: int = BATCH_MAX_SIZE, max_wait_ms: float = BATCH_MAX_WAIT_MS):
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000
+        self.batches_run = 0
+        self.requests_batched = 0
+        self._queue: Optional[asyncio.Queue] = None
+        self._task: Optional[asyncio.Task] = None
+
+    def _ensure_started(self) -> None:
+        """Start the collector on the running event loop"""
+        if self._task is None or self._task.done():
+            self._queue = asyncio.Queue()
+            self._task = asyncio.get_event_loop().create_task(self._collect())
+
+    async def submit(
+        self,
+        text: str,
+        language: str,
+        speaker: str,
+        speed: float,
+        target_se: torch.Tensor
+    ) -> np.ndarray:
+        """Queue a clone request and wait for its converted waveform"""
+        self._ensure_started()
+        future = asyncio.get_event_loop().create_future()
+        await self._queue.put(_PendingClone(text, language, speaker, speed, target_se, future))
+        return await future
+
+    async def _collect(self) -> None:
+        """Gather requests into batches and dispatch them per group"""
+        loop = asyncio.get_event_loop()
+        while True:
+            batch = [await self._queue.get()]
+            deadline = loop.time() + self.max_wait
+            while len(batch) < self.max_batch_size:
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(self._queue.get(), timeout))
+                except asyncio.TimeoutError:
+                    break
+
+            groups = defaultdict(list)
+            for item in batch:
+                if not item.future.cancelled():
+                    groups[(item.language, item.speaker, item.speed)].append(item)
+            for items in groups.values():
+                loop.create_task(self._run_group(items))
+
+    async def _run_group(self, items: list) -> None:
+        """Run one batch on the executor and resolve the waiting futures"""
+        first = items[0]
+        loop = asyncio.get_event_loop()
+        texts = [item.text for item in items]
+        target_ses = [item.target_se for item in items]
+        try:
+            if process_pool.started:
+                results = await process_pool.generate_cloned_voice_batch(
+                    texts, first.language, first.speaker, first.speed, target_ses
+                )
+            else:
+                results = await loop.run_in_executor(
+                    voice_service.executor,
+                    metrics.queued(
+                        clone_stages,
+                        voice_service.generate_cloned_voice_batch,
+                        texts,
+                        first.language,
+                        first.speaker,
+                        first.speed,
+                        target_ses
+                    )
+                )
+        except Exception as e:
+            logger.error(f"Error in batched clone of {len(items)} requests: {e}")
+            for item in items:
+                if not item.future.done():
+                    item.future.set_exception(e)
+            return
+
+        self.batches_run += 1
+        self.requests_batched += len(items)
+        for item, audio in zip(items, results):
+            if not item.future.done():
+                item.future.set_result(audio)
+
+    def stats(self) -> dict:
+        """Batch counters and current queue depth"""
+        return {
+            "batches_run": self.batches_run,
+            "requests_batched": self.requests_batched,
+            "mean_batch_size": self.requests_batched / self.batches_run if self.batches_run else 0.0,
+            "queued": self._queue.qsize() if self._queue is not None else 0,
+        }
+
+    async def shutdown(self) -> None:
+        """Stop the collector task"""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+# Global batch scheduler instance
+batch_scheduler = BatchScheduler()
@@ -0,0 +1,108 @@
+"""
+In-process LRU cache of target speaker embeddings
+"""
+import os
+import threading
+import torch
+from collections import OrderedDict
+from typing import Optional
+
+from app.config.settings import OUTPUT_FOLDER, EMBEDDING_CACHE_SIZE, DEVICE, logger
+from app.services.embedding_store import embedding_store
+
+class EmbeddingCache:
+    """Bounded LRU cache of embeddings already copied to the inference device"""
+
+    def __init__(self, capacity: int = EMBEDDING_CACHE_SIZE, device: str = DEVICE):
+        self.capacity = capacity
+        self.device = device
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        # Bumped by every invalidation; a load that raced one is not cached
+        self._generation = 0
+
+    @staticmethod
+    def embedding_path(name: str) -> str:
+        """Path of the .pth file backing an embedding name"""
+        return os.path.join(OUTPUT_FOLDER, f"{name}.pth")
+
+    def get(self, name: str) -> Optional[torch.Tensor]:
+        """Return the embedding for `name`, loading it on a miss
+
+        Looks in the embedding store first, then for a legacy .pth file.
+        Returns None when neither has the name. The load runs outside the
+        lock, so it is only cached if no invalidation happened meanwhile;
+        otherwise a voice deleted during the load would stay in the cache.
+        """
+        with self._lock:
+            tensor = self._entries.get(name)
+            if tensor is not None:
+                self._entries.move_to_end(name)
+                self.hits += 1
+                return tensor
+            self.misses += 1
+            generation = self._generation
+
+        tensor = embedding_store.get(name, device=self.device)
+        if tensor is None:
+            # Embeddings saved before the store existed
+            path = self.embedding_path(name)
+            if not os.path.exists(path):
+                return None
+            tensor = torch.load(path, map_location=self.device)
+
+        with self._lock:
+            if self.capacity > 0 and generation == self._generation:
+                self._entries[name] = tensor
+                self._entries.move_to_end(name)
+                while len(self._entries) > self.capacity:
+                    self._entries.popitem(last=False)
+        return tensor
+
+    def exists(self, name: str) -> bool:
+        """Check if an embedding exists in the store or as a legacy .pth file"""
+        return embedding_store.contains(name) or os.path.exists(self.embedding_path(name))
+
+    def identity(self, name: str) -> str:
+        """Name plus creation time, so a replaced embedding changes identity"""
+        metadata = embedding_store.metadata(name)
+        if metadata is not None:
+            return f"{name}:{metadata['created_at']}"
+        try:
+            mtime = os.stat(self.embedding_path(name)).st_mtime_ns
+        except OSError:
+            mtime = 0
+        return f"{name}:{mtime}"
+
+    def invalidate(self, name: str) -> bool:
+        """Drop a cached embedding, e.g. after it was deleted"""
+        with self._lock:
+            self._generation += 1
+            removed = self._entries.pop(name, None) is not None
+        if removed:
+            logger.info(f"Invalidated cached embedding: {name}")
+        return removed
+
+    def clear(self) -> None:
+        """Drop every cached embedding"""
+        with self._lock:
+            self._generation += 1
+            self._entries.clear()
+
+    def stats(self) -> dict:
+        """Cache size and hit/miss counters"""
+        with self._lock:
+            size = len(self._entries)
+        total = self.hits + self.misses
+        return {
+            "size": size,
+            "capacity": self.capacity,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / total if total else 0.0,
+        }
+
+# Global embedding cache instance
+embedding_cache = EmbeddingCache()
@@ -0,0 +1,90 @@
+"""
+Persistent content hash -> embedding index for deduplicating extractions
+"""
+import os
+import time
+import sqlite3
+import threading
+from typing import Optional
+
+from app.config.settings import EMBEDDING_DEDUP_DB, logger
+from app.services.embedding_cache import embedding_cache
+
+class EmbeddingDedupIndex:
+    """Map the SHA-256 of uploaded reference audio to the embedding it produced
+
+    Backed by SQLite so the index survives restarts. A hit is only returned
+    while the embedding file it points to still exists.
+    """
+
+    def __init__(self, db_path: str = EMBEDDING_DEDUP_DB):
+        self.db_path = db_path
+        self.hits = 0
+        self.misses = 0
+        self._conn = None
+        self._lock = threading.Lock()
+
+    def _connection(self) -> sqlite3.Connection:
+        """Open the database on first use"""
+        if self._conn is None:
+            os.makedirs(os.path.dirname(self.db_path) or '.', exist_ok=True)
+            self._conn = sqlite3.connect(self.db_path, check_same_thread=False)
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS embeddings ("
+                "sha256 TEXT PRIMARY KEY, embedding_name TEXT NOT NULL, "
+                "audio_name TEXT, created_at REAL NOT NULL)"
+            )
+            self._conn.execute(
+                "CREATE INDEX IF NOT EXISTS embeddings_by_name ON embeddings (embedding_name)"
+            )
+            self._conn.commit()
+        return self._conn
+
+    def lookup(self, digest: str) -> Optional[dict]:
+        """Return the extraction result recorded for `digest`, if still valid"""
+        with self._lock:
+            row = self._connection().execute(
+                "SELECT embedding_name, audio_name FROM embeddings WHERE sha256 = ?", (digest,)
+            ).fetchone()
+        if row is None or not embedding_cache.exists(row[0]):
+            self.misses += 1
+            return None
+        self.hits += 1
+        return {"embedding_name": row[0], "audio_name": row[1]}
+
+    def record(self, digest: str, embedding_name: str, audio_name: str) -> None:
+        """Remember the embedding extracted from content with `digest`"""
+        with self._lock:
+            conn = self._connection()
+            conn.execute(
+                "INSERT OR REPLACE INTO embeddings VALUES (?, ?, ?, ?)",
+                (digest, embedding_name, audio_name, time.time())
+            )
+            conn.commit()
+
+    def forget_embedding(self, embedding_name: str) -> None:
+        """Drop entries pointing at a deleted embedding"""
+        with self._lock:
+            conn = self._connection()
+            deleted = conn.execute(
+                "DELETE FROM embeddings WHERE embedding_name = ?", (embedding_name,)
+            ).rowcount
+            conn.commit()
+        if deleted:
+            logger.info(f"Removed dedup entry for embedding: {embedding_name}")
+
+    def stats(self) -> dict:
+        """Index size and hit/miss counters"""
+        with self._lock:
+            size = self._connection().execute("SELECT COUNT(*) FROM embeddings").fetchone()[0]
+        return {"size": size, "hits": self.hits, "misses": self.misses}
+
+    def close(self) -> None:
+        """Close the database connection"""
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+# Global embedding dedup index instance
+embedding_dedup = EmbeddingDedupIndex()
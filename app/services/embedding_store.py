@@ -0,0 +1,194 @@
+"""
+Packed, memory-mapped store of voice embeddings
+"""
+import os
+import json
+import time
+import sqlite3
+import threading
+import numpy as np
+import torch
+from typing import Dict, List, Optional, Tuple
+
+from app.config.settings import EMBEDDING_STORE_FOLDER, logger
+
+class EmbeddingStore:
+    """All embeddings as rows of one float32 file plus a SQLite index
+
+    `vectors.f32` holds one flattened embedding per row and is read through
+    a memory map; `index.sqlite3` maps names to rows with their metadata.
+    Rows of deleted embeddings are reused by later appends. The vector is
+    written before the index row is committed, so a crash never leaves an
+    index entry pointing at missing data.
+    """
+
+    def __init__(self, folder: str = EMBEDDING_STORE_FOLDER):
+        self.folder = folder
+        self.vectors_path = os.path.join(folder, 'vectors.f32')
+        self.index_path = os.path.join(folder, 'index.sqlite3')
+        self.dim: Optional[int] = None
+        self.shape: Optional[Tuple[int, ...]] = None
+        self._conn: Optional[sqlite3.Connection] = None
+        self._map: Optional[np.memmap] = None
+        self._lock = threading.RLock()
+
+    def _connection(self) -> sqlite3.Connection:
+        """Open the index on first use"""
+        if self._conn is None:
+            os.makedirs(self.folder, exist_ok=True)
+            conn = sqlite3.connect(self.index_path, check_same_thread=False)
+            conn.executescript(
+                "CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT NOT NULL);"
+                "CREATE TABLE IF NOT EXISTS embeddings ("
+                "name TEXT PRIMARY KEY, row INTEGER NOT NULL UNIQUE, "
+                "audio_name TEXT, created_at REAL NOT NULL);"
+                "CREATE TABLE IF NOT EXISTS free_rows (row INTEGER PRIMARY KEY);"
+            )
+            row = conn.execute("SELECT value FROM meta WHERE key = 'shape'").fetchone()
+            if row is not None:
+                self.shape = tuple(json.loads(row[0]))
+                self.dim = int(np.prod(self.shape))
+            self._conn = conn
+        return self._conn
+
+    def _rows_on_disk(self) -> int:
+        if self.dim is None or not os.path.exists(self.vectors_path):
+            return 0
+        return os.path.getsize(self.vectors_path) // (self.dim * 4)
+
+    def _vectors(self) -> Optional[np.memmap]:
+        """Memory map of the vector file, remapped when it has grown"""
+        rows = self._rows_on_disk()
+        if rows == 0:
+            return None
+        if self._map is None or self._map.shape[0] != rows:
+            self._map = np.memmap(self.vectors_path, dtype=np.float32, mode='r', shape=(rows, self.dim))
+        return self._map
+
+    def _to_tensor(self, vector: np.ndarray, device: str) -> torch.Tensor:
+        return torch.from_numpy(np.array(vector, dtype=np.float32).reshape(self.shape)).to(device)
+
+    def append(self, name: str, embedding: torch.Tensor, audio_name: Optional[str] = None) -> int:
+        """Store an embedding under `name`, returning its row"""
+        vector = embedding.detach().cpu().float().numpy()
+        with self._lock:
+            conn = self._connection()
+            if self.shape is None:
+                self.shape = tuple(vector.shape)
+                self.dim = int(vector.size)
+                conn.execute("INSERT INTO meta VALUES ('shape', ?)", (json.dumps(list(self.shape)),))
+                conn.commit()
+            if vector.size != self.dim:
+                raise ValueError(f"Embedding has {vector.size} values, store expects {self.dim}")
+
+            free = conn.execute("SELECT row FROM free_rows ORDER BY row LIMIT 1").fetchone()
+            row = free[0] if free is not None else self._rows_on_disk()
+            mode = 'r+b' if os.path.exists(self.vectors_path) else 'w+b'
+            with open(self.vectors_path, mode) as f:
+                f.seek(row * self.dim * 4)
+                f.write(vector.astype('<f4').tobytes())
+
+            if free is not None:
+                conn.execute("DELETE FROM free_rows WHERE row = ?", (row,))
+            previous = conn.execute("SELECT row FROM embeddings WHERE name = ?", (name,)).fetchone()
+            if previous is not None:
+                conn.execute("INSERT OR IGNORE INTO free_rows VALUES (?)", (previous[0],))
+            conn.execute(
+                "INSERT OR REPLACE INTO embeddings VALUES (?, ?, ?, ?)",
+                (name, row, audio_name, time.time())
+            )
+            conn.commit()
+        return row
+
+    def get(self, name: str, device: str = 'cpu') -> Optional[torch.Tensor]:
+        """Load one embedding, or None if the name is unknown"""
+        with self._lock:
+            found = self._connection().execute(
+                "SELECT row FROM embeddings WHERE name = ?", (name,)
+            ).fetchone()
+            if found is None:
+                return None
+            vector = self._vectors()[found[0]]
+        return self._to_tensor(vector, device)
+
+    def get_many(self, names: List[str], device: str = 'cpu') -> Dict[str, torch.Tensor]:
+        """Bulk load embeddings; unknown names are left out"""
+        with self._lock:
+            conn = self._connection()
+            rows = {}
+            for name in names:
+                found = conn.execute("SELECT row FROM embeddings WHERE name = ?", (name,)).fetchone()
+                if found is not None:
+                    rows[name] = found[0]
+            vectors = self._vectors()
+            loaded = {name: np.array(vectors[row]) for name, row in rows.items()}
+        return {name: self._to_tensor(vector, device) for name, vector in loaded.items()}
+
+    def load_all(self) -> Tuple[List[str], np.ndarray]:
+        """Names and a contiguous (n, dim) float32 matrix of every embedding"""
+        with self._lock:
+            entries = self._connection().execute(
+                "SELECT name, row FROM embeddings ORDER BY row"
+            ).fetchall()
+            vectors = self._vectors()
+            if not entries:
+                return [], np.zeros((0, self.dim or 0), dtype=np.float32)
+            matrix = np.ascontiguousarray(vectors[[row for _, row in entries]], dtype=np.float32)
+        return [name for name, _ in entries], matrix
+
+    def metadata(self, name: str) -> Optional[dict]:
+        """Row, audio name, creation time and size in bytes of an embedding"""
+        with self._lock:
+            found = self._connection().execute(
+                "SELECT row, audio_name, created_at FROM embeddings WHERE name = ?", (name,)
+            ).fetchone()
+        if found is None:
+            return None
+        return {"row": found[0], "audio_name": found[1], "created_at": found[2], "bytes": (self.dim or 0) * 4}
+
+    def entries(self) -> List[Tuple[str, int, float]]:
+        """(name, size in bytes, creation time) of every embedding"""
+        with self._lock:
+            found = self._connection().execute("SELECT name, created_at FROM embeddings").fetchall()
+        size = (self.dim or 0) * 4
+        return [(name, size, created_at) for name, created_at in found]
+
+    def contains(self, name: str) -> bool:
+        """Check if an embedding is stored under `name`"""
+        return self.metadata(name) is not None
+
+    def delete(self, name: str) -> bool:
+        """Remove an embedding; its row is reused by later appends"""
+        with self._lock:
+            conn = self._connection()
+            found = conn.execute("SELECT row FROM embeddings WHERE name = ?", (name,)).fetchone()
+            if found is None:
+                return False
+            conn.execute("DELETE FROM embeddings WHERE name = ?", (name,))
+            conn.execute("INSERT OR IGNORE INTO free_rows VALUES (?)", (found[0],))
+            conn.commit()
+        logger.info(f"Deleted embedding from store: {name}")
+        return True
+
+    def stats(self) -> dict:
+        """Stored embedding count and file size"""
+        with self._lock:
+            count = self._connection().execute("SELECT COUNT(*) FROM embeddings").fetchone()[0]
+            rows = self._rows_on_disk()
+        return {
+            "embeddings": count,
+            "rows": rows,
+            "free_rows": rows - count,
+            "bytes": rows * (self.dim or 0) * 4,
+        }
+
+    def close(self) -> None:
+        """Close the index and drop the memory map"""
+        with self._lock:
+            self._map = None
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+# Global embedding store instance
+embedding_store = EmbeddingStore()
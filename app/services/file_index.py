@@ -0,0 +1,224 @@
+"""
+In-memory index of files in the output folder
+"""
+import os
+import time
+import bisect
+import threading
+from typing import List, Optional, Tuple
+
+from app.config.settings import OUTPUT_FOLDER, logger
+from app.services.embedding_store import embedding_store
+
+FILE_TYPES = ('embedding', 'audio', 'tmp', 'other')
+AUDIO_EXTENSIONS = ('.wav', '.mp3', '.flac', '.m4a', '.ogg', '.opus', '.pcm')
+
+def classify_file(filename: str) -> str:
+    """File class used for listing filters and quotas"""
+    if filename.endswith('.pth'):
+        return 'embedding'
+    if filename.startswith('tmp_') and filename.endswith('.wav'):
+        return 'tmp'
+    if filename.lower().endswith(AUDIO_EXTENSIONS):
+        return 'audio'
+    return 'other'
+
+class FileIndex:
+    """Sorted index of output files with per-type totals
+
+    Built once with os.scandir and then kept current by the code paths that
+    write or delete output files, so listings and totals never rescan the
+    directory. `rebuild` resyncs with files changed behind the API's back;
+    files added or removed while it scans are journaled and replayed onto
+    the new index, so changes made during warm-up are not lost.
+
+    Embeddings in the embedding store are listed alongside legacy .pth
+    files as `<name>.pth` entries of type embedding, sized by their row in
+    the vector file, so listings, totals and quotas cover every embedding.
+    Those entries can be deleted through /cleanup but not downloaded.
+    """
+
+    def __init__(self, folder: str = OUTPUT_FOLDER):
+        self.folder = folder
+        self.built = False
+        self._entries = {}
+        self._names: List[str] = []
+        self._totals = {file_type: [0, 0] for file_type in FILE_TYPES}
+        self._lock = threading.Lock()
+        # Changes seen during a rebuild's scan: name -> stat tuple, or None if removed
+        self._journal: Optional[dict] = None
+        self._rebuild_lock = threading.Lock()
+
+    def _insert(self, name: str, size: int, mtime: float, ctime: float) -> None:
+        """Add or replace an entry (lock held)"""
+        self._discard(name)
+        file_type = classify_file(name)
+        self._entries[name] = (size, mtime, ctime, file_type)
+        bisect.insort(self._names, name)
+        self._totals[file_type][0] += 1
+        self._totals[file_type][1] += size
+
+    def _discard(self, name: str) -> bool:
+        """Remove an entry if present (lock held)"""
+        entry = self._entries.pop(name, None)
+        if entry is None:
+            return False
+        del self._names[bisect.bisect_left(self._names, name)]
+        self._totals[entry[3]][0] -= 1
+        self._totals[entry[3]][1] -= entry[0]
+        return True
+
+    def rebuild(self) -> None:
+        """Scan the folder once and replace the index"""
+        with self._rebuild_lock:
+            start = time.perf_counter()
+            with self._lock:
+                self._journal = {}
+            scanned = []
+            try:
+                if os.path.exists(self.folder):
+                    with os.scandir(self.folder) as it:
+                        for entry in it:
+                            if entry.is_file():
+                                stat = entry.stat()
+                                scanned.append((entry.name, stat.st_size, stat.st_mtime, stat.st_ctime))
+                # A legacy file and a stored embedding of the same name are listed once
+                files = {name for name, _, _, _ in scanned}
+                for name, size, created_at in embedding_store.entries():
+                    if f"{name}.pth" not in files:
+                        scanned.append((f"{name}.pth", size, created_at, created_at))
+            except BaseException:
+                with self._lock:
+                    self._journal = None
+                raise
+            with self._lock:
+                self._entries.clear()
+                self._names.clear()
+                self._totals = {file_type: [0, 0] for file_type in FILE_TYPES}
+                for name, size, mtime, ctime in scanned:
+                    file_type = classify_file(name)
+                    self._entries[name] = (size, mtime, ctime, file_type)
+                    self._totals[file_type][0] += 1
+                    self._totals[file_type][1] += size
+                self._names = sorted(self._entries)
+                # Replay what changed while the folder was being scanned
+                for name, stat in self._journal.items():
+                    if stat is None:
+                        self._discard(name)
+                    else:
+                        self._insert(name, *stat)
+                self._journal = None
+                self.built = True
+        logger.info(f"Indexed {len(scanned)} output files in {time.perf_counter() - start:.2f}s")
+
+    def _name_in_folder(self, filepath: str) -> Optional[str]:
+        if os.path.dirname(os.path.abspath(filepath)) != os.path.abspath(self.folder):
+            return None
+        return os.path.basename(filepath)
+
+    def add(self, filepath: str) -> None:
+        """Record a file written to the output folder"""
+        name = self._name_in_folder(filepath)
+        if name is None:
+            return
+        try:
+            stat = os.stat(filepath)
+        except OSError:
+            return
+        self._record(name, (stat.st_size, stat.st_mtime, stat.st_ctime))
+
+    def remove(self, filepath: str) -> None:
+        """Record a file deleted from the output folder"""
+        name = self._name_in_folder(filepath)
+        if name is None:
+            return
+        self._record(name, None)
+
+    def add_embedding(self, embedding_name: str) -> None:
+        """Record an embedding written to the embedding store"""
+        metadata = embedding_store.metadata(embedding_name)
+        if metadata is None:
+            return
+        created_at = metadata['created_at']
+        self._record(f"{embedding_name}.pth", (metadata['bytes'], created_at, created_at))
+
+    def remove_embedding(self, embedding_name: str) -> None:
+        """Record an embedding deleted from the embedding store"""
+        self._record(f"{embedding_name}.pth", None)
+
+    def _record(self, name: str, stat: Optional[tuple]) -> None:
+        """Apply an added (size, mtime, ctime) or removed (None) entry, journaling it during a rebuild"""
+        with self._lock:
+            if self._journal is not None:
+                self._journal[name] = stat
+            if self.built:
+                if stat is None:
+                    self._discard(name)
+                else:
+                    self._insert(name, *stat)
+
+    def query(
+        self,
+        cursor: Optional[str] = None,
+        limit: int = 100,
+        file_type: Optional[str] = None,
+        prefix: Optional[str] = None,
+        min_age_seconds: Optional[float] = None,
+        max_age_seconds: Optional[float] = None
+    ) -> Tuple[List[dict], Optional[str]]:
+        """One page of files sorted by name, starting after `cursor`
+
+        Returns the page and the cursor of the next page (None on the last).
+        """
+        now = time.time()
+        page = []
+        with self._lock:
+            start = 0
+            if prefix:
+                start = bisect.bisect_left(self._names, prefix)
+            if cursor:
+                start = max(start, bisect.bisect_right(self._names, cursor))
+            for position in range(start, len(self._names)):
+                name = self._names[position]
+                if prefix and not name.startswith(prefix):
+                    break
+                size, mtime, ctime, entry_type = self._entries[name]
+                age = now - ctime
+                if file_type and entry_type != file_type:
+                    continue
+                if min_age_seconds is not None and age < min_age_seconds:
+                    continue
+                if max_age_seconds is not None and age > max_age_seconds:
+                    continue
+                if len(page) == limit:
+                    return page, page[-1]['filename']
+                page.append({
+                    'filename': name,
+                    'type': entry_type,
+                    'size': size,
+                    'created_at': ctime,
+                    'modified_at': mtime,
+                })
+        return page, None
+
+    def entries(self, file_type: Optional[str] = None) -> List[Tuple[str, int, float]]:
+        """(filename, size, ctime) of indexed files, optionally of one type"""
+        with self._lock:
+            return [
+                (name, size, ctime)
+                for name, (size, _, ctime, entry_type) in self._entries.items()
+                if file_type is None or entry_type == file_type
+            ]
+
+    def totals(self) -> dict:
+        """File count and bytes overall and per type"""
+        with self._lock:
+            by_type = {file_type: {'count': count, 'bytes': size} for file_type, (count, size) in self._totals.items()}
+        return {
+            'count': sum(t['count'] for t in by_type.values()),
+            'bytes': sum(t['bytes'] for t in by_type.values()),
+            'by_type': by_type,
+        }
+
+# Global file index instance
+file_index = FileIndex()
@@ -0,0 +1,99 @@
+"""
+In-process LRU cache of MeloTTS text front-end features per sentence
+"""
+import threading
+from collections import OrderedDict
+from typing import Callable, Tuple
+
+import torch
+
+from app.config.settings import FRONTEND_CACHE_MAX_BYTES
+
+class FrontendCache:
+    """Byte-bounded LRU cache of (bert, ja_bert, phones, tones, lang_ids) per sentence
+
+    Text normalization, g2p and BERT feature extraction depend only on the
+    model and the sentence, so a sentence seen before skips straight to the
+    acoustic model whatever the speaker or target voice. Entries are keyed
+    by the registry language as well as the model's own language: models
+    such as VI and VI_MIX_EN both report 'VI' but have their own symbols. Entries are
+    evicted least recently used first once their tensors exceed `max_bytes`.
+    Cached tensors are shared between callers and must not be modified.
+    """
+
+    def __init__(self, max_bytes: int = FRONTEND_CACHE_MAX_BYTES):
+        self.max_bytes = max_bytes
+        self.total_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def key(model_key: str, language: str, sentence: str) -> Tuple[str, str, str]:
+        """Cache key of a sentence, ignoring differences in whitespace"""
+        return model_key, language, " ".join(sentence.split())
+
+    @staticmethod
+    def _size(features: Tuple[torch.Tensor, ...]) -> int:
+        return sum(tensor.element_size() * tensor.nelement() for tensor in features)
+
+    def get(
+        self,
+        model_key: str,
+        language: str,
+        sentence: str,
+        compute: Callable[[], Tuple[torch.Tensor, ...]]
+    ) -> Tuple[torch.Tensor, ...]:
+        """Front-end features of a sentence for the model registered as `model_key`, calling `compute` on a miss"""
+        key = self.key(model_key, language, sentence)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[0]
+            self.misses += 1
+
+        features = compute()
+        size = self._size(features)
+        if size > self.max_bytes:
+            return features
+
+        with self._lock:
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self.total_bytes -= previous[1]
+            self._entries[key] = (features, size)
+            self.total_bytes += size
+            while self.total_bytes > self.max_bytes:
+                _, (_, evicted) = self._entries.popitem(last=False)
+                self.total_bytes -= evicted
+                self.evictions += 1
+        return features
+
+    def clear(self) -> None:
+        """Drop every cached sentence"""
+        with self._lock:
+            self._entries.clear()
+            self.total_bytes = 0
+
+    def stats(self) -> dict:
+        """Cache size, memory use and hit/miss counters"""
+        with self._lock:
+            size = len(self._entries)
+            total_bytes = self.total_bytes
+        total = self.hits + self.misses
+        return {
+            "size": size,
+            "bytes": total_bytes,
+            "max_bytes": self.max_bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_rate": self.hits / total if total else 0.0,
+        }
+
+# Global front-end feature cache instance
+frontend_cache = FrontendCache()
@@ -0,0 +1,110 @@
+"""
+Selectable inference backends for the converter and MeloTTS models
+"""
+import time
+import torch
+import torch.nn as nn
+from typing import FrozenSet, Optional
+
+from app.config.settings import DEVICE, INFERENCE_BACKEND, logger
+
+BACKEND_OPTIONS = ("inference_mode", "int8", "torchscript")
+
+# Layers dynamic quantization supports; PyTorch has no dynamic int8 convolution
+_QUANTIZED_LAYERS = {nn.Linear, nn.LSTM, nn.GRU}
+
+# Frames of latent used as the example input when tracing a vocoder
+_TRACE_FRAMES = 64
+
+def parse_backend(value: str) -> FrozenSet[str]:
+    """Options of a backend string such as "int8+torchscript"; "eager" has none"""
+    options = {option.strip() for option in value.split('+') if option.strip()} - {"eager"}
+    unknown = options - set(BACKEND_OPTIONS)
+    if unknown:
+        raise ValueError(f"Unknown inference backend option(s): {', '.join(sorted(unknown))}")
+    # Quantized and traced models are only ever run under inference_mode
+    if options:
+        options.add("inference_mode")
+    return frozenset(options)
+
+class _TracedVocoder(nn.Module):
+    """Traced HiFi-GAN generator keeping the `dec(x, g=g)` call signature"""
+
+    def __init__(self, traced: torch.jit.ScriptModule, conditioned: bool):
+        super().__init__()
+        self.traced = traced
+        self.conditioned = conditioned
+
+    def forward(self, x: torch.Tensor, g: Optional[torch.Tensor] = None) -> torch.Tensor:
+        return self.traced(x, g) if self.conditioned else self.traced(x)
+
+class InferenceBackend:
+    """Apply the configured backend to freshly loaded models
+
+    `prepare` rewrites a model in place: dynamic int8 quantization of its
+    linear and recurrent layers, and/or replacing its vocoder (`dec`) with a
+    traced, frozen TorchScript module. The vocoder is convolutional with no
+    data-dependent control flow, so one trace serves every input length.
+    `context` is the grad mode inference runs under.
+    """
+
+    def __init__(self, backend: str = INFERENCE_BACKEND, device: str = DEVICE):
+        self.name = backend
+        self.device = device
+        self.options = parse_backend(backend)
+        self._prepared = {}
+        skipped = self.options & {"int8", "torchscript"}
+        if skipped and not str(device).startswith("cpu"):
+            logger.warning(f"Inference backend options {sorted(skipped)} are CPU only, not applied on {device}")
+            self.options = self.options - skipped
+
+    def context(self):
+        """Grad mode for a forward pass"""
+        return torch.inference_mode() if "inference_mode" in self.options else torch.no_grad()
+
+    @staticmethod
+    def quantize(model: nn.Module) -> nn.Module:
+        """Dynamic int8 quantization of linear and recurrent layers, in place"""
+        return torch.ao.quantization.quantize_dynamic(model, _QUANTIZED_LAYERS, dtype=torch.qint8, inplace=True)
+
+    @staticmethod
+    def trace_vocoder(dec: nn.Module) -> nn.Module:
+        """Trace and freeze a VITS/HiFi-GAN generator"""
+        try:
+            # Fold the weight norm reparametrization into plain weights
+            dec.remove_weight_norm()
+        except Exception:
+            pass
+        dec.eval()
+        conditioned = getattr(dec, "cond", None) is not None
+        example = [torch.randn(1, dec.conv_pre.in_channels, _TRACE_FRAMES, device=dec.conv_pre.weight.device)]
+        if conditioned:
+            example.append(torch.randn(1, dec.cond.in_channels, 1, device=dec.conv_pre.weight.device))
+        with torch.no_grad():
+            traced = torch.jit.freeze(torch.jit.trace(dec, tuple(example), check_trace=False))
+        return _TracedVocoder(traced, conditioned)
+
+    def prepare(self, model: nn.Module, name: str) -> nn.Module:
+        """Apply the backend to `model` (a SynthesizerTrn) in place and return it"""
+        start = time.perf_counter()
+        model.eval()
+        if "int8" in self.options:
+            self.quantize(model)
+        if "torchscript" in self.options and hasattr(model, "dec"):
+            model.dec = self.trace_vocoder(model.dec)
+        if self.options - {"inference_mode"}:
+            seconds = time.perf_counter() - start
+            self._prepared[name] = seconds
+            logger.info(f"Prepared {name} for the {self.name} backend in {seconds:.2f}s")
+        return model
+
+    def status(self) -> dict:
+        """Configured backend, options in effect and models prepared for it"""
+        return {
+            "backend": self.name,
+            "options": sorted(self.options),
+            "prepared": dict(self._prepared),
+        }
+
+# Global inference backend instance
+inference_backend = InferenceBackend()
@@ -0,0 +1,142 @@
+"""
+Background janitor enforcing age and size quotas on stored files
+"""
+import os
+import time
+import asyncio
+from typing import List, Optional, Tuple
+
+from app.config.settings import (
+    UPLOAD_FOLDER, CLEANUP_INTERVAL_HOURS, JANITOR_POLICIES, logger
+)
+from app.services.file_index import file_index
+from app.utils.file_utils import cleanup_file, delete_embedding
+
+class Janitor:
+    """Periodically evict files by age and per-class byte quota
+
+    Output files are classified through the file index (embedding, audio,
+    tmp, other); leftover uploads form their own class. The embedding class
+    covers the embedding store as well as legacy .pth files, and evicts
+    through `delete_embedding` so the in-process caches and the similarity
+    index forget the embedding too. tmp_*.wav files are orphans of the old
+    disk pipeline and are removed after a short grace period. Each pass runs
+    on a worker thread, never on the event loop.
+    """
+
+    def __init__(self, interval_hours: float = CLEANUP_INTERVAL_HOURS, policies: dict = JANITOR_POLICIES):
+        self.interval = interval_hours * 3600
+        self.policies = policies
+        self.runs = 0
+        self.files_reclaimed = 0
+        self.bytes_reclaimed = 0
+        self.last_run: Optional[dict] = None
+        self._task: Optional[asyncio.Task] = None
+
+    @staticmethod
+    def _upload_entries() -> List[Tuple[str, int, float]]:
+        """(path, size, ctime) of files left in the upload folder"""
+        entries = []
+        if os.path.exists(UPLOAD_FOLDER):
+            with os.scandir(UPLOAD_FOLDER) as it:
+                for entry in it:
+                    if entry.is_file():
+                        stat = entry.stat()
+                        entries.append((entry.path, stat.st_size, stat.st_ctime))
+        return entries
+
+    def _class_entries(self, file_class: str) -> List[Tuple[str, int, float]]:
+        if file_class == 'upload':
+            return self._upload_entries()
+        return [
+            (os.path.join(file_index.folder, name), size, ctime)
+            for name, size, ctime in file_index.entries(file_class)
+        ]
+
+    @staticmethod
+    def _evict(file_class: str, path: str) -> bool:
+        if file_class == 'embedding':
+            return delete_embedding(os.path.basename(path)[:-len('.pth')])
+        return cleanup_file(path)
+
+    def run_once(self) -> dict:
+        """Run one eviction pass, returning what it reclaimed"""
+        start = time.perf_counter()
+        now = time.time()
+        # Resync with files changed outside the API before applying quotas
+        file_index.rebuild()
+
+        report = {}
+        for file_class, policy in self.policies.items():
+            entries = sorted(self._class_entries(file_class), key=lambda e: e[2])
+            max_age = policy.get('max_age_hours')
+            max_bytes = policy.get('max_bytes')
+            total = sum(size for _, size, _ in entries)
+            files, reclaimed = 0, 0
+            for path, size, ctime in entries:
+                too_old = max_age is not None and now - ctime > max_age * 3600
+                over_quota = max_bytes is not None and total > max_bytes
+                if not (too_old or over_quota):
+                    continue
+                if self._evict(file_class, path):
+                    files += 1
+                    reclaimed += size
+                    total -= size
+            report[file_class] = {'files': files, 'bytes': reclaimed, 'remaining_bytes': total}
+
+        duration = time.perf_counter() - start
+        files = sum(r['files'] for r in report.values())
+        reclaimed = sum(r['bytes'] for r in report.values())
+        self.runs += 1
+        self.files_reclaimed += files
+        self.bytes_reclaimed += reclaimed
+        self.last_run = {
+            'finished_at': time.time(),
+            'duration_seconds': duration,
+            'files': files,
+            'bytes': reclaimed,
+            'by_class': report,
+        }
+        logger.info(f"Janitor reclaimed {files} files ({reclaimed / 1e6:.1f} MB) in {duration:.2f}s")
+        return self.last_run
+
+    async def run(self) -> dict:
+        """Run one pass off the event loop"""
+        loop = asyncio.get_event_loop()
+        return await loop.run_in_executor(None, self.run_once)
+
+    async def _loop(self) -> None:
+        while True:
+            try:
+                await self.run()
+            except Exception as e:
+                logger.error(f"Error in janitor pass: {e}")
+            await asyncio.sleep(self.interval)
+
+    def start(self) -> None:
+        """Schedule passes every `interval` seconds on the running loop"""
+        if self._task is None:
+            self._task = asyncio.get_event_loop().create_task(self._loop())
+
+    async def shutdown(self) -> None:
+        """Stop scheduling passes"""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    def stats(self) -> dict:
+        """Totals reclaimed and the outcome of the last pass"""
+        return {
+            'interval_seconds': self.interval,
+            'runs': self.runs,
+            'files_reclaimed': self.files_reclaimed,
+            'bytes_reclaimed': self.bytes_reclaimed,
+            'last_run': self.last_run,
+        }
+
+# Global janitor instance
+janitor = Janitor()
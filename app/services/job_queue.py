@@ -0,0 +1,572 @@
+"""
+Persistent queue of asynchronous synthesis jobs
+"""
+import os
+import json
+import time
+import uuid
+import socket
+import sqlite3
+import asyncio
+import ipaddress
+import ssl
+import threading
+import http.client
+from typing import List, Optional
+from urllib.parse import urlsplit
+from fastapi import HTTPException
+
+import numpy as np
+import soundfile
+
+from app.config.settings import (
+    JOB_QUEUE_DB, JOB_RESULT_FOLDER, JOB_WORKERS, JOB_RETENTION_HOURS,
+    JOB_CALLBACK_TIMEOUT, JOB_CALLBACK_RETRIES, JOB_CALLBACK_ALLOWED_HOSTS, JOB_SWEEP_INTERVAL, logger
+)
+from app.utils.audio_utils import AUDIO_FORMATS, resample_waveform, waveform_to_pcm16
+from app.utils.text_utils import split_text_into_chunks
+from app.services.voice_service import voice_service
+from app.services.embedding_cache import embedding_cache
+from app.services.audio_service import audio_service
+
+ACTIVE_STATES = ("queued", "running")
+FINISHED_STATES = ("succeeded", "failed", "cancelled")
+
+# Samples per block when encoding the finished job
+_FINALIZE_BLOCK = 1 << 20
+
+def check_callback_url(url: str) -> List[str]:
+    """Raise ValueError unless `url` may receive job callbacks
+
+    With JOB_CALLBACK_ALLOWED_HOSTS set only those hosts are accepted and
+    an empty list is returned. Otherwise every address the host resolves to
+    must be public, so callbacks cannot reach loopback, the private network
+    or the cloud metadata service, and those addresses are returned for the
+    caller to connect to. Resolves the host, so call it off the event loop.
+    """
+    parts = urlsplit(url)
+    host = (parts.hostname or "").lower()
+    if parts.scheme not in ("http", "https") or not host:
+        raise ValueError("callback_url must be an http or https URL with a host")
+    if JOB_CALLBACK_ALLOWED_HOSTS:
+        if host not in JOB_CALLBACK_ALLOWED_HOSTS:
+            raise ValueError(f"callback_url host {host} is not allowed")
+        return []
+    default_port = 443 if parts.scheme == "https" else 80
+    try:
+        infos = socket.getaddrinfo(host, parts.port or default_port, proto=socket.IPPROTO_TCP)
+    except socket.gaierror as e:
+        raise ValueError(f"callback_url host {host} does not resolve: {e}")
+    addresses = list(dict.fromkeys(info[4][0] for info in infos))
+    for address in addresses:
+        ip = ipaddress.ip_address(address.split('%')[0])
+        if ip.version == 6 and ip.ipv4_mapped is not None:
+            ip = ip.ipv4_mapped
+        if not ip.is_global or ip.is_multicast:
+            raise ValueError(f"callback_url host {host} resolves to a non-public address")
+    return addresses
+
+def _connect_to(addresses: List[str], port: int, timeout: Optional[float]) -> socket.socket:
+    """Open a TCP connection to the first reachable address"""
+    error = None
+    for address in addresses:
+        try:
+            return socket.create_connection((address, port), timeout)
+        except OSError as e:
+            error = e
+    raise error
+
+class _PinnedHTTPConnection(http.client.HTTPConnection):
+    """HTTP connection to addresses already checked by `check_callback_url`
+
+    Connecting to the checked addresses rather than resolving the host
+    again closes the window in which its DNS could be changed to point at
+    an internal address. The Host header still carries the URL's name.
+    """
+
+    def __init__(self, host: str, port: Optional[int], addresses: List[str], **kwargs):
+        super().__init__(host, port, **kwargs)
+        self._addresses = addresses
+
+    def connect(self):
+        self.sock = _connect_to(self._addresses, self.port, self.timeout)
+
+class _PinnedHTTPSConnection(http.client.HTTPSConnection):
+    """HTTPS counterpart of `_PinnedHTTPConnection`; SNI and certificate checks use the URL's name"""
+
+    def __init__(self, host: str, port: Optional[int], addresses: List[str], **kwargs):
+        self._tls = ssl.create_default_context()
+        super().__init__(host, port, context=self._tls, **kwargs)
+        self._addresses = addresses
+
+    def connect(self):
+        sock = _connect_to(self._addresses, self.port, self.timeout)
+        self.sock = self._tls.wrap_socket(sock, server_hostname=self.host)
+
+class JobQueue:
+    """Long-form synthesis run in the background, tracked in SQLite
+
+    A job's text is split into sentence chunks that are synthesized one
+    after another through the same path as /clone_voice (and so
+    `VoiceService.generate_cloned_voice`), each holding admission for its
+    cost; a chunk waits for capacity rather than being rejected. Each finished chunk is appended
+    to a float32 part file and recorded, so progress can be polled and a job
+    interrupted by a restart resumes at its next chunk. The part file is
+    encoded into the requested format once all chunks are done. Finished
+    jobs and their results are kept for JOB_RETENTION_HOURS; when a job has
+    a callback URL its final state is POSTed there.
+    """
+
+    def __init__(
+        self,
+        db_path: str = JOB_QUEUE_DB,
+        folder: str = JOB_RESULT_FOLDER,
+        workers: int = JOB_WORKERS,
+        retention_hours: float = JOB_RETENTION_HOURS
+    ):
+        self.db_path = db_path
+        self.folder = folder
+        self.workers = workers
+        self.retention_hours = retention_hours
+        self._conn = None
+        self._lock = threading.Lock()
+        self._task: Optional[asyncio.Task] = None
+        self._wakeup: Optional[asyncio.Event] = None
+        # Tasks of running jobs, and the ones asked to stop by a client
+        self._running = {}
+        self._cancelling = set()
+
+    def _connection(self) -> sqlite3.Connection:
+        """Open the database on first use"""
+        if self._conn is None:
+            os.makedirs(os.path.dirname(self.db_path) or '.', exist_ok=True)
+            self._conn = sqlite3.connect(self.db_path, check_same_thread=False)
+            self._conn.row_factory = sqlite3.Row
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS jobs ("
+                "id TEXT PRIMARY KEY, status TEXT NOT NULL, request TEXT NOT NULL, "
+                "callback_url TEXT, callback_state TEXT, "
+                "chunks_total INTEGER, chunks_done INTEGER NOT NULL DEFAULT 0, "
+                "part_bytes INTEGER NOT NULL DEFAULT 0, audio_seconds REAL NOT NULL DEFAULT 0, "
+                "result_bytes INTEGER, error TEXT, "
+                "created_at REAL NOT NULL, started_at REAL, finished_at REAL)"
+            )
+            self._conn.execute("CREATE INDEX IF NOT EXISTS jobs_by_status ON jobs (status, created_at)")
+            self._conn.commit()
+        return self._conn
+
+    def _path(self, job_id: str, extension: str) -> str:
+        return os.path.join(self.folder, f"{job_id}.{extension}")
+
+    def result_path(self, job: dict) -> str:
+        """Path of a finished job's encoded audio"""
+        return self._path(job["job_id"], AUDIO_FORMATS[job["output_format"]]["extension"])
+
+    @staticmethod
+    def _describe(row: sqlite3.Row) -> dict:
+        """Public view of a job row"""
+        request = json.loads(row["request"])
+        total = row["chunks_total"]
+        return {
+            "job_id": row["id"],
+            "status": row["status"],
+            "chunks_total": total,
+            "chunks_done": row["chunks_done"],
+            "progress": row["chunks_done"] / total if total else 0.0,
+            "audio_seconds": row["audio_seconds"],
+            "output_format": request["output_format"],
+            "sample_rate": request["sample_rate"],
+            "result_url": f"/jobs/{row['id']}/result" if row["status"] == "succeeded" else None,
+            "result_bytes": row["result_bytes"],
+            "error": row["error"],
+            "callback_url": row["callback_url"],
+            "callback_state": row["callback_state"],
+            "created_at": row["created_at"],
+            "started_at": row["started_at"],
+            "finished_at": row["finished_at"],
+        }
+
+    def _fetch(self, job_id: str) -> Optional[sqlite3.Row]:
+        return self._connection().execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+
+    def _update(self, job_id: str, **fields) -> None:
+        assignments = ", ".join(f"{name} = ?" for name in fields)
+        with self._lock:
+            conn = self._connection()
+            conn.execute(f"UPDATE jobs SET {assignments} WHERE id = ?", (*fields.values(), job_id))
+            conn.commit()
+
+    def create(self, request: dict, callback_url: Optional[str] = None) -> dict:
+        """Queue a job; `request` holds the synthesis parameters"""
+        job_id = uuid.uuid4().hex
+        with self._lock:
+            conn = self._connection()
+            conn.execute(
+                "INSERT INTO jobs (id, status, request, callback_url, created_at) VALUES (?, 'queued', ?, ?, ?)",
+                (job_id, json.dumps(request, ensure_ascii=False), callback_url, time.time())
+            )
+            conn.commit()
+            job = self._describe(self._fetch(job_id))
+        logger.info(f"Queued job {job_id} ({len(request['text'])} characters)")
+        return job
+
+    def get(self, job_id: str) -> Optional[dict]:
+        """Current state of a job"""
+        with self._lock:
+            row = self._fetch(job_id)
+        return None if row is None else self._describe(row)
+
+    def _claim(self) -> Optional[dict]:
+        """Mark the oldest queued job running and return it with its request"""
+        with self._lock:
+            conn = self._connection()
+            row = conn.execute(
+                "SELECT * FROM jobs WHERE status = 'queued' ORDER BY created_at LIMIT 1"
+            ).fetchone()
+            if row is None:
+                return None
+            conn.execute(
+                "UPDATE jobs SET status = 'running', started_at = COALESCE(started_at, ?) WHERE id = ?",
+                (time.time(), row["id"])
+            )
+            conn.commit()
+        return {**dict(row), "request": json.loads(row["request"])}
+
+    def _finish(self, job_id: str, status: str, **fields) -> None:
+        """Record a final state, queueing the callback if the job has one"""
+        assignments = "".join(f", {name} = ?" for name in fields)
+        with self._lock:
+            conn = self._connection()
+            conn.execute(
+                "UPDATE jobs SET status = ?, finished_at = ?, "
+                "callback_state = CASE WHEN callback_url IS NULL THEN NULL ELSE 'pending' END"
+                f"{assignments} WHERE id = ?",
+                (status, time.time(), *fields.values(), job_id)
+            )
+            conn.commit()
+
+    def _cancel_queued(self, job_id: str) -> bool:
+        """Cancel a job that has not started; False if it is not queued"""
+        with self._lock:
+            conn = self._connection()
+            cursor = conn.execute(
+                "UPDATE jobs SET status = 'cancelled', finished_at = ?, "
+                "callback_state = CASE WHEN callback_url IS NULL THEN NULL ELSE 'pending' END "
+                "WHERE id = ? AND status = 'queued'",
+                (time.time(), job_id)
+            )
+            conn.commit()
+        return cursor.rowcount > 0
+
+    def _remove(self, job_id: str) -> None:
+        """Delete a job row and any files it left"""
+        job = self.get(job_id)
+        if job is not None:
+            for path in (self._path(job_id, "part"), self.result_path(job)):
+                if os.path.exists(path):
+                    os.remove(path)
+        with self._lock:
+            conn = self._connection()
+            conn.execute("DELETE FROM jobs WHERE id = ?", (job_id,))
+            conn.commit()
+
+    def _recover(self) -> List[str]:
+        """Requeue jobs interrupted by a restart; return jobs with undelivered callbacks"""
+        with self._lock:
+            conn = self._connection()
+            requeued = conn.execute("UPDATE jobs SET status = 'queued' WHERE status = 'running'").rowcount
+            conn.commit()
+            pending = [row[0] for row in conn.execute("SELECT id FROM jobs WHERE callback_state = 'pending'")]
+        if requeued:
+            logger.info(f"Requeued {requeued} interrupted jobs")
+        return pending
+
+    def _expired(self) -> List[str]:
+        """Finished jobs older than the retention period"""
+        cutoff = time.time() - self.retention_hours * 3600
+        with self._lock:
+            return [row[0] for row in self._connection().execute(
+                "SELECT id FROM jobs WHERE status IN (?, ?, ?) AND finished_at < ?",
+                (*FINISHED_STATES, cutoff)
+            )]
+
+    def _purge_expired(self) -> int:
+        expired = self._expired()
+        for job_id in expired:
+            self._remove(job_id)
+        if expired:
+            logger.info(f"Removed {len(expired)} expired jobs")
+        return len(expired)
+
+    @staticmethod
+    def _append_chunk(part_path: str, audio: np.ndarray, offset: int) -> int:
+        """Write a chunk's samples at `offset` of the part file, returning the new size"""
+        data = np.ascontiguousarray(audio, dtype=np.float32).tobytes()
+        with open(part_path, "r+b" if os.path.exists(part_path) else "wb") as part:
+            # Drop whatever a crash left past the last recorded chunk
+            part.truncate(offset)
+            part.seek(offset)
+            part.write(data)
+            part.flush()
+            os.fsync(part.fileno())
+        return offset + len(data)
+
+    @staticmethod
+    def _finalize(part_path: str, result_path: str, audio_format: str, sample_rate: int) -> int:
+        """Encode the part file into the result file block by block, returning its size"""
+        spec = AUDIO_FORMATS[audio_format]
+        with open(part_path, "rb") as part:
+            if audio_format == "pcm":
+                with open(result_path, "wb") as out:
+                    while True:
+                        block = np.fromfile(part, dtype=np.float32, count=_FINALIZE_BLOCK)
+                        if block.size == 0:
+                            break
+                        out.write(waveform_to_pcm16(block))
+            else:
+                with soundfile.SoundFile(
+                    result_path, "w", samplerate=sample_rate, channels=1,
+                    format=spec["format"], subtype=spec["subtype"]
+                ) as out:
+                    while True:
+                        block = np.fromfile(part, dtype=np.float32, count=_FINALIZE_BLOCK)
+                        if block.size == 0:
+                            break
+                        out.write(block)
+        os.remove(part_path)
+        return os.path.getsize(result_path)
+
+    async def _db(self, fn, *args, **kwargs):
+        loop = asyncio.get_event_loop()
+        return await loop.run_in_executor(None, lambda: fn(*args, **kwargs))
+
+    async def _run_job(self, job: dict) -> None:
+        """Synthesize a claimed job from its next chunk to the end"""
+        job_id = job["id"]
+        request = job["request"]
+        part_path = self._path(job_id, "part")
+        loop = asyncio.get_event_loop()
+        try:
+            target_se = await loop.run_in_executor(None, embedding_cache.get, request["target_embedding_name"])
+            if target_se is None:
+                raise ValueError("Target voice embedding file not found")
+            sample_rate = request["sample_rate"]
+            if sample_rate is None:
+                # Kept with the request so a resumed job encodes at the same rate
+                sample_rate = request["sample_rate"] = audio_service.output_rate(request["output_format"])
+                await self._db(self._update, job_id, request=json.dumps(request, ensure_ascii=False))
+            chunks = split_text_into_chunks(request["text"])
+            await self._db(self._update, job_id, chunks_total=len(chunks))
+
+            offset = job["part_bytes"]
+            for index in range(job["chunks_done"], len(chunks)):
+                if job_id in self._cancelling:
+                    raise asyncio.CancelledError()
+                # Shares the admission budget with interactive requests, waiting for room
+                audio = await audio_service.synthesize_background(
+                    chunks[index], request["language"], request["speaker"], request["speed"], target_se
+                )
+                audio = await loop.run_in_executor(
+                    None, resample_waveform, audio, voice_service.output_sample_rate, sample_rate
+                )
+                offset = await loop.run_in_executor(None, self._append_chunk, part_path, audio, offset)
+                await self._db(
+                    self._update, job_id,
+                    chunks_done=index + 1, part_bytes=offset, audio_seconds=offset / 4 / sample_rate
+                )
+
+            if not chunks:
+                offset = await loop.run_in_executor(None, self._append_chunk, part_path, np.zeros(0), 0)
+            result_path = self._path(job_id, AUDIO_FORMATS[request["output_format"]]["extension"])
+            result_bytes = await loop.run_in_executor(
+                None, self._finalize, part_path, result_path, request["output_format"], sample_rate
+            )
+            await self._db(self._finish, job_id, "succeeded", result_bytes=result_bytes)
+            logger.info(f"Job {job_id} finished: {len(chunks)} chunks, {offset / 4 / sample_rate:.1f}s of audio")
+
+        except asyncio.CancelledError:
+            if job_id not in self._cancelling:
+                # Shutting down: the job stays running and is requeued on restart
+                raise
+            await self._db(self._finish, job_id, "cancelled")
+            await self._discard(part_path)
+            logger.info(f"Job {job_id} cancelled")
+        except Exception as e:
+            logger.error(f"Job {job_id} failed: {e}")
+            await self._db(self._finish, job_id, "failed", error=str(e))
+            await self._discard(part_path)
+        finally:
+            self._running.pop(job_id, None)
+            self._cancelling.discard(job_id)
+
+        self._notify(job_id)
+
+    async def _discard(self, path: str) -> None:
+        if os.path.exists(path):
+            await self._db(os.remove, path)
+
+    @staticmethod
+    def _post(url: str, payload: dict) -> None:
+        """POST a JSON payload, raising on network errors and non-2xx replies
+
+        The URL is checked again at delivery, since what its host resolves
+        to may have changed since the job was submitted, and the request
+        goes to the addresses that check saw. Redirects are not followed.
+        """
+        addresses = check_callback_url(url)
+        parts = urlsplit(url)
+        if addresses:
+            connection_class = _PinnedHTTPSConnection if parts.scheme == "https" else _PinnedHTTPConnection
+            connection = connection_class(parts.hostname, parts.port, addresses, timeout=JOB_CALLBACK_TIMEOUT)
+        else:
+            connection_class = http.client.HTTPSConnection if parts.scheme == "https" else http.client.HTTPConnection
+            connection = connection_class(parts.hostname, parts.port, timeout=JOB_CALLBACK_TIMEOUT)
+        path = (parts.path or "/") + (f"?{parts.query}" if parts.query else "")
+        try:
+            connection.request(
+                "POST",
+                path,
+                body=json.dumps(payload).encode("utf-8"),
+                headers={"Content-Type": "application/json"}
+            )
+            response = connection.getresponse()
+            response.read()
+            if not 200 <= response.status < 300:
+                raise OSError(f"callback returned HTTP {response.status}")
+        finally:
+            connection.close()
+
+    async def _deliver_callback(self, job_id: str) -> None:
+        """Send a finished job to its callback URL, retrying with backoff"""
+        loop = asyncio.get_event_loop()
+        for attempt in range(JOB_CALLBACK_RETRIES):
+            job = await self._db(self.get, job_id)
+            if job is None or job["callback_state"] != "pending":
+                return
+            try:
+                await loop.run_in_executor(None, self._post, job["callback_url"], job)
+                await self._db(self._update, job_id, callback_state="delivered")
+                return
+            except ValueError as e:
+                # Refused URL; retrying would not change that
+                logger.warning(f"Callback for job {job_id} not sent: {e}")
+                break
+            except Exception as e:
+                logger.warning(f"Callback for job {job_id} failed (attempt {attempt + 1}): {e}")
+                await asyncio.sleep(2 ** attempt)
+        await self._db(self._update, job_id, callback_state="failed")
+
+    def _notify(self, job_id: str) -> None:
+        """Deliver a job's callback in the background, if it has one pending"""
+        asyncio.get_event_loop().create_task(self._deliver_callback(job_id))
+
+    async def _worker(self) -> None:
+        """Run queued jobs one at a time"""
+        while True:
+            # Jobs wait for the models (and worker processes) instead of failing during warm-up
+            if not audio_service.inference_ready():
+                await asyncio.sleep(1)
+                continue
+            self._wakeup.clear()
+            job = await self._db(self._claim)
+            if job is None:
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), JOB_SWEEP_INTERVAL)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+
+            task = asyncio.ensure_future(self._run_job(job))
+            self._running[job["id"]] = task
+            try:
+                # A cancelled job ends its task, not this worker
+                await asyncio.wait([task])
+            except asyncio.CancelledError:
+                task.cancel()
+                raise
+
+    async def _sweeper(self) -> None:
+        """Drop expired jobs periodically"""
+        while True:
+            try:
+                await self._db(self._purge_expired)
+            except Exception as e:
+                logger.error(f"Error removing expired jobs: {e}")
+            await asyncio.sleep(JOB_SWEEP_INTERVAL)
+
+    async def _serve(self) -> None:
+        os.makedirs(self.folder, exist_ok=True)
+        for job_id in await self._db(self._recover):
+            self._notify(job_id)
+        await asyncio.gather(self._sweeper(), *(self._worker() for _ in range(self.workers)))
+
+    async def submit(self, request: dict, callback_url: Optional[str] = None) -> dict:
+        """Queue a job and wake a worker; 400 if the callback URL is refused"""
+        if callback_url is not None:
+            try:
+                await self._db(check_callback_url, callback_url)
+            except ValueError as e:
+                raise HTTPException(status_code=400, detail=str(e))
+        job = await self._db(self.create, request, callback_url)
+        if self._wakeup is not None:
+            self._wakeup.set()
+        return job
+
+    async def find(self, job_id: str) -> Optional[dict]:
+        """Current state of a job, read off the event loop"""
+        return await self._db(self.get, job_id)
+
+    async def cancel(self, job_id: str) -> Optional[dict]:
+        """Stop a queued or running job; finished jobs are returned unchanged"""
+        if await self._db(self._cancel_queued, job_id):
+            self._notify(job_id)
+        job = await self._db(self.get, job_id)
+        if job is None or job["status"] != "running":
+            return job
+
+        # Also covers a job claimed by a worker whose task has not started yet
+        self._cancelling.add(job_id)
+        task = self._running.get(job_id)
+        if task is not None:
+            task.cancel()
+            await asyncio.wait([task])
+        return await self._db(self.get, job_id)
+
+    async def delete(self, job_id: str) -> bool:
+        """Cancel a job if needed and remove it with its result"""
+        job = await self.cancel(job_id)
+        if job is None:
+            return False
+        await self._db(self._remove, job_id)
+        return True
+
+    def start(self) -> None:
+        """Recover interrupted jobs and start the workers on the running loop"""
+        if self._task is None:
+            self._wakeup = asyncio.Event()
+            self._task = asyncio.get_event_loop().create_task(self._serve())
+
+    async def shutdown(self) -> None:
+        """Stop the workers; running jobs resume from their last chunk on restart"""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    def stats(self) -> dict:
+        """Job counts by status"""
+        with self._lock:
+            counts = {row[0]: row[1] for row in self._connection().execute(
+                "SELECT status, COUNT(*) FROM jobs GROUP BY status"
+            )}
+        return {
+            "workers": self.workers,
+            "running": len(self._running),
+            "jobs": {status: counts.get(status, 0) for status in ACTIVE_STATES + FINISHED_STATES},
+        }
+
+# Global job queue instance
+job_queue = JobQueue()
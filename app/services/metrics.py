@@ -0,0 +1,135 @@
+"""
+Latency histograms and gauges exported in Prometheus text format
+"""
+import time
+import threading
+from bisect import bisect_left
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
+
+# Upper bounds in seconds, from cache hits to long multi-sentence syntheses
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+class Histogram:
+    """Cumulative-bucket histogram with a single `stage` label"""
+
+    def __init__(self, name: str, documentation: str, buckets: Tuple[float, ...] = DEFAULT_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.buckets = tuple(buckets)
+        self._series: Dict[str, list] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, stage: str, value: float) -> None:
+        """Record one observation for `stage`"""
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(stage)
+            if series is None:
+                # Per-bucket counts (last one is +Inf), then sum
+                series = self._series[stage] = [0] * (len(self.buckets) + 1) + [0.0]
+            series[index] += 1
+            series[-1] += value
+
+    def render(self) -> List[str]:
+        """Exposition lines for every stage seen so far"""
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            snapshot = {stage: list(series) for stage, series in self._series.items()}
+        for stage, series in sorted(snapshot.items()):
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float('inf'),), series):
+                cumulative += count
+                le = '+Inf' if bound == float('inf') else repr(bound)
+                lines.append(f'{self.name}_bucket{{stage="{stage}",le="{le}"}} {cumulative}')
+            lines.append(f'{self.name}_sum{{stage="{stage}"}} {series[-1]}')
+            lines.append(f'{self.name}_count{{stage="{stage}"}} {cumulative}')
+        return lines
+
+class Metrics:
+    """Registry of stage histograms and scrape-time gauges
+
+    Observing costs a bisect and a short lock; gauges are callbacks that
+    only run when /metrics is scraped. Inference worker processes buffer
+    their observations instead, and the parent replays them with each reply.
+    """
+
+    def __init__(self):
+        self.histograms: Dict[str, Histogram] = {}
+        self._gauges: List[Tuple[str, str, Callable[[], float]]] = []
+        self._buffer: Optional[list] = None
+
+    def histogram(self, name: str, documentation: str) -> Histogram:
+        """Register a stage histogram"""
+        self.histograms[name] = Histogram(name, documentation)
+        return self.histograms[name]
+
+    def gauge(self, name: str, documentation: str, read: Callable[[], float]) -> None:
+        """Register a gauge whose value is read at scrape time"""
+        self._gauges.append((name, documentation, read))
+
+    def observe(self, histogram: Histogram, stage: str, value: float) -> None:
+        """Record a stage duration, or buffer it inside a worker process"""
+        if self._buffer is not None:
+            self._buffer.append((histogram.name, stage, value))
+        else:
+            histogram.observe(stage, value)
+
+    @contextmanager
+    def time(self, histogram: Histogram, stage: str) -> Iterator[None]:
+        """Time the enclosed block as `stage`"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(histogram, stage, time.perf_counter() - start)
+
+    def queued(self, histogram: Histogram, fn: Callable, *args) -> Callable[[], object]:
+        """Wrap an executor call so the wait for a thread is recorded as queue_wait"""
+        submitted = time.perf_counter()
+
+        def run():
+            self.observe(histogram, "queue_wait", time.perf_counter() - submitted)
+            return fn(*args)
+        return run
+
+    def start_buffering(self) -> None:
+        """Keep observations for `drain` instead of recording them (worker processes)"""
+        self._buffer = []
+
+    def drain(self) -> list:
+        """Observations buffered since the last drain"""
+        buffered, self._buffer = self._buffer, []
+        return buffered
+
+    def replay(self, observations: list) -> None:
+        """Record observations drained in a worker process"""
+        for name, stage, value in observations:
+            self.histograms[name].observe(stage, value)
+
+    def render(self) -> str:
+        """Every metric in Prometheus text exposition format"""
+        lines = []
+        for histogram in self.histograms.values():
+            lines.extend(histogram.render())
+        for name, documentation, read in self._gauges:
+            try:
+                value = read()
+            except Exception:
+                continue
+            lines.append(f"# HELP {name} {documentation}")
+            lines.append(f"# TYPE {name} gauge")
+            lines.append(f"{name} {value}")
+        return "\n".join(lines) + "\n"
+
+# Global metrics registry
+metrics = Metrics()
+
+clone_stages = metrics.histogram(
+    "openvoice_clone_stage_seconds",
+    "Time spent in each stage of voice cloning"
+)
+extract_stages = metrics.histogram(
+    "openvoice_extract_stage_seconds",
+    "Time spent in each stage of voice embedding extraction"
+)
@@ -0,0 +1,183 @@
+"""
+Lazy, memory-budgeted registry of MeloTTS models
+"""
+import json
+import time
+import hashlib
+import threading
+import torch
+from collections import OrderedDict
+from typing import Dict, List, Optional, Tuple
+
+from melo.api import TTS
+from melo.download_utils import load_or_download_config as load_melo_config
+
+from app.config.settings import (
+    DEVICE, MODEL_LANGUAGES, MODEL_PINNED_LANGUAGES, MODEL_MEMORY_BUDGET_MB, logger
+)
+from app.services.inference_backend import inference_backend
+
+class ModelRegistry:
+    """Load MeloTTS models on first use and evict the least recently used ones
+
+    Pinned languages are never evicted. Other models are evicted in LRU order
+    once the resident set exceeds the memory budget (0 disables the budget).
+    """
+
+    def __init__(
+        self,
+        device: str = DEVICE,
+        languages: List[str] = MODEL_LANGUAGES,
+        pinned: List[str] = MODEL_PINNED_LANGUAGES,
+        memory_budget_mb: int = MODEL_MEMORY_BUDGET_MB
+    ):
+        self.device = device
+        self.languages = list(languages)
+        self.pinned = set(pinned)
+        self.memory_budget = memory_budget_mb * 1024 * 1024
+        self._models = OrderedDict()
+        self._info: Dict[str, dict] = {}
+        self._configs = {}
+        self._speaker_index: Optional[Tuple[Dict[str, List[str]], str]] = None
+        self._lock = threading.Lock()
+        self._load_locks = {language: threading.Lock() for language in self.languages}
+
+    @staticmethod
+    def _model_size(model: TTS) -> int:
+        """Bytes held by the parameters and buffers of a model"""
+        tensors = list(model.parameters()) + list(model.buffers())
+        return sum(t.numel() * t.element_size() for t in tensors)
+
+    def get(self, language: str) -> TTS:
+        """Return the model for `language`, loading it if it is not resident"""
+        if language not in self._load_locks:
+            raise KeyError(f"Unsupported model language: {language}")
+
+        with self._lock:
+            model = self._models.get(language)
+            if model is not None:
+                self._models.move_to_end(language)
+                self._info[language]["last_used"] = time.time()
+                return model
+
+        # Serialize loads per language so concurrent first requests share one load
+        with self._load_locks[language]:
+            with self._lock:
+                model = self._models.get(language)
+                if model is not None:
+                    self._models.move_to_end(language)
+                    return model
+
+            start = time.perf_counter()
+            model = TTS(language=language, device=self.device)
+            load_seconds = time.perf_counter() - start
+            size = self._model_size(model)
+            logger.info(f"Loaded MeloTTS model {language} ({size / 1e6:.1f} MB) in {load_seconds:.2f}s")
+            inference_backend.prepare(model.model, f"MeloTTS {language}")
+
+            with self._lock:
+                self._models[language] = model
+                self._info[language] = {
+                    "size_bytes": size,
+                    "load_seconds": load_seconds,
+                    "loaded_at": time.time(),
+                    "last_used": time.time(),
+                }
+                self._evict_over_budget(keep=language)
+        return model
+
+    def _evict_over_budget(self, keep: str) -> None:
+        """Evict unpinned models in LRU order until under budget (lock held)"""
+        if self.memory_budget <= 0:
+            return
+        evicted = False
+        for language in list(self._models):
+            if self.resident_bytes() <= self.memory_budget:
+                break
+            if language == keep or language in self.pinned:
+                continue
+            # Requests already holding the model keep it alive until they finish
+            del self._models[language]
+            info = self._info.pop(language)
+            evicted = True
+            logger.info(f"Evicted MeloTTS model {language} ({info['size_bytes'] / 1e6:.1f} MB)")
+        if evicted and torch.cuda.is_available():
+            torch.cuda.empty_cache()
+
+    def resident_bytes(self) -> int:
+        """Total bytes held by resident models"""
+        return sum(info["size_bytes"] for info in self._info.values())
+
+    def is_resident(self, language: str) -> bool:
+        """Check if a model is currently loaded"""
+        return language in self._models
+
+    def resident_languages(self) -> List[str]:
+        """Languages whose models are currently loaded"""
+        with self._lock:
+            return list(self._models)
+
+    def load_pinned(self) -> None:
+        """Load every pinned model"""
+        for language in self.languages:
+            if language in self.pinned:
+                self.get(language)
+
+    def get_config(self, language: str):
+        """Return the hparams of a model without loading its weights"""
+        with self._lock:
+            model = self._models.get(language)
+            if model is not None:
+                return model.hps
+            hps = self._configs.get(language)
+        if hps is None:
+            hps = load_melo_config(language)
+            with self._lock:
+                self._configs[language] = hps
+        return hps
+
+    def get_speakers(self, language: str) -> List[str]:
+        """Speaker names of a model, read from its config"""
+        return list(self.get_config(language).data.spk2id.keys())
+
+    def resolve_speaker(self, language: str, speaker_key: str) -> str:
+        """Speaker name a request will actually use, falling back to the first speaker"""
+        speakers = self.get_speakers(language)
+        if speaker_key in speakers:
+            return speaker_key
+        return speakers[0] if speakers else 'default'
+
+    def has_speaker_index(self) -> bool:
+        """Check if the speaker index has been built"""
+        return self._speaker_index is not None
+
+    def speaker_index(self, languages: List[str]) -> Tuple[Dict[str, List[str]], str]:
+        """Language -> speakers index with its ETag, built once from model configs"""
+        if self._speaker_index is None:
+            index = {}
+            for language in languages:
+                try:
+                    index[language] = self.get_speakers(language)
+                except Exception as e:
+                    logger.warning(f"Could not load speakers for language {language}: {e}")
+                    index[language] = []
+            digest = hashlib.sha1(json.dumps(index, sort_keys=True).encode('utf-8')).hexdigest()
+            self._speaker_index = (index, f'"{digest[:16]}"')
+        return self._speaker_index
+
+    def status(self) -> dict:
+        """Resident models with their sizes and load times"""
+        with self._lock:
+            models = [
+                {"language": language, "pinned": language in self.pinned, **self._info[language]}
+                for language in self._models
+            ]
+        return {
+            "inference_backend": inference_backend.status(),
+            "memory_budget_bytes": self.memory_budget,
+            "resident_bytes": sum(m["size_bytes"] for m in models),
+            "models": models,
+        }
+
+# Global model registry instance
+model_registry = ModelRegistry()
@@ -0,0 +1,283 @@
+"""
+Pre-forked inference worker processes sharing model weights
+"""
+import time
+import asyncio
+import multiprocessing
+import numpy as np
+import torch
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Optional, Tuple
+from fastapi import HTTPException
+
+from app.config.settings import INFERENCE_PROCESSES, INFERENCE_TORCH_THREADS, logger
+from app.services.voice_service import voice_service
+from app.services.model_registry import model_registry
+from app.services.metrics import metrics, clone_stages, extract_stages
+
+# Methods of VoiceService that may be called in a worker process
+_WORKER_METHODS = {
+    'generate_cloned_voice', 'generate_cloned_voice_batch', 'extract_voice_embedding',
+    'split_voice_segments', 'encode_voice_segments',
+}
+_EXTRACT_METHODS = {'extract_voice_embedding', 'split_voice_segments', 'encode_voice_segments'}
+
+def _to_device(value):
+    """Turn numpy embeddings sent over the pipe back into device tensors"""
+    if isinstance(value, np.ndarray):
+        return torch.from_numpy(value).to(voice_service.device)
+    if isinstance(value, list):
+        return [_to_device(v) for v in value]
+    return value
+
+def _to_wire(value):
+    """Send tensors over the pipe as plain numpy arrays"""
+    if isinstance(value, torch.Tensor):
+        return value.detach().cpu().numpy()
+    if isinstance(value, (list, tuple)):
+        return type(value)(_to_wire(v) for v in value)
+    return value
+
+def _worker_main(conn, torch_threads: int) -> None:
+    """Serve VoiceService calls received over `conn` until told to stop"""
+    torch.set_num_threads(torch_threads)
+    # Stage timings travel back to the parent with each reply
+    metrics.start_buffering()
+    try:
+        torch.set_num_interop_threads(1)
+    except RuntimeError:
+        # Already initialized in the parent before fork
+        pass
+
+    while True:
+        message = conn.recv()
+        if message is None:
+            break
+        method, args = message
+        try:
+            if method not in _WORKER_METHODS:
+                raise ValueError(f"Unknown worker method: {method}")
+            result = getattr(voice_service, method)(*_to_device(list(args)))
+            conn.send((True, _to_wire(result), metrics.drain()))
+        except Exception as e:
+            conn.send((False, f"{type(e).__name__}: {e}", metrics.drain()))
+    conn.close()
+
+class InferenceProcessPool:
+    """Load models once in this process and fork inference workers
+
+    Weights are moved to shared memory before fork, so every worker maps the
+    same pages instead of holding its own copy. Each worker owns one end of a
+    pipe and serves one request at a time; requests wait for an idle worker.
+    Only CPU inference is supported, since CUDA cannot be used after fork.
+
+    A worker whose pipe fails (the process crashed or was OOM-killed) is
+    dropped rather than respawned: forking again while serving could hand
+    the child a lock held by another thread. Once no worker is left the pool
+    is exhausted: it reports not started, calls fail with 503 and readiness
+    stays down until the service is restarted.
+    """
+
+    def __init__(self, processes: int = INFERENCE_PROCESSES, torch_threads: int = INFERENCE_TORCH_THREADS):
+        self.processes = processes
+        self.torch_threads = torch_threads
+        self._workers: List[multiprocessing.Process] = []
+        self._connections = []
+        self._idle: Optional[asyncio.Queue] = None
+        self._receiver: Optional[ThreadPoolExecutor] = None
+        self.lost_workers = 0
+
+    @property
+    def started(self) -> bool:
+        """Check if worker processes are running"""
+        return bool(self._workers)
+
+    @property
+    def exhausted(self) -> bool:
+        """Check if every worker process has died since the pool started"""
+        return self.lost_workers > 0 and not self._workers
+
+    def status(self) -> dict:
+        """Worker state for readiness: not started, running or exhausted"""
+        if self.started:
+            state = "running"
+        elif self.exhausted:
+            state = "exhausted"
+        else:
+            state = "not started"
+        return {"state": state, "alive": len(self._workers), "lost": self.lost_workers}
+
+    def _drop(self, conn) -> None:
+        """Forget the worker behind a failed pipe, waking waiters once none is left"""
+        if conn not in self._connections:
+            return
+        index = self._connections.index(conn)
+        process = self._workers.pop(index)
+        self._connections.pop(index)
+        self.lost_workers += 1
+        conn.close()
+        if process.is_alive():
+            process.terminate()
+        process.join(timeout=1)
+        logger.error(
+            f"Inference worker {process.name} exited with code {process.exitcode}, "
+            f"{len(self._workers)} left"
+        )
+        if not self._workers:
+            # Wakes requests blocked on an idle worker; each puts it back for the next
+            self._idle.put_nowait(None)
+
+    def _reuse(self, conn, reply: asyncio.Future) -> None:
+        """Return a worker to the idle queue once its abandoned reply has arrived"""
+        if reply.cancelled() or reply.exception() is not None:
+            self._drop(conn)
+        else:
+            self._idle.put_nowait(conn)
+
+    @staticmethod
+    def _unavailable() -> HTTPException:
+        return HTTPException(
+            status_code=503,
+            detail="No inference worker available",
+            headers={"Retry-After": "5"}
+        )
+
+    @staticmethod
+    def _share_weights() -> None:
+        """Load resident models in this process and move their weights to shared memory"""
+        model_registry.load_pinned()
+        voice_service.tone_color_converter.model.share_memory()
+        for language in model_registry.resident_languages():
+            model_registry.get(language).share_memory()
+
+    async def start(self) -> None:
+        """Share model weights and fork the worker processes"""
+        if voice_service.device != "cpu":
+            raise RuntimeError("Process serving mode requires DEVICE=cpu")
+
+        # Copying weights to shared memory takes seconds, so off the event loop;
+        # the fork itself happens here once that thread is done
+        loop = asyncio.get_event_loop()
+        await loop.run_in_executor(None, self._share_weights)
+
+        context = multiprocessing.get_context('fork')
+        for index in range(self.processes):
+            parent_conn, child_conn = context.Pipe()
+            process = context.Process(
+                target=_worker_main,
+                args=(child_conn, self.torch_threads),
+                name=f"inference-worker-{index}",
+                daemon=True
+            )
+            process.start()
+            child_conn.close()
+            self._workers.append(process)
+            self._connections.append(parent_conn)
+
+        self._idle = asyncio.Queue()
+        for conn in self._connections:
+            self._idle.put_nowait(conn)
+        self._receiver = ThreadPoolExecutor(max_workers=self.processes, thread_name_prefix="inference-recv")
+        logger.info(
+            f"Started {self.processes} inference processes with {self.torch_threads} torch threads each"
+        )
+
+    async def call(self, method: str, *args):
+        """Run a VoiceService method in an idle worker process"""
+        start = time.perf_counter()
+        stages = extract_stages if method in _EXTRACT_METHODS else clone_stages
+        loop = asyncio.get_event_loop()
+        while True:
+            if not self._workers:
+                raise self._unavailable()
+            conn = await self._idle.get()
+            if conn is None:
+                self._idle.put_nowait(None)
+                raise self._unavailable()
+            try:
+                conn.send((method, _to_wire(args)))
+                break
+            except OSError as e:
+                # Died while idle; the request has not started, so try another
+                logger.error(f"Inference worker pipe failed, dropping worker: {e}")
+                self._drop(conn)
+        metrics.observe(stages, "queue_wait", time.perf_counter() - start)
+
+        reply = loop.run_in_executor(self._receiver, conn.recv)
+        try:
+            ok, payload, observations = await asyncio.shield(reply)
+        except asyncio.CancelledError:
+            # The worker still answers; drain the reply before reusing the pipe
+            reply.add_done_callback(lambda _: self._reuse(conn, reply))
+            raise
+        except (EOFError, OSError) as e:
+            logger.error(f"Inference worker pipe failed, dropping worker: {e}")
+            self._drop(conn)
+            raise RuntimeError("Inference worker exited while serving the request") from e
+        self._idle.put_nowait(conn)
+        metrics.replay(observations)
+        if not ok:
+            raise RuntimeError(payload)
+        return payload
+
+    async def generate_cloned_voice(
+        self,
+        text: str,
+        language: str,
+        speaker_key: str,
+        speed: float,
+        target_se: torch.Tensor
+    ) -> np.ndarray:
+        """VoiceService.generate_cloned_voice in a worker process"""
+        return await self.call('generate_cloned_voice', text, language, speaker_key, speed, target_se)
+
+    async def generate_cloned_voice_batch(
+        self,
+        texts: List[str],
+        language: str,
+        speaker_key: str,
+        speed: float,
+        target_ses: List[torch.Tensor]
+    ) -> List[np.ndarray]:
+        """VoiceService.generate_cloned_voice_batch in a worker process"""
+        return await self.call('generate_cloned_voice_batch', texts, language, speaker_key, speed, target_ses)
+
+    async def extract_voice_embedding(self, filepath: str) -> Tuple[torch.Tensor, str]:
+        """VoiceService.extract_voice_embedding in a worker process"""
+        target_se, audio_name = await self.call('extract_voice_embedding', filepath)
+        return torch.from_numpy(target_se), audio_name
+
+    async def split_voice_segments(self, filepath: str) -> Tuple[str, List[str]]:
+        """VoiceService.split_voice_segments in a worker process"""
+        return tuple(await self.call('split_voice_segments', filepath))
+
+    async def encode_voice_segments(self, segment_lists: List[List[str]]) -> List[torch.Tensor]:
+        """VoiceService.encode_voice_segments in a worker process"""
+        embeddings = await self.call('encode_voice_segments', segment_lists)
+        return [torch.from_numpy(se) for se in embeddings]
+
+    def idle_workers(self) -> int:
+        """Number of worker processes waiting for a request"""
+        return self._idle.qsize() if self._workers else 0
+
+    def shutdown(self) -> None:
+        """Stop the worker processes"""
+        for conn in self._connections:
+            try:
+                conn.send(None)
+                conn.close()
+            except OSError:
+                pass
+        for process in self._workers:
+            process.join(timeout=5)
+            if process.is_alive():
+                process.terminate()
+        if self._receiver is not None:
+            self._receiver.shutdown(wait=False)
+            self._receiver = None
+        self._workers.clear()
+        self._connections.clear()
+        logger.info("Inference processes shutdown completed")
+
+# Global inference process pool instance
+process_pool = InferenceProcessPool()
@@ -0,0 +1,163 @@
+"""
+Size-bounded on-disk cache of synthesized audio
+"""
+import os
+import json
+import asyncio
+import hashlib
+import threading
+from collections import OrderedDict
+from typing import Awaitable, Callable, Optional, Tuple
+
+from app.config.settings import (
+    RESULT_CACHE_FOLDER, RESULT_CACHE_MAX_BYTES, MODEL_VERSION, logger
+)
+
+class ResultCache:
+    """LRU cache of encoded audio keyed on a hash of the request parameters
+
+    Entries are files under `folder`; recency is kept in memory and mirrored
+    to file mtimes so the LRU order survives restarts. Identical requests in
+    flight at the same time share one synthesis.
+    """
+
+    def __init__(self, folder: str = RESULT_CACHE_FOLDER, max_bytes: int = RESULT_CACHE_MAX_BYTES):
+        self.folder = folder
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.total_bytes = 0
+        self._entries = OrderedDict()
+        self._pending = {}
+        self._lock = threading.Lock()
+        self._loaded = False
+
+    @staticmethod
+    def make_key(**params) -> str:
+        """Hash request parameters (plus the model version) into a cache key"""
+        payload = json.dumps({**params, "model_version": MODEL_VERSION}, sort_keys=True, ensure_ascii=False)
+        return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.folder, f"{key}.bin")
+
+    def _load_index(self) -> None:
+        """Rebuild the LRU index from the cache folder (oldest first)"""
+        with self._lock:
+            if self._loaded:
+                return
+            os.makedirs(self.folder, exist_ok=True)
+            entries = []
+            with os.scandir(self.folder) as it:
+                for entry in it:
+                    if entry.is_file() and entry.name.endswith('.bin'):
+                        stat = entry.stat()
+                        entries.append((stat.st_mtime, entry.name[:-len('.bin')], stat.st_size))
+            for _, key, size in sorted(entries):
+                self._entries[key] = size
+                self.total_bytes += size
+            self._loaded = True
+
+    def _read(self, key: str) -> Optional[bytes]:
+        """Read a cached entry from disk, marking it most recently used"""
+        self._load_index()
+        with self._lock:
+            if key not in self._entries:
+                return None
+            self._entries.move_to_end(key)
+        path = self._path(key)
+        try:
+            with open(path, 'rb') as f:
+                data = f.read()
+            os.utime(path)
+            return data
+        except OSError:
+            with self._lock:
+                size = self._entries.pop(key, None)
+                if size is not None:
+                    self.total_bytes -= size
+            return None
+
+    def _write(self, key: str, data: bytes) -> None:
+        """Store an entry and evict least recently used ones over the quota"""
+        self._load_index()
+        if len(data) > self.max_bytes:
+            return
+        path = self._path(key)
+        temp_path = f"{path}.tmp"
+        with open(temp_path, 'wb') as f:
+            f.write(data)
+        os.replace(temp_path, path)
+
+        evicted = []
+        with self._lock:
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self.total_bytes -= previous
+            self._entries[key] = len(data)
+            self.total_bytes += len(data)
+            while self.total_bytes > self.max_bytes:
+                old_key, size = self._entries.popitem(last=False)
+                self.total_bytes -= size
+                evicted.append(old_key)
+        for old_key in evicted:
+            try:
+                os.remove(self._path(old_key))
+            except OSError:
+                pass
+        if evicted:
+            logger.info(f"Result cache evicted {len(evicted)} entries")
+
+    async def get_or_create(self, key: str, create: Callable[[], Awaitable[bytes]]) -> Tuple[bytes, bool]:
+        """Return (data, hit) for `key`, running `create` once on a miss
+
+        Concurrent callers with the same key wait for the first one's result.
+        """
+        loop = asyncio.get_event_loop()
+        data = await loop.run_in_executor(None, self._read, key)
+        if data is not None:
+            self.hits += 1
+            return data, True
+
+        pending = self._pending.get(key)
+        if pending is not None:
+            self.hits += 1
+            return await asyncio.shield(pending), True
+
+        self.misses += 1
+        pending = loop.create_future()
+        pending.add_done_callback(lambda f: f.cancelled() or f.exception())
+        self._pending[key] = pending
+        try:
+            data = await create()
+            pending.set_result(data)
+        except asyncio.CancelledError:
+            pending.cancel()
+            raise
+        except Exception as e:
+            pending.set_exception(e)
+            raise
+        finally:
+            del self._pending[key]
+
+        try:
+            await loop.run_in_executor(None, self._write, key, data)
+        except OSError as e:
+            logger.warning(f"Could not store result cache entry: {e}")
+        return data, False
+
+    def stats(self) -> dict:
+        """Cache size and hit/miss counters"""
+        total = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "bytes": self.total_bytes,
+            "max_bytes": self.max_bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / total if total else 0.0,
+            "in_flight": len(self._pending),
+        }
+
+# Global result cache instance
+result_cache = ResultCache()
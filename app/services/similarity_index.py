@@ -0,0 +1,229 @@
+"""
+In-memory cosine similarity index over stored voice embeddings
+"""
+import os
+import time
+import threading
+import numpy as np
+import torch
+from typing import Dict, List, Optional, Tuple
+
+from app.config.settings import OUTPUT_FOLDER, SIMILARITY_BLOCK_ROWS, logger
+from app.services.embedding_store import embedding_store
+
+class SimilarityIndex:
+    """Unit-normalized embeddings as rows of one contiguous float32 matrix
+
+    Cosine similarity of a query against every embedding is a single matrix
+    product, computed in blocks of SIMILARITY_BLOCK_ROWS rows so scoring
+    memory stays bounded. The index is built once from the embedding store
+    (and legacy .pth files), then kept current by `add` and `remove`;
+    removal moves the last row into the freed slot so rows stay packed.
+    Stored embeddings are loaded without holding the index lock; adds and
+    removes made meanwhile are journaled and replayed onto the result.
+    """
+
+    def __init__(self, block_rows: int = SIMILARITY_BLOCK_ROWS):
+        self.block_rows = block_rows
+        self.built = False
+        self._names: List[str] = []
+        self._rows: Dict[str, int] = {}
+        self._matrix = np.zeros((0, 0), dtype=np.float32)
+        self._lock = threading.RLock()
+        # Changes made while a rebuild loads, by name (None for a removal)
+        self._journal: Optional[Dict[str, Optional[np.ndarray]]] = None
+        self._rebuild_lock = threading.Lock()
+
+    @staticmethod
+    def _normalize(vectors: np.ndarray) -> np.ndarray:
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        return vectors / np.maximum(norms, 1e-12)
+
+    @staticmethod
+    def _as_vector(embedding) -> np.ndarray:
+        if isinstance(embedding, torch.Tensor):
+            embedding = embedding.detach().cpu().float().numpy()
+        return np.asarray(embedding, dtype=np.float32).reshape(-1)
+
+    @staticmethod
+    def _legacy_embeddings(known: set) -> Tuple[List[str], List[np.ndarray]]:
+        """Embeddings still stored as .pth files in OUTPUT_FOLDER"""
+        names, vectors = [], []
+        if not os.path.exists(OUTPUT_FOLDER):
+            return names, vectors
+        with os.scandir(OUTPUT_FOLDER) as it:
+            for entry in it:
+                if not entry.name.endswith('.pth'):
+                    continue
+                name = entry.name[:-len('.pth')]
+                if name in known:
+                    continue
+                try:
+                    vectors.append(SimilarityIndex._as_vector(torch.load(entry.path, map_location='cpu')))
+                    names.append(name)
+                except Exception as e:
+                    logger.warning(f"Skipping unreadable embedding {entry.name}: {e}")
+        return names, vectors
+
+    def rebuild(self) -> None:
+        """Load every stored embedding into the index"""
+        with self._rebuild_lock:
+            self._rebuild()
+
+    def _rebuild(self) -> None:
+        """Load and swap in the index (rebuild lock held)"""
+        start = time.perf_counter()
+        with self._lock:
+            self._journal = {}
+        try:
+            names, matrix = embedding_store.load_all()
+            legacy_names, legacy_vectors = self._legacy_embeddings(set(names))
+            if legacy_vectors:
+                legacy = np.stack(legacy_vectors)
+                matrix = legacy if matrix.shape[0] == 0 else np.concatenate([matrix, legacy])
+                names = names + legacy_names
+            matrix = self._normalize(np.ascontiguousarray(matrix, dtype=np.float32))
+        except BaseException:
+            with self._lock:
+                self._journal = None
+            raise
+
+        with self._lock:
+            self._names = list(names)
+            self._rows = {name: row for row, name in enumerate(self._names)}
+            self._matrix = matrix
+            # Replay what changed while the embeddings were loading
+            for name, vector in self._journal.items():
+                if vector is None:
+                    self._discard(name)
+                else:
+                    self._insert(name, vector)
+            self._journal = None
+            self.built = True
+        logger.info(f"Indexed {len(names)} embeddings for similarity search in {time.perf_counter() - start:.2f}s")
+
+    def ensure_built(self) -> None:
+        """Build the index unless that already happened"""
+        if self.built:
+            return
+        with self._rebuild_lock:
+            if not self.built:
+                self._rebuild()
+
+    def _ensure_capacity(self, dim: int) -> None:
+        """Grow the matrix geometrically so appends are amortized O(dim) (lock held)"""
+        count = len(self._names)
+        if self._matrix.shape[1] != dim:
+            if count:
+                raise ValueError(f"Embedding has {dim} values, index expects {self._matrix.shape[1]}")
+            self._matrix = np.zeros((16, dim), dtype=np.float32)
+        if count == self._matrix.shape[0]:
+            grown = np.zeros((max(16, count * 2), dim), dtype=np.float32)
+            grown[:count] = self._matrix[:count]
+            self._matrix = grown
+
+    def _insert(self, name: str, vector: np.ndarray) -> None:
+        """Set the row for `name`, appending one if needed (lock held)"""
+        row = self._rows.get(name)
+        if row is None:
+            self._ensure_capacity(vector.size)
+            row = len(self._names)
+            self._names.append(name)
+            self._rows[name] = row
+        self._matrix[row] = vector
+
+    def _discard(self, name: str) -> bool:
+        """Drop the row for `name`, moving the last row into its slot (lock held)"""
+        row = self._rows.pop(name, None)
+        if row is None:
+            return False
+        last = len(self._names) - 1
+        if row != last:
+            moved = self._names[last]
+            self._matrix[row] = self._matrix[last]
+            self._names[row] = moved
+            self._rows[moved] = row
+        self._names.pop()
+        return True
+
+    def add(self, name: str, embedding) -> None:
+        """Insert or replace one embedding; only journaled until the index is built"""
+        vector = self._normalize(self._as_vector(embedding)[None, :])[0]
+        with self._lock:
+            if self._journal is not None:
+                self._journal[name] = vector
+            if self.built:
+                self._insert(name, vector)
+
+    def remove(self, name: str) -> bool:
+        """Drop an embedding"""
+        with self._lock:
+            if self._journal is not None:
+                self._journal[name] = None
+            return self._discard(name) if self.built else False
+
+    def vector(self, name: str) -> Optional[np.ndarray]:
+        """Normalized vector of an indexed embedding"""
+        with self._lock:
+            row = self._rows.get(name)
+            return None if row is None else self._matrix[row].copy()
+
+    def query_many(
+        self,
+        embeddings: np.ndarray,
+        k: int = 10,
+        exclude: Optional[List[Optional[str]]] = None
+    ) -> List[List[Tuple[str, float]]]:
+        """Top-k (name, cosine similarity) for each row of `embeddings`, best first
+
+        `exclude` optionally names one embedding per query to leave out of
+        its results, e.g. the query itself.
+        """
+        queries = self._normalize(np.atleast_2d(np.asarray(embeddings, dtype=np.float32)))
+        want = k + 1 if exclude else k
+        with self._lock:
+            count = len(self._names)
+            if count == 0:
+                return [[] for _ in queries]
+            if queries.shape[1] != self._matrix.shape[1]:
+                raise ValueError(f"Query has {queries.shape[1]} values, index expects {self._matrix.shape[1]}")
+
+            # Per block, keep only each query's best candidates
+            best_rows, best_scores = [], []
+            for start in range(0, count, self.block_rows):
+                block = self._matrix[start:min(start + self.block_rows, count)]
+                scores = queries @ block.T
+                take = min(want, scores.shape[1])
+                top = np.argpartition(-scores, take - 1, axis=1)[:, :take]
+                best_rows.append(top + start)
+                best_scores.append(np.take_along_axis(scores, top, axis=1))
+            rows = np.concatenate(best_rows, axis=1)
+            scores = np.concatenate(best_scores, axis=1)
+            names = [[self._names[row] for row in query_rows] for query_rows in rows]
+
+        results = []
+        for index, order in enumerate(np.argsort(-scores, axis=1)):
+            skip = exclude[index] if exclude else None
+            matches = [
+                (names[index][i], float(scores[index, i])) for i in order if names[index][i] != skip
+            ]
+            results.append(matches[:k])
+        return results
+
+    def query(self, embedding, k: int = 10, exclude: Optional[str] = None) -> List[Tuple[str, float]]:
+        """Top-k (name, cosine similarity) for one embedding, best first"""
+        vector = self._as_vector(embedding)
+        return self.query_many(vector[None, :], k, [exclude] if exclude else None)[0]
+
+    def stats(self) -> dict:
+        """Indexed embedding count and matrix footprint"""
+        with self._lock:
+            return {
+                "built": self.built,
+                "embeddings": len(self._names),
+                "capacity": self._matrix.shape[0],
+                "bytes": self._matrix.nbytes,
+            }
+
+# Global similarity index instance
+similarity_index = SimilarityIndex()
@@ -1,45 +1,76 @@
 """
 Voice processing service
 """
+import re
 import time
+import threading
 import torch
 import os
-from typing import Tuple
+import librosa
+import numpy as np
+import soundfile
+import torch.nn.functional as F
+from glob import glob
+from collections import defaultdict
+from typing import List, Tuple, Optional
 from concurrent.futures import ThreadPoolExecutor
 
 try:
     from openvoice import se_extractor
     from openvoice.api import ToneColorConverter
+    from openvoice.mel_processing import spectrogram_torch
     from openvoice.download_utils import load_or_download_config, load_or_download_model
     from melo.api import TTS
+    from melo import utils as melo_utils
 except ImportError as e:
     print(f"Error importing required libraries: {e}")
     print("Please make sure OpenVoice and MeloTTS are installed")
     raise
 
-from app.config.settings import DEVICE, MAX_WORKERS, logger, MODELS
+from app.config.settings import DEVICE, MAX_WORKERS, CONVERTER_SLOTS, logger
+from app.services.model_registry import model_registry
+from app.services.file_index import file_index
+from app.services.frontend_cache import frontend_cache
+from app.services.inference_backend import inference_backend
+from app.services.metrics import metrics, clone_stages, extract_stages
 
 class VoiceService:
     """Service for voice processing operations"""
-    
+
+    ENCODE_MESSAGE = "@LocaAI"
+
     def __init__(self):
         self.device = DEVICE
         self.executor = ThreadPoolExecutor(max_workers=MAX_WORKERS)
         self.tone_color_converter = None
         self.source_se_loaded = {}
-        self._initialize_models()
-    
-    def _initialize_models(self):
-        """Initialize OpenVoice models"""
-        try:
-            config = load_or_download_config()
-            self.tone_color_converter = ToneColorConverter(config, device=self.device)
-            ckpt = load_or_download_model()
-            self.tone_color_converter.load_ckpt(ckpt)
-            logger.info("OpenVoice models loaded successfully")
-        except Exception as e:
-            logger.error(f"Error loading OpenVoice models: {e}")
-            self.tone_color_converter = None
+        # Each MeloTTS model runs on one thread at a time; converter slots bound
+        # how many threads share the converter (one by default, see CONVERTER_SLOTS)
+        self._source_se_lock = threading.Lock()
+        self._model_slots = {}
+        self._model_slots_lock = threading.Lock()
+        self._converter_slots = threading.BoundedSemaphore(CONVERTER_SLOTS)
+        self._load_lock = threading.Lock()
+
+    def load_models(self) -> None:
+        """Load the OpenVoice tone color converter, once
+
+        Not done at import so the server can bind before models are ready.
+        """
+        with self._load_lock:
+            if self.tone_color_converter is not None:
+                return
+            try:
+                config = load_or_download_config()
+                converter = ToneColorConverter(config, device=self.device)
+                ckpt = load_or_download_model()
+                converter.load_ckpt(ckpt)
+                inference_backend.prepare(converter.model, "converter")
+                self.tone_color_converter = converter
+                logger.info("OpenVoice models loaded successfully")
+            except Exception as e:
+                logger.error(f"Error loading OpenVoice models: {e}")
+                raise
     
     def is_models_loaded(self) -> bool:
         """Check if models are loaded"""
@@ -49,8 +80,139 @@ class VoiceService:
         """Extract voice embedding from audio file"""
         if not self.is_models_loaded():
             raise Exception("Models not loaded")
-        return se_extractor.get_se(filepath, self.tone_color_converter, vad=True)
+        with self._converter_slots:
+            return se_extractor.get_se(filepath, self.tone_color_converter, vad=True)
+
+    def split_voice_segments(self, filepath: str) -> Tuple[str, List[str]]:
+        """VAD-split an audio file into segments, as se_extractor.get_se does"""
+        if not self.is_models_loaded():
+            raise Exception("Models not loaded")
+        audio_name = (
+            f"{os.path.basename(filepath).rsplit('.', 1)[0]}"
+            f"_{self.tone_color_converter.version}_{se_extractor.hash_numpy_array(filepath)}"
+        )
+        with metrics.time(extract_stages, "segmentation"):
+            wavs_folder = se_extractor.split_audio_vad(filepath, target_dir='processed', audio_name=audio_name)
+        segments = sorted(glob(f'{wavs_folder}/*.wav'))
+        if not segments:
+            raise ValueError("No audio segments found!")
+        return audio_name, segments
+
+    def encode_voice_segments(self, segment_lists: List[List[str]]) -> List[torch.Tensor]:
+        """Speaker embeddings for several files' segments in batched encoder passes
+
+        Segments with the same spectrogram length share one forward pass of
+        the reference encoder; each file's embedding is the mean over its
+        segments, matching ToneColorConverter.extract_se.
+        """
+        start = time.perf_counter()
+        hps = self.tone_color_converter.hps
+        groups = defaultdict(list)
+        for owner, segments in enumerate(segment_lists):
+            for fname in segments:
+                audio, _ = librosa.load(fname, sr=hps.data.sampling_rate)
+                y = torch.FloatTensor(audio).to(self.device).unsqueeze(0)
+                spec = spectrogram_torch(
+                    y,
+                    hps.data.filter_length,
+                    hps.data.sampling_rate,
+                    hps.data.hop_length,
+                    hps.data.win_length,
+                    center=False
+                )[0]
+                groups[spec.size(-1)].append((owner, spec))
+
+        embeddings = [[] for _ in segment_lists]
+        with self._converter_slots, inference_backend.context():
+            for items in groups.values():
+                batch = torch.stack([spec for _, spec in items]).to(self.device).transpose(1, 2)
+                gs = self.tone_color_converter.model.ref_enc(batch).unsqueeze(-1)
+                for (owner, _), g in zip(items, gs):
+                    embeddings[owner].append(g.unsqueeze(0).detach())
+        metrics.observe(extract_stages, "encoder", time.perf_counter() - start)
+        return [torch.stack(gs).mean(0) for gs in embeddings]
+
+    def _model_slot(self, language: str) -> threading.Lock:
+        """Exclusive slot of the MeloTTS model for a language
+
+        There is a single model instance per language, and neither its torch
+        modules nor its BERT front end are safe to run from two threads.
+        """
+        with self._model_slots_lock:
+            if language not in self._model_slots:
+                self._model_slots[language] = threading.Lock()
+            return self._model_slots[language]
+
+    def executor_queue_depth(self) -> int:
+        """Number of tasks waiting for an executor thread"""
+        return self.executor._work_queue.qsize()
+
+    def executor_busy(self) -> int:
+        """Number of executor threads running a task"""
+        return len(self.executor._threads) - self.executor._idle_semaphore._value
     
+    @property
+    def output_sample_rate(self) -> int:
+        """Sample rate of the waveforms produced by the tone color converter"""
+        return self.tone_color_converter.hps.data.sampling_rate
+
+    def _convert_waveform(
+        self,
+        audio: np.ndarray,
+        sample_rate: int,
+        src_se: torch.Tensor,
+        tgt_se: torch.Tensor,
+        tau: float = 0.3,
+        message: str = "default"
+    ) -> np.ndarray:
+        """Convert voice tone of an in-memory waveform
+
+        Mirrors ToneColorConverter.convert without the librosa.load round-trip
+        through disk: the waveform is resampled once to the converter rate.
+        """
+        hps = self.tone_color_converter.hps
+        if sample_rate != hps.data.sampling_rate:
+            audio = librosa.resample(audio, orig_sr=sample_rate, target_sr=hps.data.sampling_rate)
+
+        with inference_backend.context():
+            y = torch.from_numpy(np.ascontiguousarray(audio, dtype=np.float32)).to(self.device).unsqueeze(0)
+            spec = spectrogram_torch(
+                y,
+                hps.data.filter_length,
+                hps.data.sampling_rate,
+                hps.data.hop_length,
+                hps.data.win_length,
+                center=False
+            ).to(self.device)
+            spec_lengths = torch.LongTensor([spec.size(-1)]).to(self.device)
+            converted = self.tone_color_converter.model.voice_conversion(
+                spec, spec_lengths, sid_src=src_se, sid_tgt=tgt_se, tau=tau
+            )[0][0, 0].data.cpu().float().numpy()
+
+        return self.tone_color_converter.add_watermark(converted, message)
+
+    def _resolve_speaker(self, model: TTS, speaker_key: str) -> Tuple[str, int]:
+        """Resolve a speaker name to a model speaker id, falling back to the first speaker"""
+        speaker_ids = model.hps.data.spk2id
+        if speaker_key not in speaker_ids:
+            available_speakers = list(speaker_ids.keys())
+            speaker_key = available_speakers[0] if available_speakers else 'default'
+        return speaker_key, speaker_ids[speaker_key]
+
+    def _get_source_se(self, speaker_key: str) -> torch.Tensor:
+        """Source speaker embedding of a MeloTTS speaker"""
+        with self._source_se_lock:
+            if speaker_key not in self.source_se_loaded:
+                self.source_se_loaded[speaker_key] = self.tone_color_converter.load_source_se(speaker_key.lower())
+            return self.source_se_loaded[speaker_key]
+
+    def preload_source_ses(self, language: str) -> int:
+        """Load the source embedding of every speaker of a language, returning the count"""
+        speakers = model_registry.get_speakers(language)
+        for speaker_key in speakers:
+            self._get_source_se(speaker_key)
+        return len(speakers)
+
     def generate_cloned_voice(
         self,
         text: str,
@@ -58,45 +220,233 @@ class VoiceService:
         speaker_key: str,
         speed: float,
         target_se: torch.Tensor,
-        src_path: str,
-        output_path: str = None
-    ):
-        """Generate cloned voice"""
-        # Initialize MeloTTS
-        model = MODELS[language]
-        speaker_ids = model.hps.data.spk2id
-        # Select speaker
-        if speaker_key not in speaker_ids:
-            available_speakers = list(speaker_ids.keys())
-            speaker_key = available_speakers[0] if available_speakers else 'default'
+        output_path: Optional[str] = None
+    ) -> Optional[np.ndarray]:
+        """Generate cloned voice
 
-        speaker_id = speaker_ids[speaker_key]
-        if speaker_key not in self.source_se_loaded:
-            self.source_se_loaded[speaker_key] = self.tone_color_converter.load_source_se(speaker_key.lower())
+        The MeloTTS waveform is handed to the converter in memory. Returns the
+        converted waveform at `output_sample_rate`, or writes it to
+        `output_path` when one is given.
+        """
+        # Get MeloTTS model, loading it on first use
+        with metrics.time(clone_stages, "model_load"):
+            model = model_registry.get(language)
+        speaker_key, speaker_id = self._resolve_speaker(model, speaker_key)
 
         # Generate speech with MeloTTS
-        model.tts_to_file(text, speaker_id, src_path, speed=speed)
+        with self._model_slot(language), metrics.time(clone_stages, "tts"):
+            audio = self._synthesize(model, language, text, speaker_id, speed)
 
         # Convert voice tone
-        encode_message = "@LocaAI"
-        converted = self.tone_color_converter.convert(
-            audio_src_path=src_path,
-            src_se=self.source_se_loaded[speaker_key],
-            tgt_se=target_se,
-            output_path=output_path,
-            message=encode_message
+        src_se = self._get_source_se(speaker_key)
+        with self._converter_slots, metrics.time(clone_stages, "convert"):
+            converted = self._convert_waveform(
+                audio,
+                model.hps.data.sampling_rate,
+                src_se=src_se,
+                tgt_se=target_se,
+                message=self.ENCODE_MESSAGE
+            )
+        if output_path is None:
+            return converted
+
+        soundfile.write(output_path, converted, self.output_sample_rate)
+        file_index.add(output_path)
+        return None
+
+    def _sentence_features(self, model: TTS, model_key: str, sentence: str) -> Tuple[torch.Tensor, ...]:
+        """MeloTTS front-end features (bert, ja_bert, phones, tones, lang_ids) of one sentence
+
+        Runs on `model.language`, as tts_to_file does: the model maps ZH to
+        ZH_MIX_EN and strips suffixes such as VI_MIX_EN. The cache is also
+        keyed on `model_key`, the registry language, since models sharing a
+        `model.language` have their own symbol tables.
+        """
+        language = model.language
+        if language in ['EN', 'ZH_MIX_EN']:
+            sentence = re.sub(r'([a-z])([A-Z])', r'\1 \2', sentence)
+        return frontend_cache.get(
+            model_key,
+            language,
+            sentence,
+            lambda: melo_utils.get_text_for_tts_infer(
+                sentence, language, model.hps, self.device, model.symbol_to_id
+            )
         )
-        return converted
+
+    def _text_features(self, model: TTS, model_key: str, text: str) -> List[Tuple[torch.Tensor, ...]]:
+        """Front-end features of each sentence of `text`, split as tts_to_file does
+
+        Shared by the single and batched paths so their front ends stay identical.
+        """
+        return [
+            self._sentence_features(model, model_key, sentence)
+            for sentence in model.split_sentences_into_pieces(text, model.language, quiet=True)
+        ]
+
+    def _synthesize(
+        self,
+        model: TTS,
+        model_key: str,
+        text: str,
+        speaker_id: int,
+        speed: float,
+        sdp_ratio: float = 0.2,
+        noise_scale: float = 0.6,
+        noise_scale_w: float = 0.8
+    ) -> np.ndarray:
+        """Run MeloTTS sentence by sentence, as tts_to_file does, with cached front-end features"""
+        pieces = []
+        for bert, ja_bert, phones, tones, lang_ids in self._text_features(model, model_key, text):
+            with inference_backend.context():
+                pieces.append(model.model.infer(
+                    phones.to(self.device).unsqueeze(0),
+                    torch.LongTensor([phones.size(0)]).to(self.device),
+                    torch.LongTensor([speaker_id]).to(self.device),
+                    tones.to(self.device).unsqueeze(0),
+                    lang_ids.to(self.device).unsqueeze(0),
+                    bert.to(self.device).unsqueeze(0),
+                    ja_bert.to(self.device).unsqueeze(0),
+                    sdp_ratio=sdp_ratio,
+                    noise_scale=noise_scale,
+                    noise_scale_w=noise_scale_w,
+                    length_scale=1. / speed
+                )[0][0, 0].data.cpu().float().numpy())
+        return model.audio_numpy_concat(pieces, sr=model.hps.data.sampling_rate, speed=speed)
+
+    def _synthesize_batch(
+        self,
+        model: TTS,
+        model_key: str,
+        texts: List[str],
+        speaker_id: int,
+        speed: float,
+        sdp_ratio: float = 0.2,
+        noise_scale: float = 0.6,
+        noise_scale_w: float = 0.8
+    ) -> List[np.ndarray]:
+        """Run MeloTTS for several texts in padded batches
+
+        Every sentence of every text goes through a single forward pass of
+        the acoustic model; outputs are trimmed by their masks and sentences
+        are stitched back per text the same way tts_to_file does.
+        """
+        hop_length = model.hps.data.hop_length
+        owners = []
+        features = []
+        for index, text in enumerate(texts):
+            for sentence_features in self._text_features(model, model_key, text):
+                features.append(sentence_features)
+                owners.append(index)
+
+        lengths = [phones.size(0) for _, _, phones, _, _ in features]
+        max_length = max(lengths)
+
+        def pad(tensor: torch.Tensor) -> torch.Tensor:
+            return F.pad(tensor, (0, max_length - tensor.size(-1)))
+
+        with inference_backend.context():
+            bert = torch.stack([pad(f[0]) for f in features]).to(self.device)
+            ja_bert = torch.stack([pad(f[1]) for f in features]).to(self.device)
+            phones = torch.stack([pad(f[2]) for f in features]).to(self.device)
+            tones = torch.stack([pad(f[3]) for f in features]).to(self.device)
+            lang_ids = torch.stack([pad(f[4]) for f in features]).to(self.device)
+            x_lengths = torch.LongTensor(lengths).to(self.device)
+            speakers = torch.LongTensor([speaker_id] * len(features)).to(self.device)
+            o, _, y_mask, _ = model.model.infer(
+                phones, x_lengths, speakers, tones, lang_ids, bert, ja_bert,
+                sdp_ratio=sdp_ratio,
+                noise_scale=noise_scale,
+                noise_scale_w=noise_scale_w,
+                length_scale=1. / speed
+            )
+            audio_lengths = (y_mask.sum(dim=(1, 2)).long() * hop_length).tolist()
+            audio = o[:, 0].data.cpu().float().numpy()
+
+        sentences = [[] for _ in texts]
+        for row, owner in enumerate(owners):
+            sentences[owner].append(audio[row, :audio_lengths[row]])
+        return [
+            model.audio_numpy_concat(pieces, sr=model.hps.data.sampling_rate, speed=speed)
+            for pieces in sentences
+        ]
+
+    def _convert_batch(
+        self,
+        waveforms: List[np.ndarray],
+        sample_rate: int,
+        src_se: torch.Tensor,
+        tgt_ses: List[torch.Tensor],
+        tau: float = 0.3
+    ) -> List[np.ndarray]:
+        """Tone color conversion of several waveforms in one padded forward pass"""
+        hps = self.tone_color_converter.hps
+        specs = []
+        for audio in waveforms:
+            if sample_rate != hps.data.sampling_rate:
+                audio = librosa.resample(audio, orig_sr=sample_rate, target_sr=hps.data.sampling_rate)
+            y = torch.from_numpy(np.ascontiguousarray(audio, dtype=np.float32)).to(self.device).unsqueeze(0)
+            specs.append(spectrogram_torch(
+                y,
+                hps.data.filter_length,
+                hps.data.sampling_rate,
+                hps.data.hop_length,
+                hps.data.win_length,
+                center=False
+            )[0])
+
+        spec_lengths = [spec.size(-1) for spec in specs]
+        max_length = max(spec_lengths)
+        with inference_backend.context():
+            spec = torch.stack([F.pad(s, (0, max_length - s.size(-1))) for s in specs]).to(self.device)
+            lengths = torch.LongTensor(spec_lengths).to(self.device)
+            sid_src = src_se.expand(len(specs), -1, -1)
+            sid_tgt = torch.cat([se.to(self.device) for se in tgt_ses], dim=0)
+            converted = self.tone_color_converter.model.voice_conversion(
+                spec, lengths, sid_src=sid_src, sid_tgt=sid_tgt, tau=tau
+            )[0][:, 0].data.cpu().float().numpy()
+
+        return [
+            self.tone_color_converter.add_watermark(
+                converted[row, :spec_lengths[row] * hps.data.hop_length], self.ENCODE_MESSAGE
+            )
+            for row in range(len(specs))
+        ]
+
+    def generate_cloned_voice_batch(
+        self,
+        texts: List[str],
+        language: str,
+        speaker_key: str,
+        speed: float,
+        target_ses: List[torch.Tensor]
+    ) -> List[np.ndarray]:
+        """Generate cloned voices for several texts sharing language, speaker and speed
+
+        Returns converted waveforms at `output_sample_rate`, in input order.
+        """
+        with metrics.time(clone_stages, "model_load"):
+            model = model_registry.get(language)
+        speaker_key, speaker_id = self._resolve_speaker(model, speaker_key)
+        with self._model_slot(language), metrics.time(clone_stages, "tts"):
+            waveforms = self._synthesize_batch(model, language, texts, speaker_id, speed)
+        src_se = self._get_source_se(speaker_key)
+        with self._converter_slots, metrics.time(clone_stages, "convert"):
+            return self._convert_batch(
+                waveforms,
+                model.hps.data.sampling_rate,
+                src_se=src_se,
+                tgt_ses=target_ses
+            )
 
     def get_speakers_for_language(self, language: str) -> list:
         """Get available speakers for a language"""
         try:
-            model = TTS(language=language, device=self.device)
-            return list(model.hps.data.spk2id.keys())
+            return model_registry.get_speakers(language)
         except Exception as e:
             logger.warning(f"Could not load speakers for language {language}: {e}")
             return []
-    
+
     def shutdown(self):
         """Shutdown the service"""
         if self.executor:
@@ -0,0 +1,131 @@
+"""
+Background model loading and warm-up after startup
+"""
+import time
+import asyncio
+import threading
+from typing import List, Optional
+
+from app.config.settings import (
+    MODEL_WARMUP_LANGUAGES, WARMUP_TEXTS, SUPPORTED_LANGUAGES, SERVING_MODE, logger
+)
+from app.services.voice_service import voice_service
+from app.services.model_registry import model_registry
+from app.services.process_pool import process_pool
+from app.services.file_index import file_index
+from app.services.similarity_index import similarity_index
+
+class WarmupManager:
+    """Load and warm models in priority order once the server is up
+
+    The converter loads first, then each language in `languages`: its
+    MeloTTS model is loaded, the source embedding of every speaker is
+    precomputed and one short synthesis runs end to end. Each component
+    moves through pending -> loading -> warming -> ready (or failed), and
+    the node is ready once all of them are.
+    """
+
+    def __init__(self, languages: List[str] = MODEL_WARMUP_LANGUAGES):
+        self.languages = list(languages)
+        self._state = {"converter": {"state": "pending"}}
+        for language in self.languages:
+            self._state[language] = {"state": "pending"}
+        self._lock = threading.Lock()
+        self._task: Optional[asyncio.Task] = None
+
+    def _set(self, component: str, **fields) -> None:
+        with self._lock:
+            self._state[component].update(fields)
+
+    def _warm_language(self, language: str) -> None:
+        """Load, precompute source SEs for and warm up one language"""
+        self._set(language, state="loading")
+        start = time.perf_counter()
+        model_registry.get(language)
+        self._set(language, state="warming", load_seconds=time.perf_counter() - start)
+
+        start = time.perf_counter()
+        source_ses = voice_service.preload_source_ses(language)
+        speaker = model_registry.resolve_speaker(language, None)
+        voice_service.generate_cloned_voice(
+            WARMUP_TEXTS.get(language, WARMUP_TEXTS['EN']),
+            language,
+            speaker,
+            1.0,
+            voice_service._get_source_se(speaker)
+        )
+        self._set(language, state="ready", source_ses=source_ses, warmup_seconds=time.perf_counter() - start)
+
+    def run(self) -> None:
+        """Load everything, blocking; failures are recorded per component"""
+        file_index.rebuild()
+
+        self._set("converter", state="loading")
+        start = time.perf_counter()
+        try:
+            voice_service.load_models()
+        except Exception as e:
+            self._set("converter", state="failed", error=str(e))
+            return
+        self._set("converter", state="ready", load_seconds=time.perf_counter() - start)
+
+        for language in self.languages:
+            try:
+                self._warm_language(language)
+                logger.info(f"Warmed up {language} model")
+            except Exception as e:
+                logger.error(f"Error warming up {language} model: {e}")
+                self._set(language, state="failed", error=str(e))
+
+        model_registry.speaker_index(SUPPORTED_LANGUAGES)
+        # Not needed for readiness; built lazily if a search comes first
+        similarity_index.ensure_built()
+
+    async def _run(self) -> None:
+        start = time.perf_counter()
+        loop = asyncio.get_event_loop()
+        await loop.run_in_executor(None, self.run)
+        # Workers fork only after the parent holds warm models to share. Until
+        # then inference is refused (see AudioService.inference_ready), so no
+        # thread of this process holds an inference lock at fork time.
+        if SERVING_MODE == "process" and voice_service.is_models_loaded():
+            await process_pool.start()
+        logger.info(f"Warm-up finished in {time.perf_counter() - start:.2f}s, ready: {self.ready()}")
+
+    def start(self) -> None:
+        """Begin warm-up on the running loop without waiting for it"""
+        if self._task is None:
+            self._task = asyncio.get_event_loop().create_task(self._run())
+
+    async def shutdown(self) -> None:
+        """Stop waiting on a warm-up still in flight; a model load in progress runs to completion"""
+        if self._task is not None and not self._task.done():
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+
+    def ready(self) -> bool:
+        """Check if every warm-up component is ready to serve"""
+        with self._lock:
+            states = [component["state"] for component in self._state.values()]
+        # In process mode inference needs live workers, which can also all die later
+        serving = process_pool.started if SERVING_MODE == "process" else True
+        return serving and all(state == "ready" for state in states)
+
+    def status(self) -> dict:
+        """Readiness with the state of each component"""
+        with self._lock:
+            components = {name: dict(state) for name, state in self._state.items()}
+        status = {
+            "ready": self.ready(),
+            "converter": components.pop("converter"),
+            "models": components,
+        }
+        if SERVING_MODE == "process":
+            status["inference_workers"] = process_pool.status()
+        return status
+
+# Global warm-up manager instance
+warmup = WarmupManager()
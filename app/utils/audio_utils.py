@@ -4,9 +4,28 @@ Audio utility functions
 import base64
 import torch
 import io
-from typing import Tuple, Union
+import struct
+import librosa
+import numpy as np
+import soundfile
+from typing import Optional, Tuple, Union
 from app.config.settings import logger
 
+# Output formats: libsndfile container/subtype, media type and file extension.
+# 'pcm' is headerless little-endian 16-bit mono.
+AUDIO_FORMATS = {
+    'wav': {'format': 'WAV', 'subtype': 'PCM_16', 'media_type': 'audio/wav', 'extension': 'wav'},
+    'flac': {'format': 'FLAC', 'subtype': 'PCM_16', 'media_type': 'audio/flac', 'extension': 'flac'},
+    'mp3': {'format': 'MP3', 'subtype': 'MPEG_LAYER_III', 'media_type': 'audio/mpeg', 'extension': 'mp3'},
+    'opus': {'format': 'OGG', 'subtype': 'OPUS', 'media_type': 'audio/ogg', 'extension': 'ogg'},
+    'pcm': {'format': None, 'subtype': None, 'media_type': 'application/octet-stream', 'extension': 'pcm'},
+}
+# Sample rates each codec accepts; formats not listed take any rate
+FORMAT_SAMPLE_RATES = {
+    'mp3': (8000, 11025, 12000, 16000, 22050, 24000, 32000, 44100, 48000),
+    'opus': (8000, 12000, 16000, 24000, 48000),
+}
+
 def audio_file_to_base64(filepath: str) -> str:
     """Convert audio file to base64 string"""
     try:
@@ -17,6 +36,10 @@ def audio_file_to_base64(filepath: str) -> str:
         logger.error(f"Error converting audio file to base64: {e}")
         raise
 
+def audio_buffer_to_base64(audio_buffer: bytes) -> str:
+    """Convert audio bytes to base64 string"""
+    return base64.b64encode(audio_buffer).decode('utf-8')
+
 def base64_to_audio_file(base64_data: str, filepath: str) -> None:
     """Convert base64 string to audio file"""
     try:
@@ -66,3 +89,184 @@ def save_audio_buffer_to_file(audio_buffer: bytes, filepath: str) -> None:
     except Exception as e:
         logger.error(f"Error saving audio buffer to file {filepath}: {e}")
         raise
+
+def waveform_to_wav_bytes(audio: np.ndarray, sample_rate: int) -> bytes:
+    """Serialize a float waveform to 16-bit PCM WAV bytes in memory"""
+    try:
+        buffer = io.BytesIO()
+        soundfile.write(buffer, audio, sample_rate, format='WAV', subtype='PCM_16')
+        return buffer.getvalue()
+    except Exception as e:
+        logger.error(f"Error serializing waveform to WAV: {e}")
+        raise
+
+def waveform_to_pcm16(audio: np.ndarray) -> bytes:
+    """Convert a float waveform in [-1, 1] to little-endian 16-bit PCM bytes"""
+    clipped = np.clip(audio, -1.0, 1.0)
+    return (clipped * 32767.0).astype('<i2').tobytes()
+
+def wav_stream_header(sample_rate: int, channels: int = 1, bits_per_sample: int = 16) -> bytes:
+    """WAV header for a stream of unknown length
+
+    RIFF and data chunk sizes are set to 0xFFFFFFFF, which players treat as
+    "read until end of stream".
+    """
+    byte_rate = sample_rate * channels * bits_per_sample // 8
+    block_align = channels * bits_per_sample // 8
+    return (
+        b'RIFF' + struct.pack('<I', 0xFFFFFFFF) + b'WAVE'
+        + b'fmt ' + struct.pack('<IHHIIHH', 16, 1, channels, sample_rate, byte_rate, block_align, bits_per_sample)
+        + b'data' + struct.pack('<I', 0xFFFFFFFF)
+    )
+
+def output_sample_rate(audio_format: str, source_rate: int, requested: Optional[int] = None) -> int:
+    """Sample rate to encode at: the requested one, else the source rate or the nearest rate the codec accepts
+
+    Raises ValueError for an unknown format or a rate the codec does not support.
+    """
+    if audio_format not in AUDIO_FORMATS:
+        raise ValueError(f"Unsupported output format: {audio_format}")
+    allowed = FORMAT_SAMPLE_RATES.get(audio_format)
+    if requested is not None:
+        if allowed is not None and requested not in allowed:
+            raise ValueError(f"{audio_format} supports sample rates {', '.join(map(str, allowed))}")
+        return requested
+    if allowed is None or source_rate in allowed:
+        return source_rate
+    return min(allowed, key=lambda rate: (abs(rate - source_rate), -rate))
+
+def resample_waveform(audio: np.ndarray, source_rate: int, target_rate: int) -> np.ndarray:
+    """Resample a float waveform, returning it unchanged when the rates match"""
+    if source_rate == target_rate:
+        return audio
+    return librosa.resample(audio, orig_sr=source_rate, target_sr=target_rate)
+
+def encode_waveform(audio: np.ndarray, sample_rate: int, audio_format: str = 'wav') -> bytes:
+    """Encode a float waveform in memory as one complete file of `audio_format`"""
+    if audio_format == 'pcm':
+        return waveform_to_pcm16(audio)
+    spec = AUDIO_FORMATS[audio_format]
+    try:
+        buffer = io.BytesIO()
+        soundfile.write(buffer, audio, sample_rate, format=spec['format'], subtype=spec['subtype'])
+        return buffer.getvalue()
+    except Exception as e:
+        logger.error(f"Error encoding waveform as {audio_format}: {e}")
+        raise
+
+class _ForwardSink:
+    """Write-only file object for libsndfile that hands out bytes as they are written
+
+    libsndfile only appends while encoding; on close, MP3 and FLAC seek back
+    to patch length and checksum fields that are optional in a stream. Writes
+    behind the already-drained position are therefore dropped.
+    """
+
+    def __init__(self):
+        self._pending = bytearray()
+        self._drained = 0
+        self._position = 0
+
+    def write(self, data) -> int:
+        data = bytes(data)
+        end = self._drained + len(self._pending)
+        if self._position == end:
+            self._pending += data
+        elif self._position >= self._drained:
+            offset = self._position - self._drained
+            self._pending[offset:offset + len(data)] = data
+        self._position += len(data)
+        return len(data)
+
+    def seek(self, offset: int, whence: int = io.SEEK_SET) -> int:
+        end = self._drained + len(self._pending)
+        base = {io.SEEK_SET: 0, io.SEEK_CUR: self._position, io.SEEK_END: end}[whence]
+        self._position = base + offset
+        return self._position
+
+    def tell(self) -> int:
+        return self._position
+
+    def read(self, size: int = -1) -> bytes:
+        return b''
+
+    def drain(self) -> bytes:
+        """Bytes written since the last drain"""
+        data = bytes(self._pending)
+        self._drained += len(self._pending)
+        self._pending.clear()
+        return data
+
+class StreamEncoder:
+    """Incremental encoder: feed waveform chunks, send the bytes each one produces
+
+    WAV streams use a header of unknown length and raw PCM has no header;
+    FLAC, MP3 and Opus are encoded by libsndfile as the chunks arrive.
+    """
+
+    def __init__(self, audio_format: str, sample_rate: int):
+        self.audio_format = audio_format
+        self.sample_rate = sample_rate
+        self._header_sent = False
+        self._sink = None
+        self._file = None
+        spec = AUDIO_FORMATS[audio_format]
+        if spec['format'] is not None and audio_format != 'wav':
+            self._sink = _ForwardSink()
+            self._file = soundfile.SoundFile(
+                self._sink, 'w', samplerate=sample_rate, channels=1,
+                format=spec['format'], subtype=spec['subtype']
+            )
+
+    def _drain(self) -> bytes:
+        data = self._sink.drain()
+        if self.audio_format == 'mp3' and not self._header_sent and data:
+            self._header_sent = True
+            # The first MP3 frame is a zeroed placeholder for the Xing tag,
+            # filled in only on close; a stream leaves it out
+            if data[0] == 0xFF and (data[1] & 0xE0) == 0xE0:
+                next_frame = data.find(b'\xff', 4)
+                if next_frame > 0 and not any(data[4:next_frame]):
+                    data = data[next_frame:]
+        return data
+
+    def begin(self) -> bytes:
+        """Container header bytes that can be sent before any audio"""
+        if self._file is not None:
+            return self._drain()
+        if self.audio_format == 'wav' and not self._header_sent:
+            self._header_sent = True
+            return wav_stream_header(self.sample_rate)
+        return b''
+
+    def write(self, audio: np.ndarray) -> bytes:
+        """Encode a chunk, returning the bytes ready to send"""
+        if self._file is not None:
+            self._file.write(audio)
+            return self._drain()
+        data = waveform_to_pcm16(audio)
+        if self.audio_format == 'wav' and not self._header_sent:
+            self._header_sent = True
+            return wav_stream_header(self.sample_rate) + data
+        return data
+
+    def close(self) -> bytes:
+        """Flush the encoder, returning its final bytes"""
+        if self._file is None:
+            if self.audio_format == 'wav' and not self._header_sent:
+                self._header_sent = True
+                return wav_stream_header(self.sample_rate)
+            return b''
+        self._file.close()
+        self._file = None
+        return self._drain()
+
+def media_type_for(filename: str) -> str:
+    """Media type of a stored file, from its extension"""
+    extension = filename.rsplit('.', 1)[-1].lower() if '.' in filename else ''
+    for spec in AUDIO_FORMATS.values():
+        if spec['extension'] == extension:
+            return spec['media_type']
+    if extension == 'opus':
+        return 'audio/ogg'
+    return 'application/octet-stream'
@@ -3,10 +3,18 @@ File utility functions
 """
 import os
 import uuid
+import asyncio
+import hashlib
 import aiofiles
 from datetime import datetime
-from fastapi import UploadFile
-from app.config.settings import ALLOWED_EXTENSIONS, UPLOAD_FOLDER, OUTPUT_FOLDER, logger
+from typing import Optional, Tuple
+from fastapi import UploadFile, HTTPException
+from app.config.settings import ALLOWED_EXTENSIONS, UPLOAD_FOLDER, OUTPUT_FOLDER, UPLOAD_CHUNK_SIZE, logger
+from app.services.embedding_cache import embedding_cache
+from app.services.embedding_store import embedding_store
+from app.services.embedding_dedup import embedding_dedup
+from app.services.similarity_index import similarity_index
+from app.services.file_index import file_index
 
 def allowed_file(filename: str) -> bool:
     """Check if file extension is allowed"""
@@ -19,17 +27,51 @@ def get_unique_filename(filename: str) -> str:
     name, ext = os.path.splitext(filename)
     return f"{name}_{timestamp}_{unique_id}{ext}"
 
-async def save_upload_file(upload_file: UploadFile, destination: str) -> None:
-    """Save uploaded file asynchronously"""
-    async with aiofiles.open(destination, 'wb') as f:
-        content = await upload_file.read()
-        await f.write(content)
+async def save_upload_file(
+    upload_file: UploadFile,
+    destination: str,
+    max_size: Optional[int] = None,
+    chunk_size: int = UPLOAD_CHUNK_SIZE
+) -> Tuple[int, str]:
+    """Stream an uploaded file to disk in chunks
+
+    Returns the bytes written and the SHA-256 of the content, hashed as it
+    streams. Raises 413 as soon as the running byte count passes
+    `max_size`; the partial file is removed.
+    """
+    written = 0
+    digest = hashlib.sha256()
+    try:
+        async with aiofiles.open(destination, 'wb') as f:
+            while True:
+                chunk = await upload_file.read(chunk_size)
+                if not chunk:
+                    break
+                written += len(chunk)
+                if max_size is not None and written > max_size:
+                    raise HTTPException(
+                        status_code=413,
+                        detail=f"File too large. Maximum size is {max_size // (1024 * 1024)}MB"
+                    )
+                digest.update(chunk)
+                await f.write(chunk)
+    except BaseException:
+        await cleanup_file_async(destination)
+        raise
+    return written, digest.hexdigest()
 
 def cleanup_file(filepath: str) -> bool:
     """Remove file if it exists"""
     try:
         if os.path.exists(filepath):
             os.remove(filepath)
+            file_index.remove(filepath)
+            if filepath.endswith('.pth'):
+                # Deleted embeddings must not be served from the in-process indexes
+                embedding_name = os.path.basename(filepath)[:-len('.pth')]
+                embedding_cache.invalidate(embedding_name)
+                embedding_dedup.forget_embedding(embedding_name)
+                similarity_index.remove(embedding_name)
             logger.info(f"Cleaned up file: {filepath}")
             return True
         return False
@@ -37,6 +79,23 @@ def cleanup_file(filepath: str) -> bool:
         logger.error(f"Error cleaning up file {filepath}: {e}")
         return False
 
+def delete_embedding(embedding_name: str) -> bool:
+    """Delete an embedding from the store and any legacy .pth file"""
+    deleted = embedding_store.delete(embedding_name)
+    if deleted:
+        file_index.remove_embedding(embedding_name)
+    deleted = cleanup_file(os.path.join(OUTPUT_FOLDER, f"{embedding_name}.pth")) or deleted
+    if deleted:
+        embedding_cache.invalidate(embedding_name)
+        embedding_dedup.forget_embedding(embedding_name)
+        similarity_index.remove(embedding_name)
+    return deleted
+
+async def cleanup_file_async(filepath: str) -> bool:
+    """Remove file if it exists, without blocking the event loop"""
+    loop = asyncio.get_event_loop()
+    return await loop.run_in_executor(None, cleanup_file, filepath)
+
 def get_file_info(filepath: str) -> dict:
     """Get file information"""
     if not os.path.exists(filepath):
@@ -50,21 +109,28 @@ def get_file_info(filepath: str) -> dict:
         'modified_at': datetime.fromtimestamp(stat.st_mtime).isoformat()
     }
 
+def _cleanup_old_files_sync(max_age_hours: int) -> int:
+    """Remove files older than `max_age_hours` from both folders, returning the count"""
+    current_time = datetime.now().timestamp()
+    max_age_seconds = max_age_hours * 3600
+    removed = 0
+
+    for folder in [UPLOAD_FOLDER, OUTPUT_FOLDER]:
+        if not os.path.exists(folder):
+            continue
+
+        with os.scandir(folder) as it:
+            for entry in it:
+                if entry.is_file():
+                    file_age = current_time - entry.stat().st_ctime
+                    if file_age > max_age_seconds and cleanup_file(entry.path):
+                        removed += 1
+    return removed
+
 async def cleanup_old_files(max_age_hours: int = 24):
-    """Clean up files older than specified hours"""
+    """Clean up files older than specified hours, off the event loop"""
     try:
-        current_time = datetime.now().timestamp()
-        max_age_seconds = max_age_hours * 3600
-        
-        for folder in [UPLOAD_FOLDER, OUTPUT_FOLDER]:
-            if not os.path.exists(folder):
-                continue
-                
-            for filename in os.listdir(folder):
-                filepath = os.path.join(folder, filename)
-                if os.path.isfile(filepath):
-                    file_age = current_time - os.path.getctime(filepath)
-                    if file_age > max_age_seconds:
-                        cleanup_file(filepath)
+        loop = asyncio.get_event_loop()
+        return await loop.run_in_executor(None, _cleanup_old_files_sync, max_age_hours)
     except Exception as e:
         logger.error(f"Error in cleanup_old_files: {e}")
@@ -0,0 +1,82 @@
+"""
+HTTP validator and byte-range helpers
+"""
+import os
+from email.utils import formatdate, parsedate_to_datetime
+from typing import List, Optional, Tuple
+
+def file_etag(stat: os.stat_result) -> str:
+    """Strong ETag from the inode, modification time and size of a file
+
+    Outputs are written once under a unique name, so this fingerprint
+    changes whenever the content can have changed.
+    """
+    return f'"{stat.st_ino:x}-{stat.st_mtime_ns:x}-{stat.st_size:x}"'
+
+def http_date(timestamp: float) -> str:
+    """Format a timestamp as an HTTP date"""
+    return formatdate(timestamp, usegmt=True)
+
+def _etag_list(header: str) -> List[str]:
+    return [tag.strip() for tag in header.split(',') if tag.strip()]
+
+def is_not_modified(
+    etag: str,
+    mtime: float,
+    if_none_match: Optional[str],
+    if_modified_since: Optional[str]
+) -> bool:
+    """Evaluate If-None-Match, or If-Modified-Since when it is absent (RFC 9110 13.2.2)"""
+    if if_none_match is not None:
+        # Weak comparison: W/ prefixes are ignored
+        tags = [tag[2:] if tag.startswith('W/') else tag for tag in _etag_list(if_none_match)]
+        return '*' in tags or etag in tags
+    if if_modified_since is not None:
+        try:
+            since = parsedate_to_datetime(if_modified_since).timestamp()
+        except (TypeError, ValueError):
+            return False
+        return int(mtime) <= since
+    return False
+
+def if_range_matches(if_range: Optional[str], etag: str, last_modified: str) -> bool:
+    """Whether a Range request may be honoured given its If-Range precondition"""
+    if if_range is None:
+        return True
+    # Strong comparison only; weak tags never match
+    return if_range.strip() in (etag, last_modified)
+
+class RangeNotSatisfiable(Exception):
+    """No requested range overlaps the representation"""
+
+def parse_range(header: Optional[str], size: int) -> Optional[Tuple[int, int]]:
+    """Parse a single `bytes=` range into an inclusive (start, end)
+
+    Returns None when the whole representation should be sent: no header,
+    another unit, a malformed value or several ranges (which a server may
+    answer in full). Raises RangeNotSatisfiable when the range starts past
+    the end of the file, which for an empty file is every range.
+    """
+    if not header or not header.strip().lower().startswith('bytes='):
+        return None
+    spec = header.strip()[len('bytes='):]
+    if ',' in spec or '-' not in spec:
+        return None
+    first, last = (part.strip() for part in spec.split('-', 1))
+    try:
+        if first == '':
+            # Suffix range: the last N bytes
+            length = int(last)
+            # An empty file has no last bytes to send
+            if length <= 0 or size == 0:
+                raise RangeNotSatisfiable()
+            return max(size - length, 0), size - 1
+        start = int(first)
+        end = int(last) if last else size - 1
+    except ValueError:
+        return None
+    if start >= size:
+        raise RangeNotSatisfiable()
+    if start < 0 or end < start:
+        return None
+    return start, min(end, size - 1)
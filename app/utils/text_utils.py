@@ -0,0 +1,46 @@
+"""
+Text utility functions
+"""
+import re
+from typing import List
+
+# A sentence runs up to terminal punctuation (followed by whitespace for Latin
+# scripts) and keeps its trailing whitespace, so pieces concatenate back to the input
+_SENTENCE = re.compile(r'.+?(?:[.!?…]+(?=\s|$)|[。！？]+|$)\s*', re.S)
+# Clauses are used to break up overlong sentences
+_CLAUSE = re.compile(r'.+?(?:[,;:，；：、]+|$)\s*', re.S)
+
+def split_text_into_chunks(text: str, min_length: int = 20, max_length: int = 200) -> List[str]:
+    """Split text into sentence-sized chunks for incremental synthesis
+
+    Sentences shorter than `min_length` are merged with the next one so each
+    chunk carries enough context for natural prosody; sentences longer than
+    `max_length` are broken up at clause boundaries.
+    """
+    pieces = []
+    for sentence in _SENTENCE.findall(text.strip()):
+        if len(sentence) <= max_length:
+            pieces.append(sentence)
+            continue
+        clause = ""
+        for part in _CLAUSE.findall(sentence):
+            if clause and len(clause) + len(part) > max_length:
+                pieces.append(clause)
+                clause = ""
+            clause += part
+        if clause:
+            pieces.append(clause)
+
+    chunks = []
+    current = ""
+    for piece in pieces:
+        current += piece
+        if len(current.strip()) >= min_length:
+            chunks.append(current.strip())
+            current = ""
+    if current.strip():
+        if chunks and len(current.strip()) < min_length:
+            chunks[-1] = f"{chunks[-1]} {current.strip()}"
+        else:
+            chunks.append(current.strip())
+    return chunks
@@ -0,0 +1,156 @@
+"""
+Offline load generator for the HTTP API, with stub models
+
+Installs the fakes from `benchmarks.stubs`, starts the app in-process in a
+scratch directory and drives each endpoint with closed-loop clients over an
+ASGI transport, so the numbers measure the API's own overhead (routing,
+validation, uploads, caches, scheduling, encoding) plus the configured model
+delays. No GPU, network or model download is needed.
+
+    python -m benchmarks.api_benchmark --scenarios clone_voice,files --requests 200 --output before.json
+    python -m benchmarks.compare before.json after.json
+"""
+import argparse
+import asyncio
+import dataclasses
+import io
+import os
+import sys
+import tempfile
+import time
+from typing import Awaitable, Callable
+
+import numpy as np
+import soundfile
+
+from benchmarks import stubs
+from benchmarks.reporting import summarize, write_report
+
+SCENARIOS = ["clone_voice", "extract_voice", "files", "list_speakers"]
+
+TEXTS = [
+    "Xin chào, cảm ơn bạn đã gọi đến tổng đài.",
+    "Vui lòng giữ máy, chúng tôi sẽ kết nối bạn ngay.",
+    "Cuộc gọi của bạn rất quan trọng với chúng tôi.",
+    "Xin vui lòng nhấn phím một để gặp nhân viên hỗ trợ.",
+]
+
+def make_clip(seconds: float, seed: int, sample_rate: int = 16000) -> bytes:
+    """WAV bytes of a noisy tone; distinct seeds give distinct content hashes"""
+    rng = np.random.default_rng(seed)
+    t = np.arange(int(seconds * sample_rate)) / sample_rate
+    audio = 0.3 * np.sin(2 * np.pi * 160 * t) + 0.01 * rng.standard_normal(t.size)
+    buffer = io.BytesIO()
+    soundfile.write(buffer, audio.astype(np.float32), sample_rate, format='WAV', subtype='PCM_16')
+    return buffer.getvalue()
+
+async def run_load(call: Callable[[int], Awaitable], requests: int, concurrency: int) -> dict:
+    """Drive `call(index)` with closed-loop clients and summarize latencies"""
+    latencies = []
+    errors = 0
+    counter = iter(range(requests))
+
+    async def client():
+        nonlocal errors
+        for index in counter:
+            start = time.perf_counter()
+            response = await call(index)
+            if response.status_code >= 400:
+                errors += 1
+                continue
+            latencies.append(time.perf_counter() - start)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(client() for _ in range(concurrency)))
+    return summarize(latencies, time.perf_counter() - start, errors)
+
+async def main(args: argparse.Namespace) -> None:
+    # Imported here so the stubs are in place before the app loads its services
+    import httpx
+    from main import app
+    from app.config.settings import OUTPUT_FOLDER
+    from app.services.file_index import file_index
+
+    async with app.router.lifespan_context(app):
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=None) as client:
+            # Models load in the background after startup
+            while (await client.get("/health/ready")).status_code != 200:
+                await asyncio.sleep(0.05)
+
+            response = await client.post(
+                "/extract_voice", files={"audio_file": ("reference.wav", make_clip(args.clip_seconds, 0), "audio/wav")}
+            )
+            response.raise_for_status()
+            embedding_name = response.json()["embedding_name"]
+
+            # Populate the output folder so /files pages over a realistic listing;
+            # the index was built at startup, so rescan it to include them
+            for index in range(args.files):
+                with open(os.path.join(OUTPUT_FOLDER, f"bench_{index:06d}.wav"), "wb") as f:
+                    f.write(b"\0" * 1024)
+            file_index.rebuild()
+            indexed = len(file_index.query(limit=args.files + 1, prefix="bench_")[0])
+            assert indexed >= args.files, f"Expected {args.files} bench files in the index, found {indexed}"
+
+            clip_cache = {}
+
+            def clip(index: int) -> bytes:
+                # Unique clips defeat deduplication unless --repeat-clips is set
+                seed = 1 if args.repeat_clips else index + 1
+                if seed not in clip_cache:
+                    clip_cache[seed] = make_clip(args.clip_seconds, seed)
+                return clip_cache[seed]
+
+            calls = {
+                "clone_voice": lambda index: client.post("/clone_voice", json={
+                    "text": TEXTS[index % len(TEXTS)],
+                    "language": args.language,
+                    "target_embedding_name": embedding_name,
+                }),
+                "extract_voice": lambda index: client.post(
+                    "/extract_voice", files={"audio_file": (f"clip_{index}.wav", clip(index), "audio/wav")}
+                ),
+                "files": lambda index: client.get("/files", params={"limit": 100}),
+                "list_speakers": lambda index: client.get("/list_speakers"),
+            }
+
+            results = []
+            for scenario in args.scenarios:
+                # One untimed request warms lazy loads and source embeddings
+                await calls[scenario](0)
+                report = await run_load(calls[scenario], args.requests, args.concurrency)
+                results.append({"scenario": scenario, "concurrency": args.concurrency, **report})
+
+    config = {k: v for k, v in vars(args).items() if k != "output"}
+    config["stub_delays"] = dataclasses.asdict(stubs.DELAYS)
+    write_report("api", results, config, args.output)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--scenarios", type=lambda v: v.split(","), default=SCENARIOS)
+    parser.add_argument("--requests", type=int, default=100)
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--language", default="VI")
+    parser.add_argument("--clip-seconds", type=float, default=5.0)
+    parser.add_argument("--repeat-clips", action="store_true", help="Upload the same clip every time")
+    parser.add_argument("--files", type=int, default=1000, help="Files to place in the output folder")
+    parser.add_argument("--output", help="Also write the JSON report to this path")
+    for field in dataclasses.fields(stubs.StubDelays):
+        parser.add_argument(
+            f"--{field.name.replace('_', '-')}-delay", dest=field.name, type=float, default=field.default,
+            help=f"Stub delay in seconds ({field.name})"
+        )
+    args = parser.parse_args()
+    if args.output:
+        args.output = os.path.abspath(args.output)
+
+    stubs.install(stubs.StubDelays(**{f.name: getattr(args, f.name) for f in dataclasses.fields(stubs.StubDelays)}))
+    for field in dataclasses.fields(stubs.StubDelays):
+        delattr(args, field.name)
+
+    # Run in a scratch directory so uploads, outputs and data stay out of the checkout
+    sys.path.insert(0, os.getcwd())
+    with tempfile.TemporaryDirectory(prefix="openvoice-bench-") as workdir:
+        os.chdir(workdir)
+        asyncio.run(main(args))
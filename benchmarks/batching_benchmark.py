@@ -0,0 +1,102 @@
+"""
+Throughput vs. p99 latency of the micro-batching scheduler
+
+Runs in-process against the loaded models. Each configuration is driven by
+`--concurrency` clients issuing requests back to back; the unbatched
+executor path is measured first as a baseline.
+
+    python -m benchmarks.batching_benchmark --embedding <name> --batch-sizes 1,4,8 --waits 5,20
+"""
+import argparse
+import asyncio
+import json
+import time
+from typing import Awaitable, Callable
+
+from app.services.voice_service import voice_service
+from app.services.embedding_cache import embedding_cache
+from app.services.batch_scheduler import BatchScheduler
+from benchmarks.reporting import percentile
+
+TEXTS = [
+    "Xin chào, cảm ơn bạn đã gọi đến tổng đài.",
+    "Vui lòng giữ máy, chúng tôi sẽ kết nối bạn ngay.",
+    "Cuộc gọi của bạn rất quan trọng với chúng tôi.",
+    "Xin vui lòng nhấn phím một để gặp nhân viên hỗ trợ.",
+]
+
+async def run_load(
+    clone: Callable[[str], Awaitable],
+    requests: int,
+    concurrency: int
+) -> dict:
+    """Drive `clone` with closed-loop clients and summarize latencies"""
+    latencies = []
+    counter = iter(range(requests))
+
+    async def client():
+        for index in counter:
+            start = time.perf_counter()
+            await clone(TEXTS[index % len(TEXTS)])
+            latencies.append(time.perf_counter() - start)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(client() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - start
+    return {
+        "requests": len(latencies),
+        "throughput_rps": len(latencies) / elapsed,
+        "p50_ms": percentile(latencies, 50) * 1000,
+        "p99_ms": percentile(latencies, 99) * 1000,
+    }
+
+async def main(args: argparse.Namespace) -> None:
+    voice_service.load_models()
+    target_se = embedding_cache.get(args.embedding)
+    if target_se is None:
+        raise SystemExit(f"Embedding not found: {args.embedding}")
+    loop = asyncio.get_event_loop()
+
+    async def unbatched(text: str):
+        return await loop.run_in_executor(
+            voice_service.executor,
+            voice_service.generate_cloned_voice,
+            text, args.language, args.speaker, args.speed, target_se
+        )
+
+    # Warm up model loading and source SE outside the measurement
+    await unbatched(TEXTS[0])
+
+    reports = [{"mode": "unbatched", **await run_load(unbatched, args.requests, args.concurrency)}]
+    for batch_size in args.batch_sizes:
+        for wait_ms in args.waits:
+            scheduler = BatchScheduler(max_batch_size=batch_size, max_wait_ms=wait_ms)
+
+            async def batched(text: str):
+                return await scheduler.submit(text, args.language, args.speaker, args.speed, target_se)
+
+            report = await run_load(batched, args.requests, args.concurrency)
+            reports.append({
+                "mode": "batched",
+                "max_batch_size": batch_size,
+                "max_wait_ms": wait_ms,
+                "mean_batch_size": scheduler.stats()["mean_batch_size"],
+                **report,
+            })
+            await scheduler.shutdown()
+
+    for report in reports:
+        print(json.dumps(report))
+    voice_service.shutdown()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--embedding", required=True, help="Target embedding name in OUTPUT_FOLDER")
+    parser.add_argument("--language", default="VI")
+    parser.add_argument("--speaker", default="VI-default")
+    parser.add_argument("--speed", type=float, default=0.9)
+    parser.add_argument("--requests", type=int, default=64)
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--batch-sizes", type=lambda v: [int(x) for x in v.split(",")], default=[1, 4, 8])
+    parser.add_argument("--waits", type=lambda v: [float(x) for x in v.split(",")], default=[5, 20])
+    asyncio.run(main(parser.parse_args()))
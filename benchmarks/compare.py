@@ -0,0 +1,40 @@
+"""
+Compare two benchmark reports
+
+Prints the relative change of every numeric metric for each result present
+in both reports, matched on their non-numeric fields (scenario, mode, ...).
+
+    python -m benchmarks.compare before.json after.json
+"""
+import argparse
+import json
+
+def result_key(result: dict) -> tuple:
+    """Identity of a result within a report"""
+    return tuple(sorted((k, v) for k, v in result.items() if isinstance(v, str)))
+
+def main(args: argparse.Namespace) -> None:
+    with open(args.before, encoding="utf-8") as f:
+        before = json.load(f)
+    with open(args.after, encoding="utf-8") as f:
+        after = json.load(f)
+
+    baseline = {result_key(r): r for r in before["results"]}
+    print(f"{before.get('revision')} -> {after.get('revision')}")
+    for result in after["results"]:
+        key = result_key(result)
+        if key not in baseline:
+            continue
+        print(", ".join(f"{k}={v}" for k, v in key))
+        for metric, value in result.items():
+            old = baseline[key].get(metric)
+            if isinstance(value, bool) or not isinstance(value, (int, float)) or not isinstance(old, (int, float)):
+                continue
+            change = f"{(value - old) / old * 100:+.1f}%" if old else "n/a"
+            print(f"  {metric:>16}: {old:12.3f} -> {value:12.3f}  {change}")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("before")
+    parser.add_argument("after")
+    main(parser.parse_args())
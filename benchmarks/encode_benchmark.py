@@ -0,0 +1,104 @@
+"""
+Encode cost vs. bytes saved for each output format
+
+Encodes the same waveform in every output format and sample rate, whole
+and in sentence-sized streaming chunks, and reports encode time, speed
+relative to real time and size relative to WAV at the model rate. Uses a
+speech-like synthetic signal unless `--input` names an audio file.
+
+    python -m benchmarks.encode_benchmark --seconds 10 --sample-rates 16000,24000 --output encode.json
+"""
+import argparse
+import time
+from typing import List
+
+import numpy as np
+
+from app.utils.audio_utils import (
+    AUDIO_FORMATS, StreamEncoder, encode_waveform, output_sample_rate, resample_waveform
+)
+from benchmarks.reporting import percentile, write_report
+
+def speech_like(seconds: float, sample_rate: int, seed: int = 0) -> np.ndarray:
+    """Harmonic voice with a wandering pitch, syllable-rate envelope and pauses"""
+    rng = np.random.default_rng(seed)
+    t = np.arange(int(seconds * sample_rate)) / sample_rate
+    pitch = 140 + 30 * np.sin(2 * np.pi * 0.7 * t)
+    phase = 2 * np.pi * np.cumsum(pitch) / sample_rate
+    voice = sum(np.sin(k * phase) / k for k in range(1, 12))
+    envelope = np.clip(np.sin(2 * np.pi * 4 * t), 0, None) * (np.sin(2 * np.pi * 0.25 * t) > -0.6)
+    audio = 0.25 * voice * envelope + 0.005 * rng.standard_normal(t.size)
+    return audio.astype(np.float32)
+
+def time_encode(encode, iterations: int) -> List[float]:
+    encode()
+    latencies = []
+    for _ in range(iterations):
+        start = time.perf_counter()
+        encode()
+        latencies.append(time.perf_counter() - start)
+    return latencies
+
+def main(args: argparse.Namespace) -> None:
+    if args.input:
+        import librosa
+        audio, _ = librosa.load(args.input, sr=args.source_rate, mono=True)
+    else:
+        audio = speech_like(args.seconds, args.source_rate)
+    seconds = len(audio) / args.source_rate
+    wav_bytes = len(encode_waveform(audio, args.source_rate, "wav"))
+    chunk = int(args.chunk_seconds * args.source_rate)
+    chunks = [audio[i:i + chunk] for i in range(0, len(audio), chunk)]
+
+    results = []
+    for audio_format in args.formats:
+        rates = {output_sample_rate(audio_format, args.source_rate)}
+        for rate in args.sample_rates:
+            try:
+                rates.add(output_sample_rate(audio_format, args.source_rate, rate))
+            except ValueError:
+                continue
+
+        for rate in sorted(rates):
+            def whole() -> bytes:
+                return encode_waveform(resample_waveform(audio, args.source_rate, rate), rate, audio_format)
+
+            def streamed() -> bytes:
+                encoder = StreamEncoder(audio_format, rate)
+                parts = [encoder.begin()]
+                parts.extend(encoder.write(resample_waveform(c, args.source_rate, rate)) for c in chunks)
+                parts.append(encoder.close())
+                return b"".join(parts)
+
+            for mode, encode in (("whole", whole), ("stream", streamed)):
+                size = len(encode())
+                latencies = time_encode(encode, args.iterations)
+                mean = sum(latencies) / len(latencies)
+                results.append({
+                    "format": audio_format,
+                    "mode": mode,
+                    "sample_rate": rate,
+                    "bytes": size,
+                    "kbps": size * 8 / seconds / 1000,
+                    "ratio_vs_wav": wav_bytes / size,
+                    "bytes_saved": wav_bytes - size,
+                    "encode_mean_ms": mean * 1000,
+                    "encode_p99_ms": percentile(latencies, 99) * 1000,
+                    "realtime_factor": seconds / mean,
+                })
+
+    config = {k: v for k, v in vars(args).items() if k != "output"}
+    config.update(audio_seconds=seconds, wav_bytes=wav_bytes)
+    write_report("encode", results, config, args.output)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--input", help="Audio file to encode instead of the synthetic signal")
+    parser.add_argument("--seconds", type=float, default=10.0)
+    parser.add_argument("--source-rate", type=int, default=22050, help="Rate of the converter output")
+    parser.add_argument("--formats", type=lambda v: v.split(","), default=list(AUDIO_FORMATS))
+    parser.add_argument("--sample-rates", type=lambda v: [int(x) for x in v.split(",")], default=[16000, 24000])
+    parser.add_argument("--chunk-seconds", type=float, default=3.0, help="Chunk length in stream mode")
+    parser.add_argument("--iterations", type=int, default=10)
+    parser.add_argument("--output", help="Also write the JSON report to this path")
+    main(parser.parse_args())
@@ -0,0 +1,224 @@
+"""
+Audio parity and speed of the CPU inference backends against eager fp32
+
+Loads a fresh MeloTTS model and tone color converter per backend, prepares
+them with `InferenceBackend` and runs the same sentences through both
+stages on CPU. Sampling noise is disabled (noise scales and tau set to 0),
+so outputs are deterministic and any difference comes from the backend.
+Each stage is compared with the eager outputs; the converter gets the eager
+MeloTTS audio as input so its error is measured on its own, and the
+end-to-end error is reported as well:
+
+- log-spectral distance (LSD, dB), the pass/fail criterion;
+- signal-to-noise ratio of the waveform difference (dB);
+- relative length difference (quantized duration predictors can shift frames).
+
+Exits with status 1 when any backend exceeds --max-lsd-db. `--stub` runs
+against the fakes from `benchmarks.stubs` to check the script itself.
+
+    python -m benchmarks.inference_benchmark --language EN --backends eager,int8,torchscript,int8+torchscript --output backends.json
+"""
+import argparse
+import gc
+import sys
+import time
+from typing import List, Optional
+
+import numpy as np
+
+from benchmarks.reporting import percentile, write_report
+
+SENTENCES = {
+    "EN": [
+        "Thank you for calling, please hold while we connect you.",
+        "The quick brown fox jumps over the lazy dog near the riverbank.",
+    ],
+    "VI": [
+        "Xin chào, cảm ơn bạn đã gọi đến tổng đài.",
+        "Vui lòng giữ máy, chúng tôi sẽ kết nối bạn ngay.",
+    ],
+}
+
+def log_spectral_distance(reference: np.ndarray, candidate: np.ndarray, n_fft: int = 1024, hop: int = 256) -> float:
+    """Mean over frames of the RMS difference of log power spectra, in dB"""
+    import librosa
+
+    length = min(len(reference), len(candidate))
+    spectra = [
+        10 * np.log10(np.abs(librosa.stft(x[:length], n_fft=n_fft, hop_length=hop)) ** 2 + 1e-10)
+        for x in (reference, candidate)
+    ]
+    return float(np.mean(np.sqrt(np.mean((spectra[0] - spectra[1]) ** 2, axis=0))))
+
+def snr_db(reference: np.ndarray, candidate: np.ndarray) -> float:
+    """Energy of the reference over the energy of the difference, in dB"""
+    length = min(len(reference), len(candidate))
+    noise = np.sum((reference[:length] - candidate[:length]) ** 2)
+    signal = np.sum(reference[:length] ** 2)
+    return float("inf") if noise == 0 else float(10 * np.log10(signal / noise))
+
+def compare(references: List[np.ndarray], candidates: List[np.ndarray]) -> dict:
+    """Worst-case parity metrics over a list of waveform pairs"""
+    return {
+        "lsd_db": max(log_spectral_distance(r, c) for r, c in zip(references, candidates)),
+        "snr_db": min(snr_db(r, c) for r, c in zip(references, candidates)),
+        "length_diff": max(abs(len(c) - len(r)) / len(r) for r, c in zip(references, candidates)),
+    }
+
+class Pipeline:
+    """MeloTTS and converter prepared for one backend, run without sampling noise"""
+
+    def __init__(self, backend: str, language: str):
+        from melo.api import TTS
+        from openvoice.api import ToneColorConverter
+        from openvoice.download_utils import load_or_download_config, load_or_download_model
+        from app.services.inference_backend import InferenceBackend
+
+        start = time.perf_counter()
+        self.engine = InferenceBackend(backend, "cpu")
+        self.tts = TTS(language=language, device="cpu")
+        self.engine.prepare(self.tts.model, f"MeloTTS {language}")
+        self.converter = ToneColorConverter(load_or_download_config(), device="cpu")
+        self.converter.load_ckpt(load_or_download_model())
+        self.engine.prepare(self.converter.model, "converter")
+        self.load_seconds = time.perf_counter() - start
+
+    def synthesize(self, features: tuple, speaker_id: int) -> np.ndarray:
+        import torch
+
+        bert, ja_bert, phones, tones, lang_ids = features
+        with self.engine.context():
+            return self.tts.model.infer(
+                phones.unsqueeze(0),
+                torch.LongTensor([phones.size(0)]),
+                torch.LongTensor([speaker_id]),
+                tones.unsqueeze(0),
+                lang_ids.unsqueeze(0),
+                bert.unsqueeze(0),
+                ja_bert.unsqueeze(0),
+                sdp_ratio=0.0,
+                noise_scale=0.0,
+                noise_scale_w=0.0,
+                length_scale=1.0
+            )[0][0, 0].float().numpy()
+
+    def convert(self, audio: np.ndarray, src_se, tgt_se) -> np.ndarray:
+        import librosa
+        import torch
+        from openvoice.mel_processing import spectrogram_torch
+
+        hps = self.converter.hps
+        audio = librosa.resample(audio, orig_sr=self.tts.hps.data.sampling_rate, target_sr=hps.data.sampling_rate)
+        with self.engine.context():
+            y = torch.from_numpy(np.ascontiguousarray(audio, dtype=np.float32)).unsqueeze(0)
+            spec = spectrogram_torch(
+                y, hps.data.filter_length, hps.data.sampling_rate, hps.data.hop_length, hps.data.win_length,
+                center=False
+            )
+            return self.converter.model.voice_conversion(
+                spec, torch.LongTensor([spec.size(-1)]), sid_src=src_se, sid_tgt=tgt_se, tau=0.0
+            )[0][0, 0].float().numpy()
+
+def time_stage(run, iterations: int) -> List[float]:
+    run()
+    latencies = []
+    for _ in range(iterations):
+        start = time.perf_counter()
+        run()
+        latencies.append(time.perf_counter() - start)
+    return latencies
+
+def main(args: argparse.Namespace) -> int:
+    import torch
+    from melo import utils as melo_utils
+
+    torch.set_num_threads(args.threads)
+    sentences = SENTENCES.get(args.language, SENTENCES["EN"])
+    results = []
+    baseline: Optional[dict] = None
+    failed = False
+
+    for backend in args.backends:
+        torch.manual_seed(0)
+        pipeline = Pipeline(backend, args.language)
+        speaker_key = args.speaker or next(iter(pipeline.tts.hps.data.spk2id))
+        speaker_id = pipeline.tts.hps.data.spk2id[speaker_key]
+
+        if baseline is None:
+            # Front-end features and embeddings are shared so only the models differ
+            features = [
+                melo_utils.get_text_for_tts_infer(s, args.language, pipeline.tts.hps, "cpu", pipeline.tts.symbol_to_id)
+                for s in sentences
+            ]
+            src_se = pipeline.converter.load_source_se(speaker_key.lower())
+            tgt_se = torch.load(args.target_embedding, map_location="cpu") if args.target_embedding else src_se
+
+        tts_audio = [pipeline.synthesize(f, speaker_id) for f in features]
+        reference_tts = baseline["tts"] if baseline else tts_audio
+        converted = [pipeline.convert(a, src_se, tgt_se) for a in reference_tts]
+        end_to_end = [pipeline.convert(a, src_se, tgt_se) for a in tts_audio]
+        if baseline is None:
+            baseline = {"tts": tts_audio, "convert": converted, "end_to_end": end_to_end}
+
+        tts_latencies = time_stage(lambda: [pipeline.synthesize(f, speaker_id) for f in features], args.iterations)
+        convert_latencies = time_stage(
+            lambda: [pipeline.convert(a, src_se, tgt_se) for a in reference_tts], args.iterations
+        )
+        audio_seconds = sum(len(a) for a in tts_audio) / pipeline.tts.hps.data.sampling_rate
+
+        parity = {
+            "tts": compare(baseline["tts"], tts_audio),
+            "convert": compare(baseline["convert"], converted),
+            "end_to_end": compare(baseline["end_to_end"], end_to_end),
+        }
+        passed = all(stage["lsd_db"] <= args.max_lsd_db for stage in parity.values())
+        failed = failed or not passed
+        tts_mean = sum(tts_latencies) / len(tts_latencies)
+        convert_mean = sum(convert_latencies) / len(convert_latencies)
+        result = {
+            "backend": backend,
+            "options": sorted(pipeline.engine.options),
+            "load_seconds": pipeline.load_seconds,
+            "audio_seconds": audio_seconds,
+            "tts_mean_ms": tts_mean * 1000,
+            "tts_p99_ms": percentile(tts_latencies, 99) * 1000,
+            "convert_mean_ms": convert_mean * 1000,
+            "convert_p99_ms": percentile(convert_latencies, 99) * 1000,
+            "realtime_factor": audio_seconds / (tts_mean + convert_mean),
+            "parity": parity,
+            "passed": passed,
+        }
+        if results:
+            eager = results[0]
+            result["tts_speedup"] = eager["tts_mean_ms"] / result["tts_mean_ms"]
+            result["convert_speedup"] = eager["convert_mean_ms"] / result["convert_mean_ms"]
+        results.append(result)
+
+        # Free this backend's models before loading the next
+        pipeline = None
+        gc.collect()
+
+    config = {k: v for k, v in vars(args).items() if k != "output"}
+    config["torch"] = torch.__version__
+    write_report("inference", results, config, args.output)
+    return 1 if failed else 0
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--language", default="EN")
+    parser.add_argument("--speaker", help="MeloTTS speaker; defaults to the model's first")
+    parser.add_argument("--target-embedding", help=".pth target embedding; defaults to the source speaker's")
+    parser.add_argument(
+        "--backends", type=lambda v: v.split(","), default=["eager", "inference_mode", "int8", "torchscript"],
+        help="Backends to compare; the first is the reference"
+    )
+    parser.add_argument("--max-lsd-db", type=float, default=1.0, help="Largest log-spectral distance accepted")
+    parser.add_argument("--iterations", type=int, default=5)
+    parser.add_argument("--threads", type=int, default=4, help="Torch intra-op threads")
+    parser.add_argument("--stub", action="store_true", help="Use the fake models from benchmarks.stubs")
+    parser.add_argument("--output", help="Also write the JSON report to this path")
+    args = parser.parse_args()
+    if args.stub:
+        from benchmarks import stubs
+        stubs.install(stubs.StubDelays(tts_base=0.0, tts_per_char=0.0, convert=0.0, load=0.0))
+    sys.exit(main(args))
@@ -0,0 +1,107 @@
+"""
+Microbenchmarks of the I/O and encoding helpers on the request path
+
+Covers upload streaming and file read/write in `file_utils`, embedding
+loads (store, warm cache, legacy .pth) and the base64/WAV helpers in
+`audio_utils`. Runs in a scratch directory and needs no models.
+
+    python -m benchmarks.micro_benchmark --iterations 200 --output micro.json
+"""
+import argparse
+import asyncio
+import io
+import os
+import sys
+import tempfile
+import time
+from typing import Callable, List
+
+def measure(name: str, fn: Callable, iterations: int, size_bytes: int = None) -> dict:
+    """Time `iterations` calls of `fn`; coroutine functions are awaited"""
+    from benchmarks.reporting import percentile
+
+    run = (lambda: asyncio.run(fn())) if asyncio.iscoroutinefunction(fn) else fn
+    run()
+    latencies: List[float] = []
+    for _ in range(iterations):
+        start = time.perf_counter()
+        run()
+        latencies.append(time.perf_counter() - start)
+    total = sum(latencies)
+    result = {
+        "case": name,
+        "iterations": iterations,
+        "ops_per_s": iterations / total,
+        "mean_us": total / iterations * 1e6,
+        "p50_us": percentile(latencies, 50) * 1e6,
+        "p99_us": percentile(latencies, 99) * 1e6,
+    }
+    if size_bytes:
+        result["mb_per_s"] = size_bytes * iterations / total / 1e6
+    return result
+
+def main(args: argparse.Namespace) -> None:
+    import numpy as np
+    import torch
+    from starlette.datastructures import UploadFile
+
+    from benchmarks.reporting import write_report
+    from app.config.settings import OUTPUT_FOLDER, UPLOAD_FOLDER, create_directories
+    from app.services.embedding_cache import embedding_cache
+    from app.services.embedding_store import embedding_store
+    from app.utils.file_utils import save_upload_file
+    from app.utils import audio_utils
+
+    create_directories()
+    upload = os.urandom(args.upload_mb * 1024 * 1024)
+    audio_bytes = os.urandom(args.audio_kb * 1024)
+    audio_path = os.path.join(OUTPUT_FOLDER, "bench.wav")
+    audio_utils.save_audio_buffer_to_file(audio_bytes, audio_path)
+    waveform = (0.3 * np.sin(np.linspace(0, 2000 * np.pi, args.waveform_seconds * 22050))).astype(np.float32)
+
+    embedding = torch.randn(1, 256, 1)
+    embedding_store.append("bench", embedding, "bench")
+    legacy_path = os.path.join(OUTPUT_FOLDER, "legacy.pth")
+    torch.save(embedding, legacy_path)
+    embedding_b64 = audio_utils.embedding_to_base64(embedding)
+
+    async def save_upload():
+        await save_upload_file(UploadFile(io.BytesIO(upload), filename="bench.wav"), os.path.join(UPLOAD_FOLDER, "bench.wav"))
+
+    def cached_embedding():
+        embedding_cache.get("bench")
+
+    n = args.iterations
+    results = [
+        measure("save_upload_file", save_upload, n, len(upload)),
+        measure("get_audio_buffer_from_file", lambda: audio_utils.get_audio_buffer_from_file(audio_path), n, len(audio_bytes)),
+        measure("save_audio_buffer_to_file", lambda: audio_utils.save_audio_buffer_to_file(audio_bytes, audio_path), n, len(audio_bytes)),
+        measure("embedding_store_get", lambda: embedding_store.get("bench"), n),
+        measure("embedding_cache_get_warm", cached_embedding, n),
+        measure("torch_load_pth", lambda: torch.load(legacy_path, map_location="cpu"), n),
+        measure("audio_buffer_to_base64", lambda: audio_utils.audio_buffer_to_base64(audio_bytes), n, len(audio_bytes)),
+        measure("audio_file_to_base64", lambda: audio_utils.audio_file_to_base64(audio_path), n, len(audio_bytes)),
+        measure("embedding_to_base64", lambda: audio_utils.embedding_to_base64(embedding), n),
+        measure("base64_to_embedding", lambda: audio_utils.base64_to_embedding(embedding_b64), n),
+        measure("waveform_to_wav_bytes", lambda: audio_utils.waveform_to_wav_bytes(waveform, 22050), n, waveform.nbytes),
+        measure("waveform_to_pcm16", lambda: audio_utils.waveform_to_pcm16(waveform), n, waveform.nbytes),
+    ]
+    config = {k: v for k, v in vars(args).items() if k != "output"}
+    write_report("micro", results, config, args.output)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--iterations", type=int, default=200)
+    parser.add_argument("--upload-mb", type=int, default=5)
+    parser.add_argument("--audio-kb", type=int, default=512)
+    parser.add_argument("--waveform-seconds", type=int, default=10)
+    parser.add_argument("--output", help="Also write the JSON report to this path")
+    args = parser.parse_args()
+    if args.output:
+        args.output = os.path.abspath(args.output)
+
+    # Run in a scratch directory so uploads, outputs and data stay out of the checkout
+    sys.path.insert(0, os.getcwd())
+    with tempfile.TemporaryDirectory(prefix="openvoice-bench-") as workdir:
+        os.chdir(workdir)
+        main(args)
@@ -0,0 +1,258 @@
+"""
+Drop-in fakes of the MeloTTS and OpenVoice APIs used by the service
+
+`install()` registers fake `openvoice` and `melo` modules in sys.modules, so
+it must run before anything under `app.services` is imported. The fakes
+return audio of realistic shape (duration proportional to text length, the
+real sample rates and hop sizes) after configurable delays, which lets the
+API's own overhead be measured without GPUs or model downloads.
+"""
+import os
+import re
+import sys
+import time
+import types
+import hashlib
+from dataclasses import dataclass
+from glob import glob
+
+import numpy as np
+import soundfile
+import torch
+import torch.nn as nn
+
+EMBEDDING_DIM = 256
+
+@dataclass
+class StubDelays:
+    """Seconds spent by each fake model call"""
+    # MeloTTS: fixed cost per call plus a cost per input character
+    tts_base: float = 0.05
+    tts_per_char: float = 0.002
+    # Text front end (normalization, g2p, BERT) per input character
+    frontend_per_char: float = 0.001
+    # Extra cost per additional item of a batched forward pass
+    batch_item: float = 0.01
+    # ToneColorConverter.voice_conversion per call
+    convert: float = 0.05
+    # Reference encoder per forward pass
+    encode: float = 0.02
+    # VAD split per file
+    vad: float = 0.05
+    # Model construction
+    load: float = 0.0
+
+DELAYS = StubDelays()
+
+# Seconds of speech per input character, roughly natural speaking rate
+SECONDS_PER_CHAR = 0.06
+
+def _hparams(**data) -> types.SimpleNamespace:
+    return types.SimpleNamespace(data=types.SimpleNamespace(**data))
+
+def _tone(samples: int, sample_rate: int, frequency: float = 180.0) -> np.ndarray:
+    """Voiced-looking waveform of `samples` samples"""
+    t = np.arange(samples, dtype=np.float32) / sample_rate
+    return (0.3 * np.sin(2 * np.pi * frequency * t)).astype(np.float32)
+
+# MeloTTS
+
+MELO_SPEAKERS = {
+    'EN': ['EN-US', 'EN-BR', 'EN_INDIA', 'EN-AU', 'EN-Default'],
+    'VI': ['VI-default'],
+}
+
+def load_melo_config(language: str) -> types.SimpleNamespace:
+    """Hparams of a fake MeloTTS model"""
+    speakers = MELO_SPEAKERS.get(language, [language])
+    return _hparams(
+        sampling_rate=44100,
+        hop_length=512,
+        spk2id={name: index for index, name in enumerate(speakers)},
+    )
+
+class _FakeSynthesizer(nn.Module):
+    """Acoustic model with the `infer` signature of MeloTTS SynthesizerTrn"""
+
+    def __init__(self, hop_length: int, sample_rate: int):
+        super().__init__()
+        self.hop_length = hop_length
+        self.sample_rate = sample_rate
+        # Some weights so model size accounting and share_memory have work to do
+        self.proj = nn.Linear(256, 256)
+
+    def infer(self, x, x_lengths, sid, tone, language, bert, ja_bert,
+              sdp_ratio=0.2, noise_scale=0.6, noise_scale_w=0.8, length_scale=1.0):
+        batch = x.size(0)
+        chars = int(x_lengths.sum())
+        time.sleep(DELAYS.tts_base + DELAYS.batch_item * (batch - 1) + DELAYS.tts_per_char * chars)
+        frames_per_phone = SECONDS_PER_CHAR * self.sample_rate / self.hop_length * length_scale
+        frames = torch.clamp((x_lengths.float() * frames_per_phone).long(), min=1)
+        max_frames = int(frames.max())
+        y_mask = (torch.arange(max_frames)[None, :] < frames[:, None]).float().unsqueeze(1)
+        audio = torch.from_numpy(_tone(max_frames * self.hop_length, self.sample_rate))
+        o = audio.expand(batch, 1, -1).clone()
+        return o, None, y_mask, None
+
+class TTS(nn.Module):
+    """Fake melo.api.TTS"""
+
+    def __init__(self, language: str, device: str = 'auto', use_hf: bool = True, config_path=None, ckpt_path=None):
+        super().__init__()
+        time.sleep(DELAYS.load)
+        self.hps = load_melo_config(language)
+        # Same normalization as melo.api.TTS
+        language = language.split('_')[0]
+        self.language = 'ZH_MIX_EN' if language == 'ZH' else language
+        self.device = device
+        self.symbol_to_id = {}
+        self.model = _FakeSynthesizer(self.hps.data.hop_length, self.hps.data.sampling_rate)
+
+    @staticmethod
+    def split_sentences_into_pieces(text: str, language: str, quiet: bool = False) -> list:
+        pieces = [p.strip() for p in re.split(r'(?<=[.!?。！？])\s*', text) if p.strip()]
+        return pieces or [text]
+
+    @staticmethod
+    def audio_numpy_concat(segment_data_list, sr: int, speed: float = 1.) -> np.ndarray:
+        silence = np.zeros(int(sr * 0.05 / speed), dtype=np.float32)
+        pieces = []
+        for segment in segment_data_list:
+            pieces.extend([segment.reshape(-1), silence])
+        return np.concatenate(pieces).astype(np.float32)
+
+    def tts_to_file(self, text: str, speaker_id: int, output_path=None, sdp_ratio=0.2,
+                    noise_scale=0.6, noise_scale_w=0.8, speed=1.0, **kwargs):
+        time.sleep(DELAYS.tts_base + DELAYS.tts_per_char * len(text))
+        sample_rate = self.hps.data.sampling_rate
+        audio = _tone(int(len(text) * SECONDS_PER_CHAR / speed * sample_rate), sample_rate)
+        if output_path is None:
+            return audio
+        soundfile.write(output_path, audio, sample_rate)
+
+def get_text_for_tts_infer(text: str, language_str: str, hps, device: str, symbol_to_id=None):
+    """Fake melo.utils.get_text_for_tts_infer: one phone per character"""
+    length = max(len(text), 1)
+    time.sleep(DELAYS.frontend_per_char * length)
+    bert = torch.zeros(1024, length)
+    ja_bert = torch.zeros(768, length)
+    phones = torch.ones(length, dtype=torch.long)
+    tones = torch.zeros(length, dtype=torch.long)
+    lang_ids = torch.zeros(length, dtype=torch.long)
+    return bert, ja_bert, phones, tones, lang_ids
+
+# OpenVoice
+
+def load_converter_config():
+    """Hparams of the fake tone color converter"""
+    return _hparams(sampling_rate=22050, filter_length=1024, hop_length=256, win_length=1024)
+
+def load_converter_model():
+    return None
+
+class _FakeConverterModel(nn.Module):
+    """Generator with the voice_conversion and ref_enc entry points of OpenVoice"""
+
+    def __init__(self, hop_length: int):
+        super().__init__()
+        self.hop_length = hop_length
+        self.proj = nn.Linear(513, EMBEDDING_DIM)
+
+    def voice_conversion(self, y, y_lengths, sid_src, sid_tgt, tau=1.0):
+        time.sleep(DELAYS.convert + DELAYS.batch_item * (y.size(0) - 1))
+        samples = y.size(-1) * self.hop_length
+        audio = torch.from_numpy(_tone(samples, 22050, frequency=220.0))
+        return (audio.expand(y.size(0), 1, -1).clone(), None, None)
+
+    def ref_enc(self, spec):
+        time.sleep(DELAYS.encode)
+        return torch.tanh(self.proj(spec.mean(dim=1)))
+
+class ToneColorConverter:
+    """Fake openvoice.api.ToneColorConverter"""
+
+    def __init__(self, config, device: str = 'cuda:0'):
+        self.hps = config
+        self.device = device
+        self.version = 'v2'
+        self.model = _FakeConverterModel(config.data.hop_length)
+
+    def load_ckpt(self, ckpt_path) -> None:
+        pass
+
+    def load_source_se(self, speaker_key: str) -> torch.Tensor:
+        seed = int(hashlib.sha1(speaker_key.encode('utf-8')).hexdigest()[:8], 16)
+        generator = torch.Generator().manual_seed(seed)
+        return torch.randn(1, EMBEDDING_DIM, 1, generator=generator)
+
+    def extract_se(self, ref_wav_list, se_save_path=None) -> torch.Tensor:
+        time.sleep(DELAYS.encode * len(ref_wav_list))
+        return self.load_source_se('|'.join(ref_wav_list))
+
+    def add_watermark(self, audio: np.ndarray, message: str) -> np.ndarray:
+        return audio
+
+def spectrogram_torch(y, n_fft, sampling_rate, hop_size, win_size, center=False):
+    """Linear magnitude spectrogram, as openvoice.mel_processing computes it"""
+    y = torch.nn.functional.pad(
+        y.unsqueeze(1), (int((n_fft - hop_size) / 2), int((n_fft - hop_size) / 2)), mode='reflect'
+    ).squeeze(1)
+    spec = torch.stft(
+        y, n_fft, hop_length=hop_size, win_length=win_size, window=torch.hann_window(win_size),
+        center=center, pad_mode='reflect', normalized=False, onesided=True, return_complex=True
+    )
+    return torch.sqrt(spec.abs().pow(2) + 1e-6)
+
+def hash_numpy_array(audio_path: str) -> str:
+    with open(audio_path, 'rb') as f:
+        return hashlib.sha256(f.read()).hexdigest()[:16]
+
+def split_audio_vad(audio_path: str, audio_name: str, target_dir: str = 'processed', split_seconds: float = 10.0) -> str:
+    """Cut a file into fixed-length segments in place of VAD"""
+    time.sleep(DELAYS.vad)
+    audio, sample_rate = soundfile.read(audio_path, dtype='float32')
+    wavs_folder = os.path.join(target_dir, audio_name, 'wavs')
+    os.makedirs(wavs_folder, exist_ok=True)
+    step = int(split_seconds * sample_rate)
+    for index, start in enumerate(range(0, max(len(audio), 1), step)):
+        soundfile.write(os.path.join(wavs_folder, f'{audio_name}_seg{index}.wav'), audio[start:start + step], sample_rate)
+    return wavs_folder
+
+def get_se(audio_path: str, vc_model: ToneColorConverter, target_dir: str = 'processed', vad: bool = True):
+    audio_name = f"{os.path.basename(audio_path).rsplit('.', 1)[0]}_{vc_model.version}_{hash_numpy_array(audio_path)}"
+    wavs_folder = split_audio_vad(audio_path, target_dir=target_dir, audio_name=audio_name)
+    return vc_model.extract_se(sorted(glob(f'{wavs_folder}/*.wav'))), audio_name
+
+def _module(name: str, **attributes) -> types.ModuleType:
+    module = types.ModuleType(name)
+    module.__dict__.update(attributes)
+    sys.modules[name] = module
+    return module
+
+def install(delays: StubDelays = None) -> None:
+    """Register the fake `openvoice` and `melo` packages"""
+    global DELAYS
+    if delays is not None:
+        DELAYS = delays
+    if 'app.services.voice_service' in sys.modules:
+        raise RuntimeError("Stubs must be installed before app.services is imported")
+
+    se_extractor = _module(
+        'openvoice.se_extractor', get_se=get_se, split_audio_vad=split_audio_vad, hash_numpy_array=hash_numpy_array
+    )
+    _module(
+        'openvoice', se_extractor=se_extractor,
+        api=_module('openvoice.api', ToneColorConverter=ToneColorConverter),
+        mel_processing=_module('openvoice.mel_processing', spectrogram_torch=spectrogram_torch),
+        download_utils=_module(
+            'openvoice.download_utils',
+            load_or_download_config=load_converter_config,
+            load_or_download_model=load_converter_model,
+        ),
+    )
+    melo_utils = _module('melo.utils', get_text_for_tts_infer=get_text_for_tts_infer)
+    _module(
+        'melo', utils=melo_utils,
+        api=_module('melo.api', TTS=TTS),
+        download_utils=_module('melo.download_utils', load_or_download_config=load_melo_config),
+    )
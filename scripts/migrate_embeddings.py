@@ -0,0 +1,51 @@
+"""
+Import legacy per-voice .pth embeddings into the embedding store
+
+    python -m scripts.migrate_embeddings [--folder outputs_v2] [--delete] [--dry-run]
+
+Embeddings already in the store are skipped, so the migration can be rerun.
+With --delete, each .pth file is removed once its embedding is stored.
+"""
+import os
+import argparse
+import torch
+
+from app.config.settings import OUTPUT_FOLDER, logger
+from app.services.embedding_store import embedding_store
+
+def migrate(folder: str, delete: bool = False, dry_run: bool = False) -> dict:
+    """Append every .pth embedding in `folder` to the store"""
+    report = {"migrated": 0, "skipped": 0, "failed": 0, "deleted": 0}
+    with os.scandir(folder) as it:
+        entries = sorted(entry.path for entry in it if entry.is_file() and entry.name.endswith('.pth'))
+
+    for path in entries:
+        name = os.path.basename(path)[:-len('.pth')]
+        if embedding_store.contains(name):
+            report["skipped"] += 1
+        elif dry_run:
+            report["migrated"] += 1
+            continue
+        else:
+            try:
+                embedding_store.append(name, torch.load(path, map_location='cpu'))
+                report["migrated"] += 1
+            except Exception as e:
+                logger.error(f"Could not migrate {path}: {e}")
+                report["failed"] += 1
+                continue
+
+        if delete and not dry_run:
+            os.remove(path)
+            report["deleted"] += 1
+    return report
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--folder", default=OUTPUT_FOLDER, help="Folder holding <name>.pth embeddings")
+    parser.add_argument("--delete", action="store_true", help="Remove .pth files once stored")
+    parser.add_argument("--dry-run", action="store_true", help="Only report what would be migrated")
+    args = parser.parse_args()
+    report = migrate(args.folder, delete=args.delete, dry_run=args.dry_run)
+    logger.info(f"Embedding migration: {report}")
+    print(report)